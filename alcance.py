@@ -0,0 +1,53 @@
+from collections import deque #cola FIFO del recorrido desde los tanques
+
+
+# Indice de los nodos que reciben agua de algun tanque, armado con un solo recorrido BFS que sale de
+# todos los tanques a la vez. Si se pide, tambien guarda que tanques llegan a cada nodo.
+class IndiceAlcance:
+    def __init__(self, grafo, version, con_tanques=False):
+        self.version = version #version de la topologia con la que se armo el indice
+        self.tanques = [nodo for nodo, data in grafo.nodes(data=True) if data["tipo"] == "tanque"]
+        self.alcanzables = self._recorrer(grafo)
+        self.tanques_por_nodo = self._tanques_que_llegan(grafo) if con_tanques else None
+
+    def esta_conectado(self, nodo):
+        return nodo in self.alcanzables
+
+    # Tanques desde los que hay un camino hasta el nodo, en el orden en que aparecen en la red
+    def tanques_de(self, nodo):
+        if self.tanques_por_nodo is None:
+            raise ValueError("El indice se armo sin registrar los tanques de cada nodo.")
+        mascara = self.tanques_por_nodo.get(nodo, 0)
+        return [tanque for i, tanque in enumerate(self.tanques) if mascara >> i & 1]
+
+    def _recorrer(self, grafo):
+        alcanzables = set(self.tanques)
+        cola = deque(self.tanques)
+        adyacencia = grafo.adj
+        while cola:
+            nodo_actual = cola.popleft()
+            for vecino in adyacencia[nodo_actual]:
+                if vecino not in alcanzables:
+                    alcanzables.add(vecino)
+                    cola.append(vecino)
+        return alcanzables
+
+    # Cada tanque es un bit de una mascara; un nodo se vuelve a visitar solo cuando su mascara gana bits
+    # nuevos, asi cada tubería se recorre a lo sumo una vez por tanque y en la practica muchas menos.
+    def _tanques_que_llegan(self, grafo):
+        mascaras = {tanque: 1 << i for i, tanque in enumerate(self.tanques)}
+        cola = deque(self.tanques)
+        en_cola = set(self.tanques)
+        adyacencia = grafo.adj
+        while cola:
+            nodo_actual = cola.popleft()
+            en_cola.discard(nodo_actual)
+            mascara = mascaras[nodo_actual]
+            for vecino in adyacencia[nodo_actual]:
+                anterior = mascaras.get(vecino, 0)
+                if anterior | mascara != anterior:
+                    mascaras[vecino] = anterior | mascara
+                    if vecino not in en_cola:
+                        en_cola.add(vecino)
+                        cola.append(vecino)
+        return mascaras
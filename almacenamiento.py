@@ -0,0 +1,146 @@
+import json #registros del diario y contenido de las instantaneas
+import os #para reemplazar archivos de forma atomica y truncar el diario
+import tempfile #para escribir en un archivo temporal antes de reemplazar el original
+
+
+# Escribe el contenido (texto o bytes) en un archivo temporal del mismo directorio y luego lo renombra
+# sobre la ruta final, asi nunca queda un archivo a medio escribir si el proceso se interrumpe.
+def escribir_archivo_atomico(ruta, contenido):
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    descriptor, ruta_temporal = tempfile.mkstemp(dir=directorio, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, 'wb' if isinstance(contenido, bytes) else 'w') as f:
+            f.write(contenido)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(ruta_temporal, ruta)
+    except BaseException:
+        try:
+            os.unlink(ruta_temporal)
+        except OSError:
+            pass
+        raise
+
+
+# Aplica sobre el grafo un registro del diario. Los registros describen el estado final del elemento
+# (todos sus atributos), asi que aplicarlos dos veces deja el mismo resultado.
+def aplicar_registro(grafo, registro):
+    operacion = registro["op"]
+    if operacion == "nodo":
+        grafo.add_node(registro["nodo"], **registro["datos"])
+    elif operacion == "eliminar_nodo":
+        if registro["nodo"] in grafo:
+            grafo.remove_node(registro["nodo"])
+    elif operacion == "tuberia":
+        grafo.add_edge(registro["nodo1"], registro["nodo2"], **registro["datos"])
+    elif operacion == "eliminar_tuberia":
+        if grafo.has_edge(registro["nodo1"], registro["nodo2"]):
+            grafo.remove_edge(registro["nodo1"], registro["nodo2"])
+    else:
+        raise ValueError(f"Operacion desconocida en el diario: {operacion}")
+
+
+# Almacenamiento por diario: cada cambio de la red se agrega como una linea JSON compacta al archivo
+# `<ruta_base>.diario.jsonl`, y cada `compactar_cada` registros se escribe una instantanea completa en
+# `<ruta_base>.instantanea.json` y se vacia el diario. Para recuperar la red se carga la instantanea y se
+# aplican los registros del diario posteriores a ella.
+#
+# Cada registro lleva un numero de secuencia y la instantanea guarda el ultimo que incluye; si el proceso
+# se interrumpe entre escribir la instantanea y vaciar el diario, esos registros se saltan al cargar.
+class DiarioDeCambios:
+    def __init__(self, grafo, ruta_base, compactar_cada=1000, sincronizar_disco=False):
+        self.grafo = grafo
+        self.ruta_instantanea = ruta_base + ".instantanea.json"
+        self.ruta_diario = ruta_base + ".diario.jsonl"
+        self.compactar_cada = compactar_cada
+        self.sincronizar_disco = sincronizar_disco #fsync en cada confirmacion, no solo flush
+        self.secuencia = 0 #numero del ultimo registro escrito
+        self.registros_desde_instantanea = 0
+        self.reemplazo_pendiente = False #la red se reemplazo entera, el proximo guardado es una instantanea
+        self._archivo = None
+
+    def existe(self):
+        return os.path.exists(self.ruta_instantanea) or os.path.exists(self.ruta_diario)
+
+    # Reemplaza el contenido del grafo por la ultima instantanea mas los registros del diario. Si la ultima
+    # linea quedo a medio escribir se descarta y se corta el archivo ahi, para seguir agregando despues.
+    # Devuelve la cantidad de registros aplicados.
+    def cargar(self):
+        self.cerrar()
+        self.grafo.clear()
+        secuencia = 0
+        if os.path.exists(self.ruta_instantanea):
+            with open(self.ruta_instantanea, 'r') as f:
+                datos = json.load(f)
+            secuencia = datos["secuencia"]
+            self.grafo.add_nodes_from((nodo, atributos) for nodo, atributos in datos["nodos"])
+            self.grafo.add_edges_from((nodo1, nodo2, atributos) for nodo1, nodo2, atributos in datos["tuberias"])
+
+        aplicados = 0
+        if os.path.exists(self.ruta_diario):
+            posicion_valida = 0
+            with open(self.ruta_diario, 'rb') as f:
+                for linea in f:
+                    if not linea.endswith(b"\n"):
+                        break
+                    try:
+                        registro = json.loads(linea)
+                    except ValueError:
+                        break
+                    posicion_valida += len(linea)
+                    if registro["n"] <= secuencia:
+                        continue
+                    aplicar_registro(self.grafo, registro)
+                    secuencia = registro["n"]
+                    aplicados += 1
+            if posicion_valida < os.path.getsize(self.ruta_diario):
+                os.truncate(self.ruta_diario, posicion_valida)
+
+        self.secuencia = secuencia
+        self.registros_desde_instantanea = aplicados
+        self.reemplazo_pendiente = False
+        return aplicados
+
+    # Agrega un registro al diario. Queda en el buffer del archivo hasta la siguiente confirmacion.
+    def registrar(self, operacion, **campos):
+        if self.reemplazo_pendiente:
+            # La instantanea se toma del grafo actual, que ya incluye este cambio
+            self.compactar()
+            return
+        self.secuencia += 1
+        registro = {"n": self.secuencia, "op": operacion}
+        registro.update(campos)
+        if self._archivo is None:
+            self._archivo = open(self.ruta_diario, 'a')
+        self._archivo.write(json.dumps(registro, separators=(",", ":")) + "\n")
+        self.registros_desde_instantanea += 1
+
+    def red_reemplazada(self):
+        self.reemplazo_pendiente = True
+
+    # Lleva al disco los registros pendientes, o escribe una instantanea si ya toca compactar
+    def confirmar(self):
+        if self.reemplazo_pendiente or self.registros_desde_instantanea >= self.compactar_cada:
+            self.compactar()
+        elif self._archivo is not None:
+            self._archivo.flush()
+            if self.sincronizar_disco:
+                os.fsync(self._archivo.fileno())
+
+    # Escribe la instantanea con el estado completo del grafo y vacia el diario
+    def compactar(self):
+        datos = {
+            "secuencia": self.secuencia,
+            "nodos": [[nodo, atributos] for nodo, atributos in self.grafo.nodes(data=True)],
+            "tuberias": [[nodo1, nodo2, atributos] for nodo1, nodo2, atributos in self.grafo.edges(data=True)],
+        }
+        escribir_archivo_atomico(self.ruta_instantanea, json.dumps(datos, separators=(",", ":")))
+        self.cerrar()
+        open(self.ruta_diario, 'w').close()
+        self.registros_desde_instantanea = 0
+        self.reemplazo_pendiente = False
+
+    def cerrar(self):
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
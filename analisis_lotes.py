@@ -0,0 +1,107 @@
+import argparse #para leer los archivos y los analisis desde la linea de comandos
+import glob #para aceptar patrones como distritos/*.json
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed #un proceso por archivo, en todos los nucleos
+
+from grafo import RedDeAgua
+
+ANALISIS = ["suministro", "bucles", "flujo_maximo", "sin_servicio"]
+
+
+# Expande los patrones (o rutas sueltas) en la lista de archivos a analizar, sin repetir
+def expandir_archivos(patrones):
+    archivos = []
+    for patron in patrones:
+        coincidencias = sorted(glob.glob(patron, recursive=True)) or ([patron] if os.path.exists(patron) else [])
+        if not coincidencias:
+            print(f"No se encontraron archivos para {patron}.", file=sys.stderr)
+        archivos.extend(coincidencias)
+    return list(dict.fromkeys(archivos))
+
+
+# Carga una red en modo solo lectura (sin archivo json asociado, asi ningun metodo escribe en disco) y
+# corre los analisis pedidos. Devuelve un diccionario listo para escribir como una linea JSON, con el
+# tiempo de la carga y de cada analisis. Si un analisis falla, su mensaje queda en "errores" y se siguen
+# corriendo los demas.
+def analizar_archivo(archivo, analisis, pares_flujo=()):
+    resultado = {"archivo": archivo, "tiempos": {}}
+    tiempos = resultado["tiempos"]
+    red = RedDeAgua(archivo_json=None)
+    try:
+        inicio = time.perf_counter()
+        if archivo.endswith(".bin"):
+            red.cargar_binario(archivo)
+        else:
+            red.cargar_desde_json(archivo)
+        tiempos["carga"] = time.perf_counter() - inicio
+    except Exception as e:
+        resultado["error"] = f"No se pudo cargar la red: {e}"
+        return resultado
+    resultado["nodos"] = red.grafo.number_of_nodes()
+    resultado["tuberias"] = red.grafo.number_of_edges()
+
+    for nombre in analisis:
+        inicio = time.perf_counter()
+        try:
+            if nombre == "suministro":
+                fallas = red.verificar_suministro_vectorizado(solo_fallas=True)
+                casas = sum(1 for _, data in red.grafo.nodes(data=True) if data["tipo"] == "casa")
+                resultado["suministro"] = {"casas": casas, "fallas": fallas}
+            elif nombre == "bucles":
+                resultado["bucles"] = red.regiones_con_bucles()
+            elif nombre == "flujo_maximo":
+                flujos = []
+                for fuente, sumidero in pares_flujo:
+                    try:
+                        flujos.append({"fuente": fuente, "sumidero": sumidero, "valor": red.flujo_maximo(fuente, sumidero)})
+                    except ValueError as e:
+                        flujos.append({"fuente": fuente, "sumidero": sumidero, "error": str(e)})
+                resultado["flujo_maximo"] = flujos
+            elif nombre == "sin_servicio":
+                resultado["sin_servicio"] = red.identificar_casas_sin_servicio()
+        except Exception as e:
+            resultado.setdefault("errores", {})[nombre] = f"No se pudo completar el analisis: {e}"
+        tiempos[nombre] = time.perf_counter() - inicio
+    return resultado
+
+
+# Analiza todos los archivos en un grupo de procesos y escribe cada resultado como una linea JSON apenas
+# esta listo (el orden de las lineas es el orden en que terminan). Un archivo cuyo proceso falla queda con
+# su "error" y no detiene el resto del lote.
+def analizar_lote(archivos, analisis, pares_flujo=(), procesos=None, salida=sys.stdout):
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+        tareas = {ejecutor.submit(analizar_archivo, archivo, analisis, pares_flujo): archivo for archivo in archivos}
+        for tarea in as_completed(tareas):
+            try:
+                resultado = tarea.result()
+            except Exception as e:
+                resultado = {"archivo": tareas[tarea], "error": f"No se pudo analizar el archivo: {e}"}
+            salida.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+            salida.flush()
+    return time.perf_counter() - inicio
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analisis sin interfaz grafica de muchas redes de agua.")
+    parser.add_argument("archivos", nargs="+", help="Archivos json (o .bin de guardar_binario), admite patrones.")
+    parser.add_argument("--analisis", nargs="+", choices=ANALISIS, default=["suministro", "bucles", "sin_servicio"])
+    parser.add_argument("--flujo", nargs=2, action="append", default=[], metavar=("FUENTE", "SUMIDERO"),
+                        help="Par de nodos para el analisis flujo_maximo, se puede repetir.")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos en paralelo (por defecto, uno por nucleo).")
+    parser.add_argument("--salida", default=None, help="Archivo JSONL de salida (por defecto, la salida estandar).")
+    argumentos = parser.parse_args()
+
+    analisis = list(dict.fromkeys(argumentos.analisis))
+    if argumentos.flujo and "flujo_maximo" not in analisis:
+        analisis.append("flujo_maximo")
+    archivos = expandir_archivos(argumentos.archivos)
+    if argumentos.salida:
+        with open(argumentos.salida, 'w') as salida:
+            segundos = analizar_lote(archivos, analisis, argumentos.flujo, argumentos.procesos, salida)
+    else:
+        segundos = analizar_lote(archivos, analisis, argumentos.flujo, argumentos.procesos)
+    print(f"{len(archivos)} archivos analizados en {segundos:.2f} s.", file=sys.stderr)
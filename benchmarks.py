@@ -0,0 +1,419 @@
+import argparse #para leer los parametros del benchmark desde la linea de comandos
+import contextlib #para silenciar los mensajes de la red durante las mediciones
+import io
+import json
+import os
+import platform #version de Python en el archivo de resultados
+import random #para elegir las tuberías que se editan en los benchmarks
+import tempfile #para escribir las redes sinteticas en archivos temporales
+import time
+import tracemalloc #para medir la memoria de cada representacion de la red
+
+import networkx as nx
+import numpy as np
+
+from generador_redes import TOPOLOGIAS, generar_red
+from grafo import RedDeAgua
+from red_compacta import RedCompacta
+
+
+# Red en arbol con `num_tuberias` tuberías (ver generador_redes.generar_red), la que usan los benchmarks
+# de cada optimizacion
+def red_sintetica(num_tuberias, semilla=0):
+    return generar_red("arbol", num_casas=max(2, num_tuberias * 2 // 3), num_tuberias=num_tuberias, semilla=semilla)
+
+
+# Aplica obstrucciones parciales a una fraccion de las tuberías de `datos`, reduciendo su capacidad como
+# editar_tuberia: asi las capacidades quedan fraccionarias, como en una red real despues de editarla.
+def obstruir_parcialmente(datos, fraccion=0.3, semilla=0):
+    rng = random.Random(semilla)
+    for tuberia in datos["tuberias"]:
+        if rng.random() < fraccion:
+            tuberia["capacidad_flujo"] = tuberia["capacidad_flujo"] * (1 - rng.uniform(1, 99) / 100)
+    return datos
+
+
+# Carga la red repitiendo agregar_casa, agregar_tanque_con_capacidad y agregar_tuberia, como lo hacia
+# cargar_desde_json antes de la carga en bloque. Sirve como referencia para redes pequeñas.
+def cargar_secuencial(red, datos):
+    with red.lote():
+        for casa, info in datos["casas"].items():
+            red.agregar_casa(casa, info["demanda"])
+        for tanque, info in datos["tanques"].items():
+            red.agregar_tanque_con_capacidad(tanque, info["capacidad"], info["conexiones"])
+        for tuberia in datos["tuberias"]:
+            red.agregar_tuberia(tuberia["nodo1"], tuberia["nodo2"], tuberia["capacidad_flujo"])
+
+
+# Mide el tiempo de cargar_desde_json sobre redes sinteticas de distintos tamaños
+def benchmark_carga(tamaños, secuencial_hasta=0):
+    resultados = []
+    with tempfile.TemporaryDirectory() as directorio:
+        for num_tuberias in tamaños:
+            datos = red_sintetica(num_tuberias)
+            archivo = os.path.join(directorio, f"red_{num_tuberias}.json")
+            with open(archivo, 'w') as f:
+                json.dump(datos, f)
+
+            red = RedDeAgua(os.path.join(directorio, "salida.json"))
+            with contextlib.redirect_stdout(io.StringIO()):
+                inicio = time.perf_counter()
+                red.cargar_desde_json(archivo)
+                segundos = time.perf_counter() - inicio
+            fila = {"tuberias": num_tuberias, "nodos": red.grafo.number_of_nodes(), "carga_en_bloque_s": segundos}
+
+            if num_tuberias <= secuencial_hasta:
+                red = RedDeAgua(os.path.join(directorio, "salida.json"))
+                with contextlib.redirect_stdout(io.StringIO()):
+                    inicio = time.perf_counter()
+                    cargar_secuencial(red, datos)
+                    fila["carga_secuencial_s"] = time.perf_counter() - inicio
+
+            print(json.dumps(fila))
+            resultados.append(fila)
+    return resultados
+
+
+# Compara el recorrido completo de calcular_distribucion_flujo con la actualizacion incremental
+# despues de obstruir una tubería al azar
+def benchmark_distribucion(tamaños, ediciones=50):
+    resultados = []
+    with tempfile.TemporaryDirectory() as directorio:
+        for num_tuberias in tamaños:
+            red = RedDeAgua(os.path.join(directorio, "salida.json"))
+            with contextlib.redirect_stdout(io.StringIO()):
+                red._cargar_datos(red_sintetica(num_tuberias))
+                inicio = time.perf_counter()
+                red.calcular_distribucion_flujo()
+                completo = time.perf_counter() - inicio
+
+                rng = random.Random(1)
+                tuberias = list(red.grafo.edges)
+                red.distribucion_flujo()
+                incremental = 0
+                region = 0
+                with red.lote():
+                    for _ in range(ediciones):
+                        nodo1, nodo2 = rng.choice(tuberias)
+                        red.editar_tuberia(nodo1, nodo2, rng.choice([-1, 25, 50]))
+                        inicio = time.perf_counter()
+                        red.distribucion_flujo()
+                        incremental += time.perf_counter() - inicio
+                        region += len(red._distribucion.ultima_region)
+                    red.cambios_sin_guardar = False
+            fila = {
+                "tuberias": num_tuberias,
+                "completo_s": completo,
+                "incremental_promedio_s": incremental / ediciones,
+                "region_promedio_nodos": region / ediciones,
+            }
+            print(json.dumps(fila))
+            resultados.append(fila)
+    return resultados
+
+
+# Compara la memoria del grafo de networkx con la de la copia compacta (CSR + NumPy). Los nombres de los
+# nodos son los mismos objetos en ambas, asi que solo se mide la estructura.
+def benchmark_memoria(tamaños):
+    resultados = []
+    for num_tuberias in tamaños:
+        red = RedDeAgua(None)
+        with contextlib.redirect_stdout(io.StringIO()):
+            red._cargar_datos(red_sintetica(num_tuberias))
+
+        tracemalloc.start()
+        antes = tracemalloc.get_traced_memory()[0]
+        copia_nx = red.grafo.copy()
+        memoria_nx = tracemalloc.get_traced_memory()[0] - antes
+        del copia_nx
+        antes = tracemalloc.get_traced_memory()[0]
+        compacta = RedCompacta.desde_grafo(red.grafo)
+        memoria_compacta = tracemalloc.get_traced_memory()[0] - antes
+        tracemalloc.stop()
+
+        fila = {
+            "tuberias": num_tuberias,
+            "networkx_bytes": memoria_nx,
+            "compacta_bytes": memoria_compacta,
+            "compacta_arreglos_bytes": compacta.memoria_arreglos(),
+        }
+        print(json.dumps(fila))
+        resultados.append(fila)
+    return resultados
+
+
+# Compara verificar_suministro (casa por casa) con verificar_suministro_vectorizado
+def benchmark_suministro(tamaños):
+    resultados = []
+    for num_tuberias in tamaños:
+        red = RedDeAgua(None)
+        with contextlib.redirect_stdout(io.StringIO()):
+            red._cargar_datos(red_sintetica(num_tuberias))
+        red.red_compacta()
+
+        inicio = time.perf_counter()
+        red.verificar_suministro()
+        por_casa = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        red.verificar_suministro_vectorizado(solo_fallas=True)
+        vectorizado = time.perf_counter() - inicio
+
+        fila = {
+            "tuberias": num_tuberias,
+            "casas": sum(1 for _, data in red.grafo.nodes(data=True) if data["tipo"] == "casa"),
+            "por_casa_s": por_casa,
+            "vectorizado_s": vectorizado,
+        }
+        print(json.dumps(fila))
+        resultados.append(fila)
+    return resultados
+
+
+# Compara ford_fulkerson, flujo_maximo (Dinic y push-relabel) y networkx.maximum_flow entre el primer
+# tanque y la casa con mas tuberías entrantes de las que alcanza, con capacidades enteras y con parte de
+# las tuberías obstruidas (capacidades fraccionarias)
+def benchmark_flujo_maximo(tamaños, referencia_hasta=10_000):
+    resultados = []
+    for num_tuberias in tamaños:
+        for capacidades in ("enteras", "fraccionarias"):
+            datos = red_sintetica(num_tuberias)
+            if capacidades == "fraccionarias":
+                obstruir_parcialmente(datos)
+            red = RedDeAgua(None)
+            red._cargar_datos(datos)
+            fuente = "Tanque0"
+            alcanzados = nx.descendants(red.grafo, fuente)
+            sumidero = max(alcanzados, key=lambda nodo: (red.grafo.in_degree(nodo), nodo))
+
+            fila = {"tuberias": num_tuberias, "capacidades": capacidades, "fuente": fuente, "sumidero": sumidero}
+            mediciones = [
+                ("dinic", lambda: red.flujo_maximo(fuente, sumidero, "dinic")),
+                ("push_relabel", lambda: red.flujo_maximo(fuente, sumidero, "push_relabel")),
+                ("networkx", lambda: nx.maximum_flow_value(red.grafo, fuente, sumidero, capacity="capacidad_flujo")),
+            ]
+            if num_tuberias <= referencia_hasta:
+                mediciones.append(("ford_fulkerson", lambda: red.ford_fulkerson(fuente, sumidero)))
+            for nombre, calculo in mediciones:
+                red._compacta = None
+                inicio = time.perf_counter()
+                fila[f"{nombre}_valor"] = calculo()
+                fila[f"{nombre}_s"] = time.perf_counter() - inicio
+            print(json.dumps(fila))
+            resultados.append(fila)
+    return resultados
+
+
+# Compara el costo por edicion de guardar el json completo con el de agregar un registro al diario
+def benchmark_diario(tamaños, ediciones=20):
+    resultados = []
+    with tempfile.TemporaryDirectory() as directorio:
+        for num_tuberias in tamaños:
+            datos = red_sintetica(num_tuberias)
+            fila = {"tuberias": num_tuberias}
+            for modo in ("json", "diario"):
+                red = RedDeAgua(os.path.join(directorio, f"{modo}_{num_tuberias}.json"))
+                with contextlib.redirect_stdout(io.StringIO()):
+                    red._cargar_datos(datos)
+                    if modo == "diario":
+                        red.activar_diario(compactar_cada=10 * ediciones)
+                    rng = random.Random(1)
+                    tuberias = list(red.grafo.edges)
+                    inicio = time.perf_counter()
+                    for _ in range(ediciones):
+                        nodo1, nodo2 = rng.choice(tuberias)
+                        red.editar_tuberia(nodo1, nodo2, rng.choice([-1, 25, 50]))
+                    fila[f"{modo}_por_edicion_s"] = (time.perf_counter() - inicio) / ediciones
+                    red.desactivar_diario()
+            print(json.dumps(fila))
+            resultados.append(fila)
+    return resultados
+
+
+# Compara el arranque desde el json con el arranque desde el formato binario: cargando la red completa
+# (cargar_binario) y abriendo solo los arreglos con np.memmap para un analisis de solo lectura
+def benchmark_arranque(tamaños):
+    resultados = []
+    with tempfile.TemporaryDirectory() as directorio:
+        for num_tuberias in tamaños:
+            archivo_json = os.path.join(directorio, f"red_{num_tuberias}.json")
+            archivo_binario = os.path.join(directorio, f"red_{num_tuberias}.bin")
+            red = RedDeAgua(archivo_json)
+            with contextlib.redirect_stdout(io.StringIO()):
+                red._cargar_datos(red_sintetica(num_tuberias))
+                red.escribir_json()
+                red.guardar_binario(archivo_binario)
+
+            fila = {
+                "tuberias": num_tuberias,
+                "json_bytes": os.path.getsize(archivo_json),
+                "binario_bytes": os.path.getsize(archivo_binario),
+            }
+            with contextlib.redirect_stdout(io.StringIO()):
+                inicio = time.perf_counter()
+                RedDeAgua(None).cargar_desde_json(archivo_json)
+                fila["json_s"] = time.perf_counter() - inicio
+                inicio = time.perf_counter()
+                RedDeAgua(None).cargar_binario(archivo_binario)
+                fila["binario_s"] = time.perf_counter() - inicio
+            inicio = time.perf_counter()
+            compacta = RedCompacta.abrir_binario(archivo_binario)
+            fila["memmap_s"] = time.perf_counter() - inicio
+            compacta.verificar_suministro()
+            fila["memmap_con_suministro_s"] = time.perf_counter() - inicio
+            print(json.dumps(fila))
+            resultados.append(fila)
+    return resultados
+
+
+# Mide el analisis de contingencia N-1 (todas las tuberías) mas fallas dobles muestreadas
+def benchmark_contingencia(tamaños, muestras=1000):
+    resultados = []
+    for num_tuberias in tamaños:
+        red = RedDeAgua(None)
+        with contextlib.redirect_stdout(io.StringIO()):
+            red._cargar_datos(red_sintetica(num_tuberias))
+        inicio = time.perf_counter()
+        ranking = red.analisis_contingencia(muestras=muestras)
+        fila = {
+            "tuberias": num_tuberias,
+            "escenarios": len(ranking),
+            "segundos": time.perf_counter() - inicio,
+            "criticas": sum(1 for escenario in ranking if escenario["casas_afectadas"]),
+        }
+        print(json.dumps(fila))
+        resultados.append(fila)
+    return resultados
+
+
+# Mide una simulacion de 24 horas en pasos de un minuto, con dos perfiles de demanda repartidos entre
+# las casas
+def benchmark_simulacion(tamaños):
+    resultados = []
+    for num_tuberias in tamaños:
+        red = RedDeAgua(None)
+        with contextlib.redirect_stdout(io.StringIO()):
+            red._cargar_datos(red_sintetica(num_tuberias))
+        perfiles = {"residencial": [0.3] * 6 + [1.6] * 3 + [0.8] * 8 + [1.4] * 4 + [0.6] * 3, "comercial": [0.1] * 8 + [1.5] * 10 + [0.2] * 6}
+        casas = [nodo for nodo, data in red.grafo.nodes(data=True) if data["tipo"] == "casa"]
+        perfil_de_casa = {casa: "comercial" if i % 5 == 0 else "residencial" for i, casa in enumerate(casas)}
+        inicio = time.perf_counter()
+        simulacion = red.simular_periodo_extendido(horas=24, paso_minutos=1, perfiles=perfiles, perfil_de_casa=perfil_de_casa)
+        fila = {
+            "tuberias": num_tuberias,
+            "nodos": red.grafo.number_of_nodes(),
+            "pasos": len(simulacion["tiempos"]) - 1,
+            "segundos": time.perf_counter() - inicio,
+        }
+        print(json.dumps(fila))
+        resultados.append(fila)
+    return resultados
+
+
+# Suite de referencia: mide los metodos principales de RedDeAgua sobre redes de cada topologia con
+# `nodos` nodos y guarda los tiempos en `archivo_resultados`, para comparar entre versiones con
+# comparar_resultados. ford_fulkerson solo se mide hasta `referencia_hasta` nodos.
+def benchmark_suite(nodos, topologias=TOPOLOGIAS, archivo_resultados="resultados_benchmark.json", referencia_hasta=10_000):
+    filas = []
+    with tempfile.TemporaryDirectory() as directorio:
+        for topologia in topologias:
+            for cantidad in nodos:
+                num_tanques = max(1, cantidad // 500)
+                num_casas = max(1, cantidad - num_tanques)
+                datos = generar_red(topologia, num_casas=num_casas, num_tanques=num_tanques, num_tuberias=int(num_casas * 1.2))
+                archivo = os.path.join(directorio, "red.json")
+                with open(archivo, 'w') as f:
+                    json.dump(datos, f)
+
+                red = RedDeAgua(os.path.join(directorio, "salida.json"))
+                casa_media = f"Casa{num_casas // 2}"
+                mediciones = [
+                    ("cargar_desde_json", lambda: red.cargar_desde_json(archivo)),
+                    ("calcular_distribucion_flujo", red.calcular_distribucion_flujo),
+                    ("verificar_suministro", red.verificar_suministro),
+                    ("ford_fulkerson", lambda: red.ford_fulkerson("Tanque0", f"Casa{num_casas - 1}")),
+                    ("buscar_ruta_alternativa_optima", lambda: red.buscar_ruta_alternativa_optima(casa_media)),
+                    ("detectar_bucles", red.detectar_bucles),
+                    ("guardar_en_json", red.guardar_en_json),
+                ]
+                for metodo, calculo in mediciones:
+                    fila = {"metodo": metodo, "topologia": topologia, "nodos": num_casas + num_tanques, "tuberias": len(datos["tuberias"])}
+                    if metodo == "ford_fulkerson" and cantidad > referencia_hasta:
+                        fila["segundos"] = None
+                    else:
+                        with contextlib.redirect_stdout(io.StringIO()):
+                            inicio = time.perf_counter()
+                            calculo()
+                            fila["segundos"] = time.perf_counter() - inicio
+                    print(json.dumps(fila))
+                    filas.append(fila)
+
+    resultados = {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "networkx": nx.__version__,
+        "numpy": np.__version__,
+        "resultados": filas,
+    }
+    with open(archivo_resultados, 'w') as f:
+        json.dump(resultados, f, indent=2)
+    return resultados
+
+
+# Compara dos archivos de resultados de benchmark_suite: para cada medicion presente en ambos imprime el
+# tiempo anterior, el actual y la razon actual / anterior (mayor que 1 es mas lento)
+def comparar_resultados(archivo_anterior, archivo_actual):
+    with open(archivo_anterior) as f:
+        anterior = json.load(f)["resultados"]
+    with open(archivo_actual) as f:
+        actual = json.load(f)["resultados"]
+    tiempos_anteriores = {(fila["metodo"], fila["topologia"], fila["nodos"]): fila["segundos"] for fila in anterior}
+    comparacion = []
+    for fila in actual:
+        clave = (fila["metodo"], fila["topologia"], fila["nodos"])
+        antes = tiempos_anteriores.get(clave)
+        if antes and fila["segundos"] is not None:
+            comparacion.append({
+                "metodo": fila["metodo"], "topologia": fila["topologia"], "nodos": fila["nodos"],
+                "anterior_s": antes, "actual_s": fila["segundos"], "razon": fila["segundos"] / antes,
+            })
+            print(json.dumps(comparacion[-1]))
+    return comparacion
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks de la red de agua.")
+    parser.add_argument("benchmark", choices=["carga", "distribucion", "memoria", "suministro", "flujo_maximo", "diario", "arranque", "contingencia", "simulacion", "suite"], nargs="?", default="carga")
+    parser.add_argument("--tamaños", type=int, nargs="+", default=None,
+                        help="Cantidad de tuberías de cada red sintetica (en la suite, cantidad de nodos).")
+    parser.add_argument("--secuencial-hasta", type=int, default=0,
+                        help="Tambien mide la carga tubería por tubería en redes de hasta este tamaño.")
+    parser.add_argument("--referencia-hasta", type=int, default=10_000,
+                        help="Mide ford_fulkerson solo en redes de hasta este tamaño.")
+    parser.add_argument("--topologias", nargs="+", choices=TOPOLOGIAS, default=TOPOLOGIAS, help="Topologias de la suite.")
+    parser.add_argument("--resultados", default="resultados_benchmark.json", help="Archivo donde la suite guarda los tiempos.")
+    parser.add_argument("--comparar", default=None, help="Resultados anteriores de la suite con los que comparar.")
+    argumentos = parser.parse_args()
+    if argumentos.tamaños is None:
+        argumentos.tamaños = [100, 1_000, 10_000, 100_000, 1_000_000] if argumentos.benchmark == "suite" else [10_000, 100_000, 1_000_000]
+    if argumentos.benchmark == "carga":
+        benchmark_carga(argumentos.tamaños, argumentos.secuencial_hasta)
+    elif argumentos.benchmark == "distribucion":
+        benchmark_distribucion(argumentos.tamaños)
+    elif argumentos.benchmark == "memoria":
+        benchmark_memoria(argumentos.tamaños)
+    elif argumentos.benchmark == "suministro":
+        benchmark_suministro(argumentos.tamaños)
+    elif argumentos.benchmark == "flujo_maximo":
+        benchmark_flujo_maximo(argumentos.tamaños, argumentos.referencia_hasta)
+    elif argumentos.benchmark == "diario":
+        benchmark_diario(argumentos.tamaños)
+    elif argumentos.benchmark == "arranque":
+        benchmark_arranque(argumentos.tamaños)
+    elif argumentos.benchmark == "contingencia":
+        benchmark_contingencia(argumentos.tamaños)
+    elif argumentos.benchmark == "simulacion":
+        benchmark_simulacion(argumentos.tamaños)
+    else:
+        benchmark_suite(argumentos.tamaños, argumentos.topologias, argumentos.resultados, argumentos.referencia_hasta)
+        if argumentos.comparar:
+            comparar_resultados(argumentos.comparar, argumentos.resultados)
@@ -0,0 +1,123 @@
+import os #para repartir los escenarios en un proceso por nucleo
+import random #para muestrear fallas de varias tuberías a la vez
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np #mascaras y recorridos por niveles sobre los arreglos de la red compacta
+
+from red_compacta import TIPO_CASA, TIPO_TANQUE
+
+
+# Evalua escenarios de falla de tuberías sobre una RedCompacta sin copiarla: cada escenario apaga sus
+# tuberías en una mascara de aristas activas y la vuelve a encender al terminar.
+#
+# Una casa tiene servicio si esta conectada a algun tanque y las tuberías que le llegan cubren su demanda,
+# el mismo criterio de RedDeAgua.identificar_casas_sin_servicio. Quitar una tubería u -> v solo puede
+# cambiar el alcance de los nodos aguas abajo de v, asi que cada escenario recorre solo esa region.
+class EvaluadorContingencia:
+    def __init__(self, compacta):
+        self.compacta = compacta
+        n = compacta.num_nodos
+        self.activa = np.ones(compacta.num_aristas, dtype=bool)
+        self.capacidad_positiva = np.where(compacta.capacidad_flujo > 0, compacta.capacidad_flujo, 0)
+        self.alcanzable = compacta.alcanzables()
+        self.es_casa = compacta.tipo == TIPO_CASA
+        self.es_tanque = compacta.tipo == TIPO_TANQUE
+        self.flujo_entrante = np.bincount(compacta.destino, weights=self.capacidad_positiva, minlength=n)
+        self.servida = self.es_casa & self.alcanzable & (self.flujo_entrante >= compacta.demanda)
+
+    # Recorrido por niveles desde las semillas, solo por nodos permitidos y tuberías activas
+    def _recorrer(self, semillas, permitido):
+        compacta = self.compacta
+        visitado = np.zeros(compacta.num_nodos, dtype=bool)
+        visitado[semillas] = True
+        frontera = semillas
+        while frontera.size:
+            aristas = compacta.aristas_salientes(frontera)
+            aristas = aristas[self.activa[aristas]]
+            vecinos = compacta.destino[aristas]
+            vecinos = np.unique(vecinos[permitido[vecinos] & ~visitado[vecinos]])
+            visitado[vecinos] = True
+            frontera = vecinos
+        return visitado
+
+    # Casas que pierden el servicio si fallan las tuberías dadas (ids de la red compacta). Devuelve la
+    # demanda que deja de cubrirse y los ids de las casas afectadas.
+    def evaluar(self, fallas):
+        compacta = self.compacta
+        fallas = np.asarray(fallas, dtype=np.int64)
+        cabezas = compacta.destino[fallas]
+        cabezas = np.unique(cabezas[self.alcanzable[cabezas]])
+        if cabezas.size == 0:
+            return 0.0, np.zeros(0, dtype=np.int64)
+
+        self.activa[fallas] = False
+        try:
+            # Region que puede cambiar: lo que queda aguas abajo de las tuberías caidas
+            region = self._recorrer(cabezas, self.alcanzable)
+            nodos_region = np.flatnonzero(region)
+
+            # Dentro de la region siguen alcanzados los tanques y lo que recibe agua de afuera de la region
+            entrantes = compacta.aristas_entrantes(nodos_region)
+            entrantes = entrantes[self.activa[entrantes]]
+            origenes = compacta.origen[entrantes]
+            desde_afuera = self.alcanzable[origenes] & ~region[origenes]
+            semillas = np.union1d(compacta.destino[entrantes[desde_afuera]], nodos_region[self.es_tanque[nodos_region]])
+            alcanzado = self._recorrer(semillas.astype(np.int64), region)
+        finally:
+            self.activa[fallas] = True
+
+        # Flujo que sigue llegando a la region, sumado de nuevo sobre las tuberías activas (en orden de id,
+        # como en el total inicial) en lugar de restarle las caidas: con capacidades fraccionarias la resta
+        # no da el mismo total y una casa justo en su demanda parecia perder el servicio
+        entrantes = np.sort(entrantes)
+        flujo_entrante = np.bincount(
+            compacta.destino[entrantes], weights=self.capacidad_positiva[entrantes], minlength=compacta.num_nodos
+        )[nodos_region]
+        sigue_servida = alcanzado[nodos_region] & (flujo_entrante >= compacta.demanda[nodos_region])
+        afectadas = nodos_region[self.servida[nodos_region] & ~sigue_servida]
+        return float(compacta.demanda[afectadas].sum()), afectadas
+
+
+# Escenarios de la evaluacion: todas las fallas de una sola tubería y, si se piden, `muestras` fallas de
+# `k` tuberías elegidas al azar
+def escenarios_de_falla(num_aristas, k=2, muestras=0, semilla=0):
+    escenarios = [(arista,) for arista in range(num_aristas)]
+    if muestras and k > 1 and num_aristas >= k:
+        rng = random.Random(semilla)
+        vistos = set()
+        for _ in range(muestras):
+            escenario = tuple(sorted(rng.sample(range(num_aristas), k)))
+            if escenario not in vistos:
+                vistos.add(escenario)
+                escenarios.append(escenario)
+    return escenarios
+
+
+# Estado de cada proceso del grupo: el evaluador se arma una vez por proceso, no una vez por escenario
+_evaluador = None
+
+
+def _iniciar_proceso(compacta):
+    global _evaluador
+    _evaluador = EvaluadorContingencia(compacta)
+
+
+def _evaluar_bloque(escenarios):
+    return [_evaluador.evaluar(escenario) for escenario in escenarios]
+
+
+# Evalua todos los escenarios y devuelve, para cada uno, (demanda insatisfecha, ids de casas afectadas).
+# Con procesos=1 se evalua en el proceso actual; si no, los escenarios se reparten en bloques entre los
+# procesos del grupo (por defecto uno por nucleo).
+def evaluar_escenarios(compacta, escenarios, procesos=None, tamaño_bloque=256):
+    procesos = procesos or os.cpu_count() or 1
+    if procesos == 1 or len(escenarios) <= tamaño_bloque:
+        evaluador = EvaluadorContingencia(compacta)
+        return [evaluador.evaluar(escenario) for escenario in escenarios]
+
+    bloques = [escenarios[i:i + tamaño_bloque] for i in range(0, len(escenarios), tamaño_bloque)]
+    resultados = []
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_proceso, initargs=(compacta,)) as ejecutor:
+        for resultado_bloque in ejecutor.map(_evaluar_bloque, bloques):
+            resultados.extend(resultado_bloque)
+    return resultados
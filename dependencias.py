@@ -0,0 +1,184 @@
+from red_compacta import TIPO_CASA, TIPO_TANQUE
+
+
+# Indice de dependencias de la red: arbol de dominadores desde una raiz virtual conectada a todos los
+# tanques. Un nodo d domina a x si todo camino de agua desde algun tanque hasta x pasa por d, asi que los
+# dominadores de una casa son sus puntos unicos de falla.
+#
+# Para cubrir tambien las tuberías, cada tubería u -> v se parte en dos con un nodo intermedio
+# (u -> tubería -> v). Los ids del grafo partido son: 0 la raiz, 1 + i el nodo i de la red compacta y
+# 1 + n + j la tubería j.
+class IndiceDependencias:
+    def __init__(self, compacta):
+        self.compacta = compacta
+        self.version = compacta.version #version de la topologia con la que se armo el indice
+        self.idom = self._dominadores()
+        self._ordenar_casas()
+
+    # Lengauer-Tarjan (version simple, con compresion de caminos) sobre el grafo partido
+    def _dominadores(self):
+        compacta = self.compacta
+        n = compacta.num_nodos
+        total = 1 + n + compacta.num_aristas
+        inicio_salida = compacta.inicio_salida.tolist()
+        inicio_entrada = compacta.inicio_entrada.tolist()
+        aristas_entrada = compacta.aristas_entrada.tolist()
+        origen = compacta.origen.tolist()
+        destino = compacta.destino.tolist()
+        tanques = [i + 1 for i, tipo in enumerate(compacta.tipo.tolist()) if tipo == TIPO_TANQUE]
+        es_tanque = [False] * total
+        for tanque in tanques:
+            es_tanque[tanque] = True
+
+        def sucesores(x):
+            if x == 0:
+                return tanques
+            if x <= n:
+                return range(1 + n + inicio_salida[x - 1], 1 + n + inicio_salida[x])
+            return (destino[x - 1 - n] + 1,)
+
+        def predecesores(x):
+            if x == 0:
+                return ()
+            if x <= n:
+                entrantes = [1 + n + arista for arista in aristas_entrada[inicio_entrada[x - 1]:inicio_entrada[x]]]
+                if es_tanque[x]:
+                    entrantes.append(0)
+                return entrantes
+            return (origen[x - 1 - n] + 1,)
+
+        # Recorrido en profundidad desde la raiz: numero de preorden (semi), padre y orden de visita
+        semi = [0] * total
+        padre = [-1] * total
+        vertice = [0]
+        semi[0] = 1
+        vertice.append(0)
+        pila = [(0, iter(sucesores(0)))]
+        while pila:
+            x, hijos = pila[-1]
+            for y in hijos:
+                if semi[y] == 0:
+                    padre[y] = x
+                    vertice.append(y)
+                    semi[y] = len(vertice) - 1
+                    pila.append((y, iter(sucesores(y))))
+                    break
+            else:
+                pila.pop()
+
+        ancestro = [-1] * total
+        etiqueta = list(range(total))
+        idom = [-1] * total
+        cubeta = [[] for _ in range(total)]
+
+        def evaluar(v):
+            if ancestro[v] < 0:
+                return v
+            camino = []
+            x = v
+            while ancestro[ancestro[x]] >= 0:
+                camino.append(x)
+                x = ancestro[x]
+            while camino:
+                y = camino.pop()
+                a = ancestro[y]
+                if semi[etiqueta[a]] < semi[etiqueta[y]]:
+                    etiqueta[y] = etiqueta[a]
+                ancestro[y] = ancestro[a]
+            return etiqueta[v]
+
+        for i in range(len(vertice) - 1, 1, -1):
+            w = vertice[i]
+            for v in predecesores(w):
+                if semi[v]:
+                    u = evaluar(v)
+                    if semi[u] < semi[w]:
+                        semi[w] = semi[u]
+            cubeta[vertice[semi[w]]].append(w)
+            p = padre[w]
+            ancestro[w] = p
+            for v in cubeta[p]:
+                u = evaluar(v)
+                idom[v] = u if semi[u] < semi[v] else p
+            cubeta[p] = []
+
+        for i in range(2, len(vertice)):
+            w = vertice[i]
+            if idom[w] != vertice[semi[w]]:
+                idom[w] = idom[idom[w]]
+        return idom
+
+    # Recorre el arbol de dominadores en preorden y guarda, para cada nodo, el rango de casas de su
+    # subarbol en la lista de casas en ese orden. Asi las casas que dependen de un elemento son un corte.
+    def _ordenar_casas(self):
+        n = self.compacta.num_nodos
+        idom = self.idom
+        hijos = [[] for _ in range(len(idom))]
+        for x in range(1, len(idom)):
+            if idom[x] >= 0:
+                hijos[idom[x]].append(x)
+
+        es_casa = [tipo == TIPO_CASA for tipo in self.compacta.tipo.tolist()]
+        self.casas = []
+        self.primera_casa = [0] * len(idom)
+        self.fin_casas = [0] * len(idom)
+        pila = [(0, False)]
+        while pila:
+            x, cerrado = pila.pop()
+            if cerrado:
+                self.fin_casas[x] = len(self.casas)
+                continue
+            self.primera_casa[x] = len(self.casas)
+            if 1 <= x <= n and es_casa[x - 1]:
+                self.casas.append(x - 1)
+            pila.append((x, True))
+            pila.extend((hijo, False) for hijo in reversed(hijos[x]))
+
+    def _id_nodo(self, nodo):
+        i = self.compacta.indice.get(nodo)
+        if i is None:
+            raise ValueError(f"El nodo {nodo} no existe en la red.")
+        return i + 1
+
+    def _id_tuberia(self, nodo1, nodo2):
+        arista = self.compacta.id_arista(nodo1, nodo2)
+        if arista is None:
+            raise ValueError(f"No existe una tubería entre {nodo1} y {nodo2}.")
+        return 1 + self.compacta.num_nodos + arista
+
+    def _casas_de(self, x, incluir_propio=True):
+        if self.idom[x] < 0:
+            return []
+        desde = self.primera_casa[x]
+        if not incluir_propio and x <= self.compacta.num_nodos and self.compacta.tipo[x - 1] == TIPO_CASA:
+            desde += 1
+        nombres = self.compacta.nombres
+        return [nombres[casa] for casa in self.casas[desde:self.fin_casas[x]]]
+
+    # Nodos y tuberías por los que pasa toda el agua que llega a la casa, de aguas arriba hacia aguas
+    # abajo. Devuelve None si la casa no recibe agua de ningun tanque.
+    def puntos_unicos_de_falla(self, casa):
+        x = self._id_nodo(casa)
+        if self.idom[x] < 0:
+            return None
+        compacta = self.compacta
+        n = compacta.num_nodos
+        nodos = []
+        tuberias = []
+        x = self.idom[x]
+        while x > 0:
+            if x <= n:
+                nodos.append(compacta.nombres[x - 1])
+            else:
+                arista = x - 1 - n
+                tuberias.append((compacta.nombres[compacta.origen[arista]], compacta.nombres[compacta.destino[arista]]))
+            x = self.idom[x]
+        return {"nodos": nodos[::-1], "tuberias": tuberias[::-1]}
+
+    # Casas que se quedan sin agua si se corta la tubería nodo1 -> nodo2
+    def casas_dependientes_de_tuberia(self, nodo1, nodo2):
+        return self._casas_de(self._id_tuberia(nodo1, nodo2))
+
+    # Casas que se quedan sin agua si falla el nodo (sin contar al nodo mismo)
+    def casas_dependientes_de_nodo(self, nodo):
+        return self._casas_de(self._id_nodo(nodo), incluir_propio=False)
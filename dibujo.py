@@ -0,0 +1,418 @@
+import networkx as nx #posiciones de los nodos
+import numpy as np #coordenadas de nodos y tuberías en arreglos
+import matplotlib.pyplot as plt #para leer los iconos
+from matplotlib.collections import LineCollection #todas las tuberías en un solo artista
+from matplotlib.offsetbox import OffsetImage, AnnotationBbox
+from matplotlib.transforms import Bbox
+
+from red_compacta import TIPO_CASA
+
+ICONOS = {"casa": "casa.png", "tanque": "tanque.png"}
+
+_imagenes = {} #ruta -> imagen ya leida (None si no se encontro), se lee una sola vez por proceso
+
+
+def cargar_icono(ruta):
+    if ruta not in _imagenes:
+        try:
+            _imagenes[ruta] = plt.imread(ruta)
+        except FileNotFoundError:
+            print(f"No se encontró la imagen en {ruta}.")
+            _imagenes[ruta] = None
+    return _imagenes[ruta]
+
+
+def color_tuberia(datos, resaltada=False):
+    if resaltada:
+        return "green"
+    obstruccion = datos.get("obstruccion", 0)
+    if obstruccion == -1:
+        return "red"
+    if 0 < obstruccion <= 100:
+        return "orange"
+    return "blue"
+
+
+def etiqueta_nodo(datos):
+    if datos["tipo"] == "tanque":
+        return f"Nivel: {datos['nivel']}/{datos['capacidad']}L"
+    return f"Demanda: {datos['demanda']}L/s"
+
+
+# Dibujo de una RedDeAgua sobre unos ejes de matplotlib que se actualiza por partes:
+#
+# - si cambian los nodos de la red se recalculan las posiciones y se vuelve a dibujar todo;
+# - si solo cambian las tuberías (misma lista de nodos) se rearman las tuberías y sus etiquetas, sin
+#   tocar los iconos ni los textos de los nodos;
+# - si no cambia la topologia (obstrucciones, capacidades, niveles, rutas resaltadas) solo se cambian los
+#   colores de las tuberías y los textos que son distintos a los que ya estaban dibujados.
+#
+# Las tuberías son un solo LineCollection (con las flechas del sentido en un solo quiver) y los iconos se
+# leen del disco una sola vez.
+#
+# Para que pintar tambien sea proporcional al cambio, el dibujo se guarda en dos capas (blitting): el fondo
+# estatico (iconos y nombres) y el fondo con los textos de demanda, nivel y capacidad. Las tuberías van
+# encima y se pintan siempre, son solo dos artistas. Si cambia un texto se restaura el fondo estatico en su
+# zona y se vuelven a pintar solo los textos que tocan esa zona.
+#
+# Nivel de detalle: solo se dibujan los nodos que caen en la ventana visible (y las tuberías que los tocan).
+# Si en la ventana hay mas de MAX_NODOS_DETALLE nodos, en lugar de iconos y textos se muestra un resumen:
+# la ventana se divide en CELDAS_RESUMEN x CELDAS_RESUMEN zonas, cada zona es un circulo (tamaño segun sus
+# nodos, color segun la fraccion de su demanda sin cubrir) con una insignia de demanda total, demanda sin
+# cubrir y llenado de sus tanques, y las tuberías entre zonas se agrupan en una linea por par de zonas.
+# Con la rueda del mouse se acerca o aleja y arrastrando se mueve la ventana (ver activar_navegacion).
+class DibujoRed:
+    # Si cambian mas textos que esta fraccion, se pinta todo de nuevo en lugar de por zonas
+    FRACCION_REPINTAR_TODO = 0.2
+    MAX_NODOS_DETALLE = 150
+    CELDAS_RESUMEN = 16
+    MAX_INSIGNIAS = 40 #las demas zonas solo muestran su circulo
+
+    def __init__(self, axes):
+        self.axes = axes
+        self._todos = [] #todos los nodos de la red, en el orden de la red compacta
+        self._coordenadas = np.zeros((0, 2)) #posicion de cada nodo de _todos
+        self._vista = None #ventana visible (x0, x1, y0, y1)
+        self._vista_dibujada = None
+        self._modo = None #"detalle" o "resumen"
+        self._resaltadas = ()
+        self._arrastre = None #(x, y) en pixeles y ventana al empezar a arrastrar
+        self._fondo_estatico = None #capa con iconos y nombres, capturada en cada dibujo completo
+        self._fondo = None #capa anterior mas los textos que cambian
+        self._textos = [] #textos que cambian, en el orden de _extensiones
+        self._extensiones = np.zeros((0, 4)) #caja en pixeles (x0, y0, x1, y1) de cada texto pintado
+        self.posiciones = {} #nodo -> (x, y), se conservan mientras no cambien los nodos
+        self._red = None
+        self._version = None #version_topologia de la red dibujada
+        self._nodos = None #nodos dibujados en detalle, en el orden de la red
+        self._aristas = [] #tuberías dibujadas, en el orden de la red
+        self._lineas = None
+        self._flechas = None
+        self._textos_nodos = {} #nodo -> Text con la demanda o el nivel
+        self._textos_aristas = {} #(nodo1, nodo2) -> Text con la capacidad
+        self._colores = [] #ultimo color de cada tubería, en el orden de _aristas
+        axes.figure.canvas.mpl_connect("draw_event", self._al_dibujar)
+
+    # Dibuja la red rehaciendo solo lo que cambio desde el dibujo anterior. Devuelve que se rehizo:
+    # "todo", "tuberias", "atributos" o "resumen".
+    def dibujar(self, red, resaltadas=()):
+        self._resaltadas = resaltadas
+        topologia_cambiada = red is not self._red or red.version_topologia != self._version
+        if topologia_cambiada:
+            todos = list(red.grafo.nodes)
+            if red is not self._red or todos != self._todos:
+                self._ubicar_nodos(red.grafo, todos)
+            self._red = red
+            self._version = red.version_topologia
+        return self._mostrar(topologia_cambiada)
+
+    # Cambia la ventana visible y vuelve a dibujar lo que queda dentro
+    def ver(self, x0, x1, y0, y1):
+        self._vista = (x0, x1, y0, y1)
+        if self._red is not None:
+            self._mostrar(False)
+
+    # Acercar y alejar con la rueda del mouse (alrededor del cursor) y mover la ventana arrastrando con el
+    # boton izquierdo. Al soltar se dibuja solo lo que queda en la nueva ventana.
+    def activar_navegacion(self):
+        canvas = self.axes.figure.canvas
+        canvas.mpl_connect("scroll_event", self._al_girar_rueda)
+        canvas.mpl_connect("button_press_event", self._al_presionar)
+        canvas.mpl_connect("button_release_event", self._al_soltar)
+
+    def _al_girar_rueda(self, evento):
+        if evento.inaxes is not self.axes or self._vista is None:
+            return
+        factor = 0.8 if evento.button == "up" else 1.25
+        x0, x1, y0, y1 = self._vista
+        x, y = evento.xdata, evento.ydata
+        self.ver(x + (x0 - x) * factor, x + (x1 - x) * factor, y + (y0 - y) * factor, y + (y1 - y) * factor)
+
+    def _al_presionar(self, evento):
+        if evento.inaxes is self.axes and evento.button == 1 and self._vista is not None:
+            self._arrastre = (evento.x, evento.y, self._vista)
+
+    def _al_soltar(self, evento):
+        if self._arrastre is None:
+            return
+        x, y, (x0, x1, y0, y1) = self._arrastre
+        self._arrastre = None
+        dx = (evento.x - x) * (x1 - x0) / self.axes.bbox.width
+        dy = (evento.y - y) * (y1 - y0) / self.axes.bbox.height
+        if dx or dy:
+            self.ver(x0 - dx, x1 - dx, y0 - dy, y1 - dy)
+
+    # Calcula la posicion de todos los nodos (sus coordenadas x, y si todos las tienen, si no en circulo) y
+    # ajusta la ventana para que se vea toda la red
+    def _ubicar_nodos(self, grafo, todos):
+        self._todos = todos
+        nodos = grafo.nodes
+        if todos and all("x" in nodos[nodo] and "y" in nodos[nodo] for nodo in todos):
+            # Con coordenadas en el json se usan esas, llevadas a [-1, 1] sin deformar el plano
+            coordenadas = np.array([(nodos[nodo]["x"], nodos[nodo]["y"]) for nodo in todos], dtype=np.float64)
+            centro = (coordenadas.min(axis=0) + coordenadas.max(axis=0)) / 2
+            escala = max((coordenadas.max(axis=0) - coordenadas.min(axis=0)).max() / 2, 1e-12)
+            self._coordenadas = (coordenadas - centro) / escala
+            self.posiciones = {nodo: tuple(xy) for nodo, xy in zip(todos, self._coordenadas.tolist())}
+        else:
+            self.posiciones = {nodo: tuple(xy) for nodo, xy in nx.circular_layout(grafo).items()} if todos else {}
+            self._coordenadas = np.array([self.posiciones[nodo] for nodo in todos]).reshape(-1, 2)
+        if todos:
+            minimo = self._coordenadas.min(axis=0) - 0.25
+            maximo = self._coordenadas.max(axis=0) + 0.25
+            self._vista = (minimo[0], maximo[0], minimo[1], maximo[1])
+        else:
+            self._vista = (-1, 1, -1, 1)
+
+    # Dibuja la ventana visible: el detalle de sus nodos o, si son demasiados, el resumen por zonas
+    def _mostrar(self, topologia_cambiada):
+        grafo = self._red.grafo
+        x0, x1, y0, y1 = self._vista
+        coordenadas = self._coordenadas
+        visibles = np.flatnonzero(
+            (coordenadas[:, 0] >= x0) & (coordenadas[:, 0] <= x1) & (coordenadas[:, 1] >= y0) & (coordenadas[:, 1] <= y1)
+        )
+        if len(visibles) > self.MAX_NODOS_DETALLE:
+            self._dibujar_resumen(visibles)
+            return "resumen"
+
+        nodos = [self._todos[i] for i in visibles.tolist()]
+        if self._modo != "detalle" or nodos != self._nodos or self._vista != self._vista_dibujada:
+            self._dibujar_nodos(grafo, nodos)
+            self._dibujar_tuberias(grafo)
+            rehecho = "todo"
+        elif topologia_cambiada:
+            self._dibujar_tuberias(grafo)
+            rehecho = "tuberias"
+        else:
+            rehecho = "atributos"
+        colores_cambiados, textos_cambiados = self._actualizar(grafo, self._resaltadas)
+
+        canvas = self.axes.figure.canvas
+        if rehecho != "atributos" or self._fondo is None or len(textos_cambiados) > self.FRACCION_REPINTAR_TODO * len(self._textos):
+            canvas.draw()
+        elif colores_cambiados or textos_cambiados:
+            self._repintar(textos_cambiados)
+        return rehecho
+
+    # Despues de cada dibujo completo (el de dibujar o uno de Qt al cambiar el tamaño de la ventana), que
+    # no incluye los artistas animados, se capturan las capas y se pintan los textos y las tuberías encima
+    def _al_dibujar(self, evento):
+        canvas = self.axes.figure.canvas
+        renderer = canvas.get_renderer()
+        self._fondo_estatico = canvas.copy_from_bbox(self.axes.bbox)
+        self._textos = list(self._textos_nodos.values()) + list(self._textos_aristas.values())
+        self._extensiones = np.zeros((len(self._textos), 4))
+        for i, texto in enumerate(self._textos):
+            self.axes.draw_artist(texto)
+            self._extensiones[i] = texto.get_window_extent(renderer).extents
+        self._fondo = canvas.copy_from_bbox(self.axes.bbox)
+        self._pintar_tuberias()
+
+    def _pintar_tuberias(self):
+        if self._lineas is not None:
+            self.axes.draw_artist(self._lineas)
+            self.axes.draw_artist(self._flechas)
+
+    # Repinta solo lo que cambio sobre las capas guardadas. `textos_cambiados` son pares (posicion del
+    # texto en _textos, caja antes del cambio).
+    def _repintar(self, textos_cambiados):
+        canvas = self.axes.figure.canvas
+        renderer = canvas.get_renderer()
+        canvas.restore_region(self._fondo)
+        if textos_cambiados:
+            alto = self.axes.figure.bbox.height
+            origen = self._fondo_estatico.get_extents()[:2]
+            zonas = []
+            for i, anterior in textos_cambiados:
+                nueva = self._textos[i].get_window_extent(renderer).extents
+                self._extensiones[i] = nueva
+                x0, y0 = np.floor(np.minimum(anterior[:2], nueva[:2])) - 1
+                x1, y1 = np.ceil(np.maximum(anterior[2:], nueva[2:])) + 1
+                zonas.append((x0, y0, x1, y1))
+                # La caja de restore_region va en pixeles con el origen arriba a la izquierda
+                canvas.restore_region(self._fondo_estatico, bbox=(x0, alto - y1, x1, alto - y0), xy=origen)
+
+            # Se vuelven a pintar, recortados a cada zona, todos los textos que la tocan
+            extensiones = self._extensiones
+            for zona in zonas:
+                tocan = np.flatnonzero(
+                    (extensiones[:, 0] < zona[2]) & (extensiones[:, 2] > zona[0]) &
+                    (extensiones[:, 1] < zona[3]) & (extensiones[:, 3] > zona[1])
+                )
+                recorte = Bbox.from_extents(*zona)
+                for i in tocan.tolist():
+                    texto = self._textos[i]
+                    caja, recortado = texto.get_clip_box(), texto.get_clip_on()
+                    texto.set_clip_box(recorte)
+                    texto.set_clip_on(True)
+                    self.axes.draw_artist(texto)
+                    texto.set_clip_box(caja)
+                    texto.set_clip_on(recortado)
+            self._fondo = canvas.copy_from_bbox(self.axes.bbox)
+        self._pintar_tuberias()
+        canvas.blit(self.axes.bbox)
+
+    # Limpia los ejes y los deja con la ventana visible
+    def _limpiar(self, modo):
+        axes = self.axes
+        axes.clear()
+        axes.set_axis_off()
+        x0, x1, y0, y1 = self._vista
+        axes.set_xlim(x0, x1)
+        axes.set_ylim(y0, y1)
+        self._modo = modo
+        self._vista_dibujada = self._vista
+        self._nodos = None
+        self._aristas = []
+        self._colores = []
+        self._fondo = None
+        self._textos = []
+        self._lineas = self._flechas = None
+        self._textos_nodos = {}
+        self._textos_aristas = {}
+
+    def _dibujar_nodos(self, grafo, nodos):
+        axes = self.axes
+        self._limpiar("detalle")
+        self._nodos = nodos
+
+        for nodo in nodos:
+            x, y = self.posiciones[nodo]
+            imagen = cargar_icono(ICONOS[grafo.nodes[nodo]["tipo"]])
+            if imagen is not None:
+                axes.add_artist(AnnotationBbox(OffsetImage(imagen, zoom=0.1), (x, y), frameon=False, zorder=3))
+            # Nombre debajo de cada nodo y demanda o nivel encima
+            axes.text(x, y - 0.15, nodo, fontsize=10, ha='center', zorder=4)
+            self._textos_nodos[nodo] = axes.text(x, y + 0.1, "", fontsize=10, ha='center', va='center', zorder=4, animated=True)
+
+    # Resumen por zonas de los nodos visibles (ids de la red compacta, que sigue el orden de la red)
+    def _dibujar_resumen(self, visibles):
+        axes = self.axes
+        self._limpiar("resumen")
+        compacta = self._red.red_compacta()
+        n = compacta.num_nodos
+        x0, x1, y0, y1 = self._vista
+        lado = self.CELDAS_RESUMEN
+        zonas = lado * lado
+
+        coordenadas = self._coordenadas[visibles]
+        columna = np.clip(((coordenadas[:, 0] - x0) / (x1 - x0) * lado).astype(np.int64), 0, lado - 1)
+        fila = np.clip(((coordenadas[:, 1] - y0) / (y1 - y0) * lado).astype(np.int64), 0, lado - 1)
+        zona = np.full(n, -1, dtype=np.int64)
+        zona[visibles] = fila * lado + columna
+
+        # Demanda sin cubrir de cada casa: toda si no esta conectada, si no lo que le falta a su flujo
+        casas, conectadas, flujo_recibido, _ = compacta.verificar_suministro()
+        sin_cubrir = np.zeros(n)
+        sin_cubrir[casas] = np.maximum(compacta.demanda[casas] - np.where(conectadas, flujo_recibido, 0), 0)
+
+        zona_visible = zona[visibles]
+
+        def por_zona(valores):
+            return np.bincount(zona_visible, weights=valores[visibles], minlength=zonas)
+
+        cantidad = np.bincount(zona_visible, minlength=zonas)
+        ocupadas = np.flatnonzero(cantidad)
+        casas_zona = por_zona((compacta.tipo == TIPO_CASA).astype(np.float64))
+        demanda = por_zona(compacta.demanda)
+        insatisfecha = por_zona(sin_cubrir)
+        nivel = por_zona(compacta.nivel)
+        capacidad = por_zona(compacta.capacidad)
+        centro = np.zeros((zonas, 2))
+        centro[:, 0] = por_zona(self._coordenadas[:, 0]) / np.maximum(cantidad, 1)
+        centro[:, 1] = por_zona(self._coordenadas[:, 1]) / np.maximum(cantidad, 1)
+
+        # Una linea por cada par de zonas unidas por alguna tubería, mas gruesa cuantas mas tuberías tenga
+        a = zona[compacta.origen]
+        b = zona[compacta.destino]
+        entre_zonas = (a >= 0) & (b >= 0) & (a != b)
+        pares, tuberias = np.unique(np.minimum(a, b)[entre_zonas] * zonas + np.maximum(a, b)[entre_zonas], return_counts=True)
+        if len(pares):
+            segmentos = np.stack([centro[pares // zonas], centro[pares % zonas]], axis=1)
+            axes.add_collection(LineCollection(segmentos, linewidths=0.3 + 0.5 * np.log1p(tuberias), colors="steelblue", alpha=0.3, zorder=1))
+
+        fraccion = insatisfecha[ocupadas] / np.maximum(demanda[ocupadas], 1e-9)
+        axes.scatter(
+            centro[ocupadas, 0], centro[ocupadas, 1], s=40 + 400 * np.sqrt(cantidad[ocupadas] / cantidad.max()),
+            c=fraccion, cmap="RdYlGn_r", vmin=0, vmax=1, edgecolors="black", linewidths=0.5, zorder=3,
+        )
+        # Insignias de las zonas con mas nodos, saltando las que taparian a una ya puesta (~120x40 pixeles)
+        ancho = 120 * (x1 - x0) / axes.bbox.width
+        alto = 40 * (y1 - y0) / axes.bbox.height
+        puestas = []
+        for i in ocupadas[np.argsort(-cantidad[ocupadas], kind="stable")].tolist():
+            if len(puestas) == self.MAX_INSIGNIAS:
+                break
+            x, y = centro[i]
+            if any(abs(x - px) < ancho and abs(y - py) < alto for px, py in puestas):
+                continue
+            puestas.append((x, y))
+            lineas = [f"{int(casas_zona[i])} casas, {demanda[i]:.0f} L/s"]
+            if insatisfecha[i] > 0:
+                lineas.append(f"sin cubrir: {insatisfecha[i]:.0f} L/s")
+            if capacidad[i] > 0:
+                lineas.append(f"tanques: {nivel[i] / capacidad[i]:.0%}")
+            axes.text(
+                x, y, "\n".join(lineas), fontsize=7, ha='center', va='center', zorder=4,
+                bbox=dict(boxstyle="round", facecolor="white", alpha=0.8, linewidth=0.5),
+            )
+        axes.figure.canvas.draw()
+
+    def _dibujar_tuberias(self, grafo):
+        for artista in (self._lineas, self._flechas, *self._textos_aristas.values()):
+            if artista is not None:
+                artista.remove()
+        # Tuberías que salen de los nodos dibujados y las que les llegan desde fuera de la ventana
+        dibujados = set(self._nodos)
+        self._aristas = [(u, v) for u in self._nodos for v in grafo.adj[u]]
+        self._aristas += [(u, v) for v in self._nodos for u in grafo.pred[v] if u not in dibujados]
+        self._fondo = None
+        self._textos = []
+        self._colores = []
+        self._textos_aristas = {}
+        self._lineas = self._flechas = None
+        if not self._aristas:
+            return
+
+        posiciones = self.posiciones
+        origen = np.array([posiciones[u] for u, _ in self._aristas])
+        destino = np.array([posiciones[v] for _, v in self._aristas])
+        self._lineas = LineCollection(np.stack([origen, destino], axis=1), linewidths=1, zorder=1, animated=True)
+        self.axes.add_collection(self._lineas)
+
+        # Una flecha corta en la mitad de cada tubería indica el sentido del agua
+        direccion = destino - origen
+        largo = np.hypot(direccion[:, 0], direccion[:, 1])
+        direccion = direccion / np.where(largo > 0, largo, 1)[:, None]
+        medio = (origen + destino) / 2
+        # Flechas de tamaño fijo en pixeles (10 de largo), sin importar el zoom ni el largo de la tubería
+        self._flechas = self.axes.quiver(
+            medio[:, 0], medio[:, 1], direccion[:, 0], direccion[:, 1], angles='xy', scale_units='dots', scale=0.1,
+            units='dots', pivot='mid', width=1.5, headwidth=5, headlength=6, headaxislength=5, zorder=2, animated=True,
+        )
+        for arista, (x, y) in zip(self._aristas, medio.tolist()):
+            self._textos_aristas[arista] = self.axes.text(x, y, "", fontsize=8, ha='center', va='center', zorder=2, animated=True)
+
+    # Cambia los colores y los textos que no coinciden con la red. Devuelve si cambiaron los colores y,
+    # para cada texto cambiado, su posicion en _textos y su caja anterior (si ya estaba pintado).
+    def _actualizar(self, grafo, resaltadas):
+        adyacencia = grafo.adj
+        colores = [color_tuberia(adyacencia[u][v], (u, v) in resaltadas) for u, v in self._aristas]
+        colores_cambiados = colores != self._colores
+        if colores_cambiados:
+            self._colores = colores
+            self._lineas.set_color(colores)
+            self._flechas.set_color(colores)
+
+        nodos = grafo.nodes
+        nuevos = [etiqueta_nodo(nodos[nodo]) for nodo in self._textos_nodos]
+        nuevos += [f"{adyacencia[u][v]['capacidad_flujo']:g}" for u, v in self._textos_aristas]
+        pintados = bool(self._textos) #si no, los textos son nuevos y todavia no se pintaron
+        textos = self._textos if pintados else list(self._textos_nodos.values()) + list(self._textos_aristas.values())
+        textos_cambiados = []
+        for i, (texto, nuevo) in enumerate(zip(textos, nuevos)):
+            if texto.get_text() != nuevo:
+                textos_cambiados.append((i, self._extensiones[i].copy() if pintados else None))
+                texto.set_text(nuevo)
+        return colores_cambiados, textos_cambiados
@@ -0,0 +1,238 @@
+import heapq #para recorrer la region afectada en el mismo orden que el recorrido BFS completo
+from collections import deque #cola FIFO del recorrido completo
+
+
+# Mantiene el resultado de RedDeAgua.calcular_distribucion_flujo y lo actualiza solo en la parte de la red
+# que queda aguas abajo de cada cambio (tubería agregada, eliminada, obstruida o invertida, o nivel de un
+# tanque modificado).
+#
+# El recorrido de referencia procesa los nodos en orden BFS desde los tanques y el flujo que recibe cada
+# nodo depende de cuales de sus predecesores se procesaron antes. Ese orden se guarda como una clave por
+# nodo: (0, None, i) para el i-esimo tanque y (nivel, padre BFS, orden de la tubería) para el resto.
+# Dos claves se comparan con _antes, que sube por las claves de los padres hasta el primer ancestro comun
+# (ver _antes), asi cada clave tiene tamaño fijo y no se guardan caminos completos.
+class DistribucionIncremental:
+    def __init__(self, grafo):
+        self.grafo = grafo
+        self.valido = False #False obliga a un recorrido completo en la siguiente consulta
+        self.clave = {} #nodo -> clave de orden BFS, solo para los nodos alcanzados desde un tanque
+        self.sobrante = {} #nodo -> flujo que le quedaba al procesarlo, despues de cubrir su demanda
+        self.flujo = {} #nodo -> flujo disponible, igual al resultado de calcular_distribucion_flujo
+        self.orden_arista = {} #(u, v) -> numero que crece con la posicion de la tubería en la adyacencia de u
+        self.ultima_region = set() #nodos recalculados en la ultima actualizacion
+        self._contador = 0
+        self._origenes = set() #nodos desde los que hay que recalcular todo lo que queda aguas abajo
+        self._extremos = set() #nodos a los que solo cambia lo que envian por una tubería
+
+    # Devuelve el flujo disponible por nodo, actualizando antes lo que haya quedado pendiente.
+    # El diccionario es el estado interno del motor y no debe modificarse.
+    def resultado(self):
+        if not self.valido:
+            self.recalcular_todo()
+        elif self._origenes or self._extremos:
+            self._actualizar()
+        return self.flujo
+
+    def invalidar(self):
+        self.valido = False
+        self._origenes.clear()
+        self._extremos.clear()
+
+    def arista_agregada(self, nodo1, nodo2):
+        if self.valido:
+            if (nodo1, nodo2) not in self.orden_arista:
+                # networkx agrega la tubería al final de la adyacencia de nodo1
+                self.orden_arista[(nodo1, nodo2)] = self._contador
+                self._contador += 1
+            self.arista_modificada(nodo1, nodo2)
+
+    def arista_modificada(self, nodo1, nodo2):
+        if self.valido:
+            self._origenes.add(nodo2)
+            self._extremos.add(nodo1)
+
+    def arista_eliminada(self, nodo1, nodo2):
+        if self.valido:
+            self.orden_arista.pop((nodo1, nodo2), None)
+            self.arista_modificada(nodo1, nodo2)
+
+    def nivel_modificado(self, tanque):
+        if self.valido:
+            self._origenes.add(tanque)
+
+    def nodo_agregado(self, nodo):
+        if not self.valido:
+            return
+        if self.grafo.nodes[nodo]["tipo"] == "tanque":
+            # Un tanque nuevo cambia el orden inicial de la cola, se recalcula todo
+            self.invalidar()
+        else:
+            self.flujo[nodo] = 0
+
+    def nodo_eliminado(self, nodo):
+        self.invalidar()
+
+    # Recorrido completo, identico a calcular_distribucion_flujo, que ademas guarda el orden de
+    # procesamiento y el sobrante de cada nodo para las actualizaciones posteriores.
+    def recalcular_todo(self):
+        grafo = self.grafo
+        nodos = grafo.nodes
+        adyacencia = grafo.adj
+
+        orden_arista = {}
+        for u, vecinos in adyacencia.items():
+            for v in vecinos:
+                orden_arista[(u, v)] = len(orden_arista)
+
+        clave = {}
+        sobrante = {}
+        flujo = dict.fromkeys(grafo, 0)
+        tanques = [nodo for nodo, data in nodos(data=True) if data["tipo"] == "tanque"]
+        for i, tanque in enumerate(tanques):
+            clave[tanque] = (0, None, i)
+            flujo[tanque] = nodos[tanque]["nivel"]
+
+        visitados = set()
+        cola = deque(tanques)
+        while cola:
+            nodo_actual = cola.popleft()
+            if nodo_actual in visitados:
+                continue
+            visitados.add(nodo_actual)
+
+            data = nodos[nodo_actual]
+            if data["tipo"] == "casa":
+                flujo[nodo_actual] -= min(flujo[nodo_actual], data["demanda"])
+            flujo_sobrante = flujo[nodo_actual]
+            sobrante[nodo_actual] = flujo_sobrante
+
+            nivel = clave[nodo_actual][0] + 1
+            for vecino, datos_arista in adyacencia[nodo_actual].items():
+                flujo_a_enviar = min(flujo_sobrante, datos_arista["capacidad_flujo"])
+                flujo[vecino] += flujo_a_enviar
+                flujo[nodo_actual] -= flujo_a_enviar
+                if vecino not in visitados:
+                    if vecino not in clave:
+                        clave[vecino] = (nivel, nodo_actual, orden_arista[(nodo_actual, vecino)])
+                    cola.append(vecino)
+
+        self.clave = clave
+        self.sobrante = sobrante
+        self.flujo = flujo
+        self.orden_arista = orden_arista
+        self._contador = len(orden_arista)
+        self._origenes.clear()
+        self._extremos.clear()
+        self.ultima_region = set(grafo)
+        self.valido = True
+
+    # Recalcula solo los nodos alcanzables desde los origenes pendientes. Fuera de esa region no cambia
+    # ni el orden de procesamiento ni el flujo de ningun nodo, salvo lo que envian los extremos de las
+    # tuberías modificadas.
+    def _actualizar(self):
+        grafo = self.grafo
+        nodos = grafo.nodes
+        adyacencia = grafo.adj
+        predecesores = grafo.pred
+        clave = self.clave
+        sobrante = self.sobrante
+
+        region = {nodo for nodo in self._origenes if nodo in nodos}
+        pila = list(region)
+        while pila:
+            nodo_actual = pila.pop()
+            for vecino in adyacencia[nodo_actual]:
+                if vecino not in region:
+                    region.add(vecino)
+                    pila.append(vecino)
+        extremos = {nodo for nodo in self._extremos if nodo in nodos and nodo not in region}
+        self._origenes.clear()
+        self._extremos.clear()
+
+        # Orden de procesamiento dentro de la region: se parte de los tanques de la region y de los
+        # predecesores de afuera, y se avanza siempre por la menor clave, como lo haria la cola BFS
+        candidatos = []
+        for nodo in region:
+            if nodos[nodo]["tipo"] == "tanque":
+                candidatos.append(_Candidato(self, clave[nodo], nodo))
+                continue
+            clave.pop(nodo, None)
+            for predecesor in predecesores[nodo]:
+                clave_predecesor = clave.get(predecesor)
+                if clave_predecesor is not None and predecesor not in region:
+                    candidatos.append(_Candidato(self, (clave_predecesor[0] + 1, predecesor, self.orden_arista[(predecesor, nodo)]), nodo))
+            sobrante.pop(nodo, None)
+        heapq.heapify(candidatos)
+
+        orden = []
+        procesados = set()
+        while candidatos:
+            candidato = heapq.heappop(candidatos)
+            nodo_actual = candidato.nodo
+            if nodo_actual in procesados:
+                continue
+            procesados.add(nodo_actual)
+            clave[nodo_actual] = candidato.clave
+            orden.append(nodo_actual)
+            nivel = candidato.clave[0] + 1
+            for vecino in adyacencia[nodo_actual]:
+                if vecino in region and vecino not in procesados and nodos[vecino]["tipo"] != "tanque":
+                    heapq.heappush(candidatos, _Candidato(self, (nivel, nodo_actual, self.orden_arista[(nodo_actual, vecino)]), vecino))
+
+        # Flujo con el que llega cada nodo: lo que le enviaron los predecesores procesados antes que el
+        for nodo in orden:
+            data = nodos[nodo]
+            clave_nodo = clave[nodo]
+            flujo_entrante = data["nivel"] if data["tipo"] == "tanque" else 0
+            for predecesor, datos_arista in predecesores[nodo].items():
+                clave_predecesor = clave.get(predecesor)
+                if clave_predecesor is not None and self._antes(clave_predecesor, clave_nodo):
+                    flujo_entrante += min(sobrante[predecesor], datos_arista["capacidad_flujo"])
+            if data["tipo"] == "casa":
+                flujo_entrante -= min(flujo_entrante, data["demanda"])
+            sobrante[nodo] = flujo_entrante
+
+        for nodo in region | extremos:
+            self.flujo[nodo] = self._flujo_final(nodo)
+        self.ultima_region = region
+
+    # Flujo que queda en el nodo al terminar el recorrido: su sobrante, menos lo que envia por cada
+    # tubería, mas lo que le llega de predecesores procesados despues que el
+    def _flujo_final(self, nodo):
+        clave_nodo = self.clave.get(nodo)
+        if clave_nodo is None:
+            return 0
+        flujo_sobrante = self.sobrante[nodo]
+        flujo = flujo_sobrante
+        for datos_arista in self.grafo.adj[nodo].values():
+            flujo -= min(flujo_sobrante, datos_arista["capacidad_flujo"])
+        for predecesor, datos_arista in self.grafo.pred[nodo].items():
+            clave_predecesor = self.clave.get(predecesor)
+            if clave_predecesor is not None and not self._antes(clave_predecesor, clave_nodo):
+                flujo += min(self.sobrante[predecesor], datos_arista["capacidad_flujo"])
+        return flujo
+
+    # True si el nodo con clave_a se procesa antes que el de clave_b en el recorrido BFS. Con el mismo
+    # nivel, decide el orden de los padres, asi que se sube por los dos caminos a la vez hasta el primer
+    # padre comun (o hasta los tanques) y ahi decide el orden de la tubería (o el del tanque). Es el mismo
+    # orden que compararia la cola, en un ciclo en lugar de una comparacion recursiva por cada nivel.
+    def _antes(self, clave_a, clave_b):
+        while clave_a[0] == clave_b[0]:
+            if clave_a[1] == clave_b[1]:
+                return clave_a[2] < clave_b[2]
+            clave_a = self.clave[clave_a[1]]
+            clave_b = self.clave[clave_b[1]]
+        return clave_a[0] < clave_b[0]
+
+
+# Nodo pendiente en el monticulo de _actualizar, ordenado por su clave BFS
+class _Candidato:
+    __slots__ = ("motor", "clave", "nodo")
+
+    def __init__(self, motor, clave, nodo):
+        self.motor = motor
+        self.clave = clave
+        self.nodo = nodo
+
+    def __lt__(self, otro):
+        return self.motor._antes(self.clave, otro.clave)
@@ -0,0 +1,214 @@
+import numpy as np #indice y heuristicas vectorizadas sobre miles de puntos
+
+from red_compacta import _expandir #posiciones de varias filas de un arreglo CSR
+
+
+# Indice espacial de una nube de puntos (x, y) sobre una grilla uniforme, en formato CSR como la red
+# compacta: los puntos se ordenan por celda y los de la celda c son orden[inicio[c]:inicio[c + 1]]. El
+# lado de las celdas se elige para que en cada una caigan unos `puntos_por_celda` puntos, tambien cuando
+# los puntos estan casi sobre una linea: ningun eje tiene mas celdas que las que llenarian los puntos.
+class IndiceEspacial:
+    MAX_PUNTOS_DIRECTO = 64 #con hasta esta cantidad de puntos, mas_cercanos compara contra todos
+
+    def __init__(self, puntos, puntos_por_celda=4):
+        self.puntos = np.asarray(puntos, dtype=np.float64).reshape(-1, 2)
+        self._x = np.ascontiguousarray(self.puntos[:, 0]) #las coordenadas por separado se leen mas rapido
+        self._y = np.ascontiguousarray(self.puntos[:, 1])
+        n = len(self.puntos)
+        if n:
+            self.minimo = self.puntos.min(axis=0)
+            extension = self.puntos.max(axis=0) - self.minimo
+        else:
+            self.minimo = np.zeros(2)
+            extension = np.zeros(2)
+        area = max(extension[0], 1e-12) * max(extension[1], 1e-12)
+        self.lado = max(
+            np.sqrt(area * puntos_por_celda / max(n, 1)), extension.max() * puntos_por_celda / max(n, 1),
+            extension.max() / 4096, 1e-12,
+        )
+        self.columnas, self.filas = (np.floor(extension / self.lado).astype(np.int64) + 1).tolist()
+
+        celda = self._celda(self.puntos)
+        self.orden = np.argsort(celda, kind="stable")
+        self.inicio = np.zeros(self.columnas * self.filas + 1, dtype=np.int64)
+        np.cumsum(np.bincount(celda, minlength=self.columnas * self.filas), out=self.inicio[1:])
+
+    def __len__(self):
+        return len(self.puntos)
+
+    def _columna_fila(self, puntos):
+        columna = np.clip(((puntos[:, 0] - self.minimo[0]) / self.lado).astype(np.int64), 0, self.columnas - 1)
+        fila = np.clip(((puntos[:, 1] - self.minimo[1]) / self.lado).astype(np.int64), 0, self.filas - 1)
+        return columna, fila
+
+    def _celda(self, puntos):
+        columna, fila = self._columna_fila(puntos)
+        return fila * self.columnas + columna
+
+    # Indices de los puntos a distancia <= radio de (x, y)
+    def en_radio(self, x, y, radio):
+        c0, f0 = self._columna_fila(np.array([[x - radio, y - radio]]))
+        c1, f1 = self._columna_fila(np.array([[x + radio, y + radio]]))
+        filas = np.arange(f0[0], f1[0] + 1)
+        celdas = (filas[:, None] * self.columnas + np.arange(c0[0], c1[0] + 1)).ravel()
+        candidatos = self.orden[_expandir(self.inicio, celdas)]
+        diferencia = self.puntos[candidatos] - (x, y)
+        return candidatos[np.einsum("ij,ij->i", diferencia, diferencia) <= radio * radio]
+
+    # Punto mas cercano a cada consulta: devuelve sus indices y las distancias. Se recorren anillos de
+    # celdas alrededor de la celda de cada consulta, todas las consultas a la vez, y una consulta queda
+    # resuelta cuando el mejor punto encontrado esta mas cerca que el borde del bloque de celdas ya
+    # recorrido (los lados del bloque que llegan al borde de la grilla no cuentan: afuera no hay puntos).
+    # Las consultas lejos de los puntos, que necesitarian un bloque con tantas celdas como la grilla, se
+    # comparan directamente con todos los puntos.
+    def mas_cercanos(self, consultas):
+        consultas = np.asarray(consultas, dtype=np.float64).reshape(-1, 2)
+        m = len(consultas)
+        mejor = np.full(m, -1, dtype=np.int64)
+        distancia = np.full(m, np.inf)
+        if m == 0 or len(self.puntos) == 0:
+            return mejor, distancia
+        columna, fila = self._columna_fila(consultas)
+
+        # Con pocos puntos en el indice es mas rapido comparar cada consulta con todos
+        if len(self.puntos) <= self.MAX_PUNTOS_DIRECTO:
+            mejor, distancia = self._comparar_con_todos(consultas)
+            return mejor, np.sqrt(distancia)
+
+        x = np.ascontiguousarray(consultas[:, 0])
+        y = np.ascontiguousarray(consultas[:, 1])
+        pendientes = np.arange(m)
+        anillo = 0
+        while pendientes.size:
+            desplazamientos = _anillo(anillo)
+            c = columna[pendientes][:, None] + desplazamientos[:, 0]
+            f = fila[pendientes][:, None] + desplazamientos[:, 1]
+            validas = (c >= 0) & (c < self.columnas) & (f >= 0) & (f < self.filas)
+            consulta, posicion = np.nonzero(validas)
+            celdas = f[consulta, posicion] * self.columnas + c[consulta, posicion]
+            cantidades = self.inicio[celdas + 1] - self.inicio[celdas]
+            # Los candidatos quedan agrupados por consulta (nonzero recorre fila por fila)
+            por_consulta = np.bincount(consulta, weights=cantidades, minlength=len(pendientes)).astype(np.int64)
+            con_candidatos = np.flatnonzero(por_consulta)
+            if con_candidatos.size:
+                candidatos = self.orden[_expandir(self.inicio, celdas)]
+                repetidas = np.repeat(pendientes, por_consulta)
+                dx = self._x[candidatos] - x[repetidas]
+                dy = self._y[candidatos] - y[repetidas]
+                d = dx * dx + dy * dy
+                comienzos = (np.cumsum(por_consulta) - por_consulta)[con_candidatos]
+                minimos = np.minimum.reduceat(d, comienzos)
+                # Posicion del minimo de cada grupo: la primera donde la distancia es igual al minimo
+                es_minimo = d == np.repeat(minimos, por_consulta[con_candidatos])
+                primeros = np.flatnonzero(es_minimo)
+                grupo = np.searchsorted(comienzos, primeros, side="right") - 1
+                primeros = primeros[np.r_[True, grupo[1:] != grupo[:-1]]]
+                q = pendientes[con_candidatos]
+                mejora = minimos < distancia[q]
+                distancia[q[mejora]] = minimos[mejora]
+                mejor[q[mejora]] = candidatos[primeros][mejora]
+            cota = self._borde_recorrido(x[pendientes], y[pendientes], columna[pendientes], fila[pendientes], anillo)
+            pendientes = pendientes[distancia[pendientes] > cota * cota]
+            anillo += 1
+            if pendientes.size and (2 * anillo + 1) ** 2 >= self.columnas * self.filas:
+                mejor[pendientes], distancia[pendientes] = self._comparar_con_todos(consultas[pendientes])
+                break
+        return mejor, np.sqrt(distancia)
+
+    # Punto mas cercano a cada consulta comparando con todos los puntos, por tandas. Devuelve los indices y
+    # las distancias al cuadrado (la raiz se saca solo al final).
+    def _comparar_con_todos(self, consultas):
+        m = len(consultas)
+        mejor = np.empty(m, dtype=np.int64)
+        distancia = np.empty(m)
+        tanda = max(1, 2 ** 22 // len(self.puntos))
+        for inicio in range(0, m, tanda):
+            diferencia = consultas[inicio:inicio + tanda, None, :] - self.puntos[None, :, :]
+            d = np.einsum("ijk,ijk->ij", diferencia, diferencia)
+            mejor[inicio:inicio + tanda] = d.argmin(axis=1)
+            distancia[inicio:inicio + tanda] = d[np.arange(len(d)), mejor[inicio:inicio + tanda]]
+        return mejor, distancia
+
+    # Distancia de cada consulta al borde del bloque de celdas a `anillo` celdas de la suya, sin contar
+    # los lados que ya llegan al borde de la grilla
+    def _borde_recorrido(self, x, y, columna, fila, anillo):
+        izquierda = np.where(columna - anillo > 0, x - (self.minimo[0] + (columna - anillo) * self.lado), np.inf)
+        derecha = np.where(columna + anillo < self.columnas - 1, self.minimo[0] + (columna + anillo + 1) * self.lado - x, np.inf)
+        abajo = np.where(fila - anillo > 0, y - (self.minimo[1] + (fila - anillo) * self.lado), np.inf)
+        arriba = np.where(fila + anillo < self.filas - 1, self.minimo[1] + (fila + anillo + 1) * self.lado - y, np.inf)
+        return np.minimum(np.minimum(izquierda, derecha), np.minimum(abajo, arriba))
+
+
+_anillos = {}
+
+
+#Desplazamientos (columna, fila) de las celdas que estan exactamente a `r` celdas de distancia
+def _anillo(r):
+    if r not in _anillos:
+        if r == 0:
+            _anillos[r] = np.zeros((1, 2), dtype=np.int64)
+        else:
+            lado = np.arange(-r, r + 1)
+            _anillos[r] = np.unique(np.concatenate([
+                np.stack([lado, np.full_like(lado, -r)], axis=1), np.stack([lado, np.full_like(lado, r)], axis=1),
+                np.stack([np.full_like(lado, -r), lado], axis=1), np.stack([np.full_like(lado, r), lado], axis=1),
+            ]), axis=0)
+    return _anillos[r]
+
+
+# k-centro con pesos (heuristica del punto mas lejano): el primer centro es el punto de mas peso y cada
+# centro nuevo es el punto con mayor distancia ponderada (peso x distancia a su centro mas cercano). Se
+# detiene al llegar a `k` centros o cuando todos los puntos quedan a menos de `radio` de algun centro.
+# Al agregar un centro solo se revisan, con el indice, los puntos que pueden quedar mas cerca de el.
+# Devuelve los indices de los puntos elegidos como centros, el centro asignado a cada punto (posicion en
+# la lista de centros) y la distancia de cada punto a su centro.
+def k_centro(indice, pesos, k=None, radio=None):
+    puntos = indice.puntos
+    n = len(puntos)
+    pesos = np.asarray(pesos, dtype=np.float64)
+    distancia = np.full(n, np.inf)
+    asignado = np.zeros(n, dtype=np.int64)
+    centros = []
+    siguiente = int(np.argmax(pesos)) if n else None
+    while n and (k is None or len(centros) < k):
+        x, y = puntos[siguiente]
+        alcance = distancia.max()
+        cercanos = indice.en_radio(x, y, alcance) if np.isfinite(alcance) else np.arange(n)
+        diferencia = puntos[cercanos] - (x, y)
+        d = np.hypot(diferencia[:, 0], diferencia[:, 1])
+        mejora = d < distancia[cercanos]
+        distancia[cercanos[mejora]] = d[mejora]
+        asignado[cercanos[mejora]] = len(centros)
+        centros.append(siguiente)
+        if radio is not None and distancia.max() <= radio:
+            break
+        siguiente = int(np.argmax(pesos * distancia))
+        if distancia[siguiente] == 0:
+            break #todos los puntos ya son centros
+    return np.array(centros, dtype=np.int64), asignado, distancia
+
+
+# k-mediana con pesos: parte de los centros de k_centro y alterna entre asignar cada punto al centro mas
+# cercano (con un indice espacial sobre los centros) y mover cada centro un paso de Weiszfeld hacia la
+# mediana geometrica ponderada de sus puntos, hasta que la suma de distancias ponderadas mejore menos que
+# `tolerancia` (relativa). El primer paso va al centroide ponderado: las semillas son puntos del conjunto
+# y, a distancia cero, su propio peso no las dejaria moverse. Devuelve las coordenadas de los centros, el
+# centro asignado a cada punto y la distancia de cada punto a su centro.
+def k_mediana(indice, pesos, k, iteraciones=15, tolerancia=0.005):
+    puntos = indice.puntos
+    pesos = np.asarray(pesos, dtype=np.float64)
+    semillas, asignado, distancia = k_centro(indice, pesos, k=k)
+    centros = puntos[semillas].copy()
+    minima = indice.lado * 1e-3 #distancia minima para el paso de Weiszfeld
+    costo = np.inf
+    for iteracion in range(iteraciones):
+        inverso = pesos if iteracion == 0 else pesos / np.maximum(distancia, minima)
+        total = np.bincount(asignado, weights=inverso, minlength=len(centros))
+        con_puntos = total > 0
+        centros[con_puntos, 0] = np.bincount(asignado, weights=inverso * puntos[:, 0], minlength=len(centros))[con_puntos] / total[con_puntos]
+        centros[con_puntos, 1] = np.bincount(asignado, weights=inverso * puntos[:, 1], minlength=len(centros))[con_puntos] / total[con_puntos]
+        asignado, distancia = IndiceEspacial(centros).mas_cercanos(puntos)
+        anterior, costo = costo, float(pesos @ distancia)
+        if costo >= anterior * (1 - tolerancia):
+            break
+    return centros, asignado, distancia
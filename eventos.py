@@ -0,0 +1,107 @@
+import time
+
+# Niveles de los eventos, de menor a mayor importancia
+DEPURACION = 10
+INFO = 20
+AVISO = 30
+ERROR = 40
+
+NOMBRES_NIVELES = {DEPURACION: "DEPURACION", INFO: "INFO", AVISO: "AVISO", ERROR: "ERROR"}
+
+# Tipos de eventos de la red: nivel y plantilla del mensaje. La plantilla se llena con los campos del
+# evento solo cuando alguien pide el mensaje.
+TIPOS = {
+    # Nodos
+    "casa_existente": (AVISO, "La casa {casa} ya existe en la red."),
+    "casa_eliminada": (INFO, "La casa {casa} ha sido eliminada."),
+    "casa_inexistente": (AVISO, "La casa {casa} no existe en la red."),
+    "tanque_existente": (AVISO, "El tanque {tanque} ya existe en la red."),
+    "tanque_eliminado": (INFO, "El tanque {tanque} ha sido eliminado."),
+    "tanque_inexistente": (AVISO, "El tanque {tanque} no existe en la red."),
+    "conexion_invalida": (AVISO, "El nodo {nodo} no existe. No se pudo agregar la conexión."),
+    "nodos_inexistentes": (AVISO, "Uno o ambos nodos no existen en la red."),
+    "nodo_no_es_tanque": (AVISO, "El nodo '{tanque}' no es un tanque o no existe en la red."),
+    "nodo_no_es_casa": (AVISO, "El nodo '{casa}' no es una casa o no existe en la red."),
+    # Tuberías
+    "tuberia_agregada": (INFO, "Tubería agregada de {nodo1} a {nodo2} con capacidad de flujo {capacidad_flujo} L/s."),
+    "tuberia_eliminada": (INFO, "La tubería entre {nodo1} y {nodo2} ha sido eliminada."),
+    "tuberia_inexistente": (AVISO, "No existe una tubería de {nodo1} a {nodo2}."),
+    "tuberia_actualizada": (INFO, "Tubería de {nodo1} a {nodo2} actualizada con nueva capacidad de {capacidad:.2f} L/s y obstrucción {obstruccion}%."),
+    "obstruccion_invalida": (AVISO, "Error: El porcentaje de obstrucción debe estar entre 0 y 100 o ser -1 para obstrucción total."),
+    "sentido_cambiado": (INFO, "Tubería cambiada de dirección: {nodo1} -> {nodo2} ahora es {nodo2} -> {nodo1}."),
+    # Flujo y niveles
+    "tanque_recibio_flujo": (DEPURACION, "El tanque {tanque} ha recibido {flujo} L/s. Nivel actual: {nivel} L."),
+    "tanque_recupero_agua": (INFO, "El tanque {tanque} recuperó {flujo:.2f} L de agua. Nuevo nivel: {nivel}L."),
+    "nivel_actualizado": (DEPURACION, "El nivel del tanque '{tanque}' se actualizó a {nivel}."),
+    "flujo_casa": (DEPURACION, "Casa {casa} - Demanda: {demanda}, Flujo Entrante: {flujo}"),
+    "flujo_utilizado": (DEPURACION, "Casa {casa} - Flujo Utilizado: {utilizado}, Sobrante: {sobrante}"),
+    "sobrante_devuelto": (DEPURACION, "Devolviendo {flujo} L/s al tanque {tanque}."),
+    "sobrante_distribuido": (DEPURACION, "Distribuyendo {flujo} L/s a {casa}. Flujo sobrante restante: {sobrante}"),
+    "demanda_satisfecha": (DEPURACION, "La demanda de la casa '{casa}' está satisfecha ({flujo}/{demanda})."),
+    "demanda_no_satisfecha": (AVISO, "La demanda de la casa '{casa}' NO está satisfecha ({flujo}/{demanda})."),
+    "demanda_no_suplida": (AVISO, "La demanda de la casa {casa} NO está siendo suplida adecuadamente."),
+    "flujo_insuficiente": (AVISO, "La casa {casa} no tiene suficiente flujo. Se recomienda redistribuir el flujo."),
+    # Archivos
+    "datos_cargados": (INFO, "Datos cargados desde {archivo}."),
+    "datos_recargados": (INFO, "Datos recargados desde {archivo}."),
+    "datos_recuperados": (INFO, "Datos recuperados desde {instantanea} y {aplicados} cambios de {diario}."),
+    "datos_guardados": (DEPURACION, "Datos guardados en {archivo}"),
+    "error_recarga": (ERROR, "Error al recargar JSON: {error}"),
+    "error_guardado": (ERROR, "Error al guardar en segundo plano: {error}"),
+}
+
+
+# Un evento de la red: tipo, nivel, campos y momento. El mensaje se arma recien cuando se pide (str o
+# mensaje()), asi los eventos que nadie muestra no se formatean.
+class Evento:
+    __slots__ = ("tipo", "nivel", "campos", "momento")
+
+    def __init__(self, tipo, nivel, campos):
+        self.tipo = tipo
+        self.nivel = nivel
+        self.campos = campos
+        self.momento = time.time()
+
+    def mensaje(self):
+        return TIPOS[self.tipo][1].format(**self.campos)
+
+    __str__ = mensaje
+
+    def __repr__(self):
+        return f"Evento({self.tipo!r}, {NOMBRES_NIVELES.get(self.nivel, self.nivel)}, {self.campos!r})"
+
+
+# Canal de eventos de una red. Sin suscriptores es falso, y los metodos de la red lo revisan antes de
+# emitir (`if self.eventos: self.eventos.emitir(...)`), asi que desactivado no arma ningun evento.
+# Cada suscriptor es una funcion que recibe el Evento y solo se llama con eventos de su nivel minimo o
+# mas. Se puede emitir desde cualquier hilo: la lista de suscriptores se reemplaza, nunca se modifica.
+class Eventos:
+    def __init__(self):
+        self._suscriptores = ()
+        self._nivel_minimo = ERROR + 1
+
+    def __bool__(self):
+        return bool(self._suscriptores)
+
+    def suscribir(self, funcion, nivel_minimo=INFO):
+        self._suscriptores = self._suscriptores + ((funcion, nivel_minimo),)
+        self._nivel_minimo = min(nivel for _, nivel in self._suscriptores)
+        return funcion
+
+    def desuscribir(self, funcion):
+        self._suscriptores = tuple(s for s in self._suscriptores if s[0] != funcion)
+        self._nivel_minimo = min((nivel for _, nivel in self._suscriptores), default=ERROR + 1)
+
+    def emitir(self, tipo, **campos):
+        nivel = TIPOS[tipo][0]
+        if nivel < self._nivel_minimo:
+            return
+        evento = Evento(tipo, nivel, campos)
+        for funcion, nivel_minimo in self._suscriptores:
+            if nivel >= nivel_minimo:
+                funcion(evento)
+
+
+#Suscriptor que escribe cada evento en la consola, como lo hacian los print de la red
+def imprimir_evento(evento):
+    print(evento.mensaje())
@@ -0,0 +1,193 @@
+from collections import deque #colas FIFO para los recorridos por niveles y los nodos activos
+
+import numpy as np #para armar la red residual a partir de los arreglos de la red compacta
+
+
+# Red residual en arreglos planos. Cada tubería i genera dos arcos: 2*i en el sentido de la tubería, con
+# su capacidad, y 2*i + 1 en sentido contrario, con capacidad 0. El arco opuesto de `a` es `a ^ 1`.
+# Los arcos que salen del nodo u son arcos[inicio[u]:inicio[u + 1]]. Con capacidades fraccionarias (las
+# obstrucciones parciales) el redondeo deja restos minimos: residuales y excesos por debajo de
+# `tolerancia` se tratan como cero.
+class RedResidual:
+    def __init__(self, num_nodos, origen, destino, capacidad):
+        origen = np.asarray(origen, dtype=np.int64)
+        destino = np.asarray(destino, dtype=np.int64)
+        capacidad = np.asarray(capacidad, dtype=np.float64)
+        m = len(origen)
+
+        cola = np.empty(2 * m, dtype=np.int64)
+        cola[0::2] = origen
+        cola[1::2] = destino
+        cabeza = np.empty(2 * m, dtype=np.int64)
+        cabeza[0::2] = destino
+        cabeza[1::2] = origen
+        residual = np.zeros(2 * m)
+        residual[0::2] = capacidad
+
+        inicio = np.zeros(num_nodos + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cola, minlength=num_nodos), out=inicio[1:])
+
+        self.num_nodos = num_nodos
+        self.num_tuberias = m
+        self.capacidad = capacidad
+        self.tolerancia = 1e-9 * max(float(capacidad.max()) if m else 0.0, 1.0)
+        self.arcos = np.argsort(cola, kind="stable").tolist()
+        self.inicio = inicio.tolist()
+        self.cabeza = cabeza.tolist()
+        self.residual = residual.tolist()
+
+    # Flujo que lleva cada tubería: su capacidad menos lo que queda en el arco directo
+    def flujos(self):
+        return self.capacidad - np.asarray(self.residual[0::2])
+
+    # Nodos alcanzables desde la fuente por arcos con capacidad residual: el lado fuente del corte minimo
+    def lado_fuente(self, fuente):
+        arcos, inicio, cabeza, residual = self.arcos, self.inicio, self.cabeza, self.residual
+        tolerancia = self.tolerancia
+        visitado = [False] * self.num_nodos
+        visitado[fuente] = True
+        cola = deque([fuente])
+        while cola:
+            u = cola.popleft()
+            for posicion in range(inicio[u], inicio[u + 1]):
+                arco = arcos[posicion]
+                v = cabeza[arco]
+                if residual[arco] > tolerancia and not visitado[v]:
+                    visitado[v] = True
+                    cola.append(v)
+        return np.array(visitado, dtype=bool)
+
+
+# Algoritmo de Dinic: recorrido por niveles desde la fuente y caminos aumentantes solo por arcos que
+# avanzan un nivel, usando un puntero al arco actual de cada nodo para no repetir arcos agotados.
+def dinic(red, fuente, sumidero):
+    arcos, inicio, cabeza, residual = red.arcos, red.inicio, red.cabeza, red.residual
+    tolerancia = red.tolerancia
+    n = red.num_nodos
+    total = 0
+
+    while True:
+        nivel = [-1] * n
+        nivel[fuente] = 0
+        cola = deque([fuente])
+        while cola:
+            u = cola.popleft()
+            for posicion in range(inicio[u], inicio[u + 1]):
+                arco = arcos[posicion]
+                v = cabeza[arco]
+                if residual[arco] > tolerancia and nivel[v] < 0:
+                    nivel[v] = nivel[u] + 1
+                    cola.append(v)
+        if nivel[sumidero] < 0:
+            return total
+
+        actual = inicio[:-1]
+        while True:
+            camino = []
+            u = fuente
+            while u != sumidero:
+                while actual[u] < inicio[u + 1]:
+                    arco = arcos[actual[u]]
+                    v = cabeza[arco]
+                    if residual[arco] > tolerancia and nivel[v] == nivel[u] + 1:
+                        break
+                    actual[u] += 1
+                else:
+                    # Callejon sin salida: se saca el nodo del nivel y se retrocede un arco
+                    if u == fuente:
+                        break
+                    nivel[u] = -1
+                    arco = camino.pop()
+                    u = cabeza[arco ^ 1]
+                    actual[u] += 1
+                    continue
+                camino.append(arco)
+                u = v
+            if u != sumidero:
+                break
+
+            empuje = min(residual[arco] for arco in camino)
+            for arco in camino:
+                residual[arco] -= empuje
+                residual[arco ^ 1] += empuje
+            total += empuje
+
+
+# Push-relabel con cola FIFO de nodos activos. Las alturas iniciales son la distancia al sumidero; el
+# exceso que no puede llegar al sumidero vuelve a la fuente, asi al terminar queda un flujo valido. Un
+# nodo sin arcos residuales solo puede tener un resto de redondeo como exceso, y sale de la cola.
+def push_relabel(red, fuente, sumidero):
+    arcos, inicio, cabeza, residual = red.arcos, red.inicio, red.cabeza, red.residual
+    tolerancia = red.tolerancia
+    n = red.num_nodos
+    if fuente == sumidero:
+        return 0
+
+    altura = [n] * n
+    altura[sumidero] = 0
+    cola = deque([sumidero])
+    while cola:
+        v = cola.popleft()
+        for posicion in range(inicio[v], inicio[v + 1]):
+            arco = arcos[posicion]
+            u = cabeza[arco]
+            if residual[arco ^ 1] > tolerancia and altura[u] == n and u != sumidero:
+                altura[u] = altura[v] + 1
+                cola.append(u)
+    altura[fuente] = n
+
+    exceso = [0] * n
+    activos = deque()
+    for posicion in range(inicio[fuente], inicio[fuente + 1]):
+        arco = arcos[posicion]
+        capacidad = residual[arco]
+        if capacidad > 0:
+            v = cabeza[arco]
+            residual[arco] = 0
+            residual[arco ^ 1] += capacidad
+            exceso[fuente] -= capacidad
+            if exceso[v] <= tolerancia and v != sumidero and v != fuente:
+                activos.append(v)
+            exceso[v] += capacidad
+
+    actual = inicio[:-1]
+    while activos:
+        u = activos.popleft()
+        while exceso[u] > tolerancia:
+            if actual[u] == inicio[u + 1]:
+                # Relabel: una unidad por encima del vecino residual mas bajo
+                alturas = [
+                    altura[cabeza[arcos[posicion]]]
+                    for posicion in range(inicio[u], inicio[u + 1])
+                    if residual[arcos[posicion]] > tolerancia
+                ]
+                if not alturas:
+                    break #resto de redondeo sin salida
+                altura[u] = 1 + min(alturas)
+                actual[u] = inicio[u]
+                continue
+            arco = arcos[actual[u]]
+            v = cabeza[arco]
+            if residual[arco] > tolerancia and altura[u] == altura[v] + 1:
+                empuje = min(exceso[u], residual[arco])
+                residual[arco] -= empuje
+                residual[arco ^ 1] += empuje
+                exceso[u] -= empuje
+                if exceso[v] <= tolerancia and v != sumidero and v != fuente:
+                    activos.append(v)
+                exceso[v] += empuje
+            else:
+                actual[u] += 1
+    return exceso[sumidero]
+
+
+METODOS = {"dinic": dinic, "push_relabel": push_relabel}
+
+
+# Calcula el flujo maximo entre dos nodos de una red residual con el metodo indicado
+def resolver(red, fuente, sumidero, metodo="dinic"):
+    if metodo not in METODOS:
+        raise ValueError(f"Metodo de flujo maximo desconocido: {metodo}. Opciones: {', '.join(METODOS)}.")
+    if fuente == sumidero:
+        return 0
+    return METODOS[metodo](red, fuente, sumidero)
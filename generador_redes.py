@@ -0,0 +1,189 @@
+import argparse #para generar redes desde la linea de comandos
+import json
+
+import numpy as np #para generar redes de millones de nodos sin ciclos de Python
+
+TOPOLOGIAS = ["arbol", "malla", "mixta"]
+
+
+# Muestra `cantidad` enteros positivos de una distribucion dada como tupla:
+# ("uniforme", minimo, maximo), ("normal", media, desviacion), ("lognormal", media, sigma) o
+# ("constante", valor). Los valores se redondean y nunca bajan de 1.
+def muestrear(rng, distribucion, cantidad):
+    tipo, *parametros = distribucion
+    if tipo == "uniforme":
+        valores = rng.integers(int(parametros[0]), int(parametros[1]) + 1, size=cantidad)
+    elif tipo == "normal":
+        valores = np.rint(rng.normal(parametros[0], parametros[1], size=cantidad))
+    elif tipo == "lognormal":
+        valores = np.rint(rng.lognormal(parametros[0], parametros[1], size=cantidad))
+    elif tipo == "constante":
+        valores = np.full(cantidad, parametros[0])
+    else:
+        raise ValueError(f"Distribucion desconocida: {tipo}.")
+    return np.maximum(valores, 1).astype(np.int64)
+
+
+# Cada casa recibe agua de un nodo anterior elegido al azar (uno de los `iniciales` o una casa previa),
+# asi todas quedan conectadas y no hay ciclos.
+def _ramas(rng, iniciales, casas):
+    anteriores = len(iniciales) + np.arange(len(casas))
+    posiciones = (rng.random(len(casas)) * anteriores).astype(np.int64)
+    return np.concatenate([iniciales, casas])[posiciones], casas
+
+
+# Malla de casas en filas de `lado` columnas con tuberías hacia la derecha y hacia abajo; una fraccion
+# `bucles` de ellas tambien se duplica en sentido contrario, lo que forma ciclos.
+def _malla(rng, casas, bucles):
+    lado = max(1, int(np.ceil(np.sqrt(len(casas)))))
+    posiciones = np.arange(len(casas))
+    derecha = posiciones[(posiciones % lado != lado - 1) & (posiciones + 1 < len(casas))]
+    abajo = posiciones[posiciones + lado < len(casas)]
+    origen = np.concatenate([derecha, abajo])
+    destino = np.concatenate([derecha + 1, abajo + lado])
+    invertidas = rng.random(len(origen)) < bucles
+    origen, destino = np.concatenate([origen, destino[invertidas]]), np.concatenate([destino, origen[invertidas]])
+    return casas[origen], casas[destino]
+
+
+# Genera una red sintetica reproducible con el formato de red_agua.json.
+#
+# - topologia: "arbol" (cada casa cuelga de un nodo anterior), "malla" (cuadricula con algunos bucles) o
+#   "mixta" (una malla troncal con ramas en arbol que cuelgan de ella).
+# - num_tuberias: si se indica y supera las tuberías de la topologia, se agregan tuberías al azar entre
+#   casas (de una casa a otra posterior) hasta completarlas o hasta que no queden pares libres.
+# - demanda, capacidad_flujo y capacidad_tanque: distribuciones (ver muestrear).
+# - bucles: fraccion de tuberías de la malla que tambien van en sentido contrario.
+# - fraccion_malla: en la topologia mixta, parte de las casas que forman la malla troncal.
+# - coordenadas: si es True cada casa y tanque lleva su posicion (x, y): la malla es una cuadricula de
+#   lado 1 entre casas, cada casa de una rama queda cerca del nodo del que cuelga y cada tanque junto a la
+#   primera casa que alimenta.
+def generar_red(topologia="arbol", num_casas=1000, num_tanques=None, num_tuberias=None, demanda=("uniforme", 1, 30),
+                capacidad_flujo=("uniforme", 5, 60), capacidad_tanque=None, bucles=0.1, fraccion_malla=0.3, semilla=0,
+                coordenadas=False):
+    if topologia not in TOPOLOGIAS:
+        raise ValueError(f"Topologia desconocida: {topologia}. Opciones: {', '.join(TOPOLOGIAS)}.")
+    rng = np.random.default_rng(semilla)
+    if num_tanques is None:
+        num_tanques = max(1, num_casas // 500)
+    if capacidad_tanque is None:
+        capacidad_tanque = ("constante", max(1, num_casas * 10 // num_tanques))
+
+    # Ids: primero los tanques (0 .. num_tanques - 1) y despues las casas
+    casas = np.arange(num_tanques, num_tanques + num_casas)
+    partes = []
+    if topologia == "arbol":
+        en_malla = 0
+        partes.append(_ramas(rng, np.arange(num_tanques), casas))
+    else:
+        en_malla = num_casas if topologia == "malla" else max(1, int(num_casas * fraccion_malla))
+        troncal = casas[:en_malla]
+        # Los tanques alimentan casas repartidas a lo largo de la malla, el primero a la casa de la esquina
+        alimentadas = troncal[np.linspace(0, en_malla - 1, num_tanques).astype(np.int64)]
+        partes.append((np.arange(num_tanques), alimentadas))
+        partes.append(_malla(rng, troncal, bucles))
+        if en_malla < num_casas:
+            partes.append(_ramas(rng, troncal, casas[en_malla:])) #las ramas cuelgan de la malla
+
+    origen = np.concatenate([parte[0] for parte in partes])
+    destino = np.concatenate([parte[1] for parte in partes])
+    if num_tuberias is not None and num_tuberias > len(origen) and num_casas > 1:
+        # Tuberías extra sin repetir ninguna: se codifica cada par como un entero y se completan por tandas
+        codigos = set((origen * (num_tanques + num_casas) + destino).tolist())
+        extra_origen, extra_destino = [], []
+        entre_casas = int(np.count_nonzero((origen >= num_tanques) & (destino > origen)))
+        faltan = min(num_tuberias - len(origen), num_casas * (num_casas - 1) // 2 - entre_casas)
+        while faltan > 0:
+            a = rng.integers(0, num_casas, size=faltan * 2)
+            b = rng.integers(0, num_casas, size=faltan * 2)
+            for i, j in zip(np.minimum(a, b).tolist(), np.maximum(a, b).tolist()):
+                codigo = (num_tanques + i) * (num_tanques + num_casas) + num_tanques + j
+                if i != j and codigo not in codigos:
+                    codigos.add(codigo)
+                    extra_origen.append(num_tanques + i)
+                    extra_destino.append(num_tanques + j)
+                    faltan -= 1
+                    if faltan == 0:
+                        break
+        origen = np.concatenate([origen, extra_origen]).astype(np.int64)
+        destino = np.concatenate([destino, extra_destino]).astype(np.int64)
+
+    nombres = [f"Tanque{i}" for i in range(num_tanques)] + [f"Casa{i}" for i in range(num_casas)]
+    capacidades_tanques = muestrear(rng, capacidad_tanque, num_tanques).tolist()
+    casas = {nombre: {"demanda": valor} for nombre, valor in zip(nombres[num_tanques:], muestrear(rng, demanda, num_casas).tolist())}
+    tanques = {
+        nombres[i]: {"capacidad": capacidad, "nivel": capacidad, "conexiones": []}
+        for i, capacidad in enumerate(capacidades_tanques)
+    }
+    tuberias = [
+        {"nodo1": nombres[u], "nodo2": nombres[v], "capacidad_flujo": capacidad}
+        for u, v, capacidad in zip(origen.tolist(), destino.tolist(), muestrear(rng, capacidad_flujo, len(origen)).tolist())
+    ]
+    if coordenadas:
+        #Se sortean al final para que la red sea la misma con o sin coordenadas
+        posiciones = _posiciones(rng, partes, num_tanques, num_casas, en_malla)
+        for nombre, (x, y) in zip(nombres, np.round(posiciones, 3).tolist()):
+            datos = tanques[nombre] if nombre in tanques else casas[nombre]
+            datos["x"] = x
+            datos["y"] = y
+    return {"casas": casas, "tanques": tanques, "tuberias": tuberias}
+
+
+# Posicion de cada nodo (tanques y despues casas). Las casas de la malla van en su cuadricula, las de las
+# ramas a una distancia de ~1 del nodo del que cuelgan (que siempre tiene un id menor, asi que se ubica
+# antes) y cada tanque junto a la primera casa que alimenta.
+def _posiciones(rng, partes, num_tanques, num_casas, en_malla):
+    posiciones = np.full((num_tanques + num_casas, 2), np.nan)
+    lado = max(1, int(np.ceil(np.sqrt(max(en_malla, 1)))))
+    if en_malla:
+        indice = np.arange(en_malla)
+        posiciones[num_tanques:num_tanques + en_malla] = np.stack([indice % lado, indice // lado], axis=1)
+        tanques, alimentadas = partes[0]
+        posiciones[tanques] = posiciones[alimentadas] + rng.normal(0, 0.3, size=(len(tanques), 2))
+        ramas = partes[2] if len(partes) > 2 else None
+    else:
+        # Arbol: los tanques se reparten en un cuadrado del tamaño que ocuparian las casas en una malla
+        ancho = np.sqrt(num_casas)
+        posiciones[:num_tanques] = rng.uniform(0, ancho, size=(num_tanques, 2))
+        ramas = partes[0]
+    if ramas is not None:
+        padres, hijos = ramas
+        desplazamientos = rng.normal(0, 1, size=(len(hijos), 2)).tolist()
+        lista = posiciones.tolist()
+        for padre, hijo, (dx, dy) in zip(padres.tolist(), hijos.tolist(), desplazamientos):
+            x, y = lista[padre]
+            lista[hijo] = [x + dx, y + dy]
+        posiciones = np.array(lista)
+    return posiciones
+
+
+def escribir_red(datos, archivo):
+    with open(archivo, 'w') as f:
+        json.dump(datos, f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera redes de agua sinteticas con el formato de red_agua.json.")
+    parser.add_argument("archivo", help="Archivo json de salida.")
+    parser.add_argument("--topologia", choices=TOPOLOGIAS, default="arbol")
+    parser.add_argument("--casas", type=int, default=1000)
+    parser.add_argument("--tanques", type=int, default=None)
+    parser.add_argument("--tuberias", type=int, default=None)
+    parser.add_argument("--demanda", nargs="+", default=["uniforme", "1", "30"], help="Distribucion, por ejemplo: normal 15 5")
+    parser.add_argument("--capacidad", nargs="+", default=["uniforme", "5", "60"], help="Distribucion de la capacidad de las tuberías.")
+    parser.add_argument("--bucles", type=float, default=0.1)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--coordenadas", action="store_true", help="Agrega la posicion (x, y) de cada casa y tanque.")
+    argumentos = parser.parse_args()
+
+    def distribucion(valores):
+        return (valores[0], *map(float, valores[1:]))
+
+    datos = generar_red(
+        argumentos.topologia, argumentos.casas, argumentos.tanques, argumentos.tuberias,
+        distribucion(argumentos.demanda), distribucion(argumentos.capacidad), bucles=argumentos.bucles,
+        semilla=argumentos.semilla, coordenadas=argumentos.coordenadas,
+    )
+    escribir_red(datos, argumentos.archivo)
+    print(f"Red {argumentos.topologia} con {len(datos['casas'])} casas, {len(datos['tanques'])} tanques y "
+          f"{len(datos['tuberias'])} tuberías guardada en {argumentos.archivo}.")
@@ -1,67 +1,418 @@
 import json #para guardar y cargar datos de la red de agua en formato json
+import os #para ubicar los archivos del diario junto al json
+import sys #limite de recursion que respeta la carga en bloque
+import functools #para envolver los metodos que modifican la red
+import threading #para el escritor diferido que guarda en segundo plano
+import time #para medir el retardo del escritor diferido
+from contextlib import contextmanager #para agrupar varios cambios en un solo guardado
 import networkx as nx # para modelar y trabajar con la der de agua como un grafo dirigido
-import matplotlib.pyplot as plt #para visualizar el grafo de la red de agua
 import heapq #para gestionar colas de prioridad de calculos de flujo 
+import numpy as np #para las verificaciones vectorizadas sobre la red compacta
 from collections import deque #para gesionar estructuras de datos FIFO util para recorridos en la red
+from distribucion import DistribucionIncremental #mantiene la distribucion de flujo recalculando solo lo afectado
+from alcance import IndiceAlcance #nodos alcanzables desde los tanques, calculados una vez por version del grafo
+from red_compacta import RedCompacta, TIPO_CASA, TIPO_TANQUE #copia de la red en arreglos de NumPy para los calculos pesados
+import flujo_maximo #algoritmos de flujo maximo (Dinic, push-relabel) sobre arreglos planos
+from almacenamiento import DiarioDeCambios, escribir_archivo_atomico #diario de cambios y escritura atomica de archivos
+import contingencia #evaluacion de fallas de tuberías sobre la red compacta
+from dependencias import IndiceDependencias #arbol de dominadores: de que tuberías y nodos depende cada casa
+import simulacion #simulacion de niveles de los tanques en el tiempo
+from metricas import Metricas, instrumentar, desinstrumentar #tiempos por metodo y contadores, solo si se activan
+from eventos import Eventos #mensajes de la red para quien se suscriba (consola, interfaz)
+from espacial import IndiceEspacial, k_centro, k_mediana #ubicacion de tanques nuevos segun las coordenadas de las casas
+
+
+#Coordenadas opcionales de casas y tanques en el json
+def _posicion(info):
+    return {"x": info["x"], "y": info["y"]} if "x" in info and "y" in info else {}
+
+
+# Los calculos sobre arreglos devuelven flotantes; los valores enteros se devuelven como int, igual que
+# cuando se suman las capacidades del json.
+def _numero(valor):
+    valor = float(valor)
+    return int(valor) if valor.is_integer() else valor
+
+
+# Los metodos que modifican la red corren con su cerrojo de cambios tomado, igual que un lote, asi el
+# escritor diferido (que toma el mismo cerrojo para copiar los datos) nunca ve un cambio a medias.
+def _modifica_red(metodo):
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        with self._cerrojo_cambios:
+            return metodo(self, *args, **kwargs)
+    return envoltura
+
+
+# Guarda la red en segundo plano: cada llamada a `agendar` reinicia la espera, y solo cuando pasan
+# `retardo` segundos sin cambios nuevos se escribe el json una vez.
+class EscritorDiferido:
+    def __init__(self, red, retardo=0.5):
+        self.red = red
+        self.retardo = retardo
+        self._limite = None #momento (time.monotonic) en que toca escribir, None si no hay nada pendiente
+        self._detenido = False
+        self._condicion = threading.Condition()
+        self._hilo = threading.Thread(target=self._bucle, name="EscritorDiferido", daemon=True)
+        self._hilo.start()
+
+    def agendar(self):
+        with self._condicion:
+            self._limite = time.monotonic() + self.retardo
+            self._condicion.notify()
+
+    def _bucle(self):
+        while True:
+            with self._condicion:
+                while not self._detenido and (self._limite is None or time.monotonic() < self._limite):
+                    espera = None if self._limite is None else self._limite - time.monotonic()
+                    self._condicion.wait(espera)
+                if self._detenido:
+                    return
+                self._limite = None
+            # Los datos se copian con el cerrojo de cambios tomado, asi que no hay lote ni cambio a medias;
+            # solo la serializacion y la escritura del archivo quedan fuera del cerrojo
+            try:
+                with self.red._cerrojo_cambios:
+                    pendiente = self.red._lotes_abiertos == 0 and self.red.cambios_sin_guardar
+                    if pendiente:
+                        datos, version = self.red._datos_a_escribir()
+                if pendiente:
+                    self.red._escribir_datos(datos, version)
+            except Exception as e:
+                if self.red.eventos:
+                    self.red.eventos.emitir("error_guardado", error=e)
+
+    #detiene el hilo y, si se pide, escribe de inmediato los cambios pendientes
+    def detener(self, escribir_pendientes=True):
+        with self._condicion:
+            self._detenido = True
+            self._condicion.notify()
+        self._hilo.join()
+        if escribir_pendientes and self.red.cambios_sin_guardar:
+            self.red.escribir_json()
+
 
 class RedDeAgua:
+    # Metodos que se miden al activar las metricas
+    METODOS_MEDIDOS = (
+        "cargar_desde_json", "cargar_binario", "guardar_en_json", "escribir_json", "guardar_binario", "recargar_json",
+        "agregar_casa", "eliminar_casa", "agregar_tanque_con_capacidad", "eliminar_tanque", "agregar_tuberia",
+        "eliminar_tuberia", "editar_tuberia", "cambiar_sentido_tuberia", "red_compacta", "indice_alcance",
+        "indice_dependencias", "calcular_distribucion_flujo", "verificar_suministro", "verificar_suministro_vectorizado",
+        "identificar_casas_sin_servicio", "agrupar_casas_sin_servicio", "proponer_nuevas_conexiones",
+        "conexiones_entre_tanques", "proponer_nuevos_tanques", "ubicar_tanques", "buscar_ruta_alternativa_optima",
+        "rutas_alternativas_optimas", "impacto_obstruccion", "detectar_bucles", "verificar_conexiones_duplicadas", "verificar_conexiones_con_nodos_no_definidos",
+        "ford_fulkerson", "flujo_maximo", "analisis_flujo_maximo", "factibilidad_suministro", "analisis_contingencia",
+        "simular_periodo_extendido",
+    )
+
     def __init__(self, archivo_json="red_agua.json"): #inicializa una instancia de la clase Red_de_agua
         self.grafo = nx.DiGraph()  #configura un grafo dirigido para representar la red
-        self.archivo_json = archivo_json #especifica el archivo json para guardar los datos
+        self.archivo_json = archivo_json #especifica el archivo json para guardar los datos; None es solo lectura
+        self.cambios_sin_guardar = False #indica si hay cambios en memoria que aun no se escriben en el json
+        self._lotes_abiertos = 0 #cantidad de lotes (`with red.lote():`) abiertos, pueden anidarse
+        self._escritor_diferido = None #escritor en segundo plano, solo existe si se activa el guardado diferido
+        self._cerrojo_escritura = threading.Lock() #evita que dos escrituras del json se crucen
+        self._version_escrita = -1 #version_datos de la ultima escritura del json
+        self._version_copiada = -1 #version_datos de la ultima copia tomada para escribir el json
+        self._cerrojo_cambios = threading.RLock() #lo toman los lotes y los metodos que modifican la red
+        self._distribucion = DistribucionIncremental(self.grafo) #ultima distribucion de flujo calculada
+        self.version_topologia = 0 #aumenta cada vez que se agregan o quitan nodos o tuberías
+        self.version_datos = 0 #aumenta con cualquier cambio de la red (topologia, capacidades, obstrucciones, niveles)
+        self._instantanea = None #ultima copia de solo lectura, valida mientras no cambie version_datos
+        self._indice_alcance = None #ultimo indice de alcance calculado, valido mientras no cambie la version
+        self._indice_dependencias = None #ultimo arbol de dominadores, valido mientras no cambie la version
+        self._compacta = None #ultima copia compacta (CSR + NumPy) de la red
+        self._diario = None #diario de cambios, solo existe si se activa el almacenamiento por diario
+        self.metricas = None #metricas de rendimiento, solo existen si se activan
+        self.eventos = Eventos() #canal de mensajes; sin suscriptores no se arma ningun mensaje
+
+    # Agrupa varios cambios en un solo guardado: dentro del bloque los metodos solo marcan la red como
+    # modificada, y al salir del lote mas externo se guarda una sola vez. Si el bloque termina con una
+    # excepcion no se guarda nada y los cambios quedan pendientes en memoria.
+    @contextmanager
+    def lote(self):
+        with self._cerrojo_cambios:
+            self._lotes_abiertos += 1
+            try:
+                yield self
+            finally:
+                self._lotes_abiertos -= 1
+            if self._lotes_abiertos == 0 and self.cambios_sin_guardar:
+                self.guardar_en_json()
+
+    # Activa el guardado en segundo plano: los cambios se acumulan y se escriben una vez que pasan
+    # `retardo` segundos sin nuevas modificaciones.
+    def activar_guardado_diferido(self, retardo=0.5):
+        if self._escritor_diferido is None:
+            self._escritor_diferido = EscritorDiferido(self, retardo)
+        else:
+            self._escritor_diferido.retardo = retardo
+
+    #Desactiva el guardado en segundo plano y escribe los cambios que hayan quedado pendientes
+    def desactivar_guardado_diferido(self):
+        if self._escritor_diferido is not None:
+            escritor, self._escritor_diferido = self._escritor_diferido, None
+            escritor.detener()
+
+    # Activa el almacenamiento por diario: cada cambio se agrega como una linea al diario en lugar de
+    # reescribir el json completo, y cada `compactar_cada` cambios se escribe una instantanea. Si ya hay
+    # una instantanea o un diario en `ruta_base`, la red se recupera de ahi (reemplaza la que haya en
+    # memoria); si no, se toma una instantanea de la red actual. El json sigue disponible como formato de
+    # exportacion con escribir_json.
+    @_modifica_red
+    def activar_diario(self, ruta_base=None, compactar_cada=1000, sincronizar_disco=False):
+        if self._diario is not None:
+            self.desactivar_diario()
+        if ruta_base is None:
+            ruta_base = os.path.splitext(self.archivo_json)[0]
+        diario = DiarioDeCambios(self.grafo, ruta_base, compactar_cada, sincronizar_disco)
+        if diario.existe():
+            aplicados = diario.cargar()
+            self._red_reemplazada()
+            if self.eventos:
+                self.eventos.emitir("datos_recuperados", instantanea=diario.ruta_instantanea, aplicados=aplicados, diario=diario.ruta_diario)
+        else:
+            diario.compactar()
+        self._diario = diario
+        self.cambios_sin_guardar = False
+
+    #Escribe una instantanea final y deja de usar el diario
+    def desactivar_diario(self):
+        if self._diario is not None:
+            diario, self._diario = self._diario, None
+            diario.compactar()
+            diario.cerrar()
+
+    # Activa las metricas de rendimiento: los metodos de METODOS_MEDIDOS (o los indicados) de esta red
+    # registran su cantidad de llamadas y su duracion, y se cuentan los bytes de json escritos y los
+    # recorridos del grafo. Se pueden compartir unas metricas entre varias redes. Devuelve las metricas.
+    def activar_metricas(self, metricas=None, metodos=None):
+        self.desactivar_metricas()
+        self.metricas = metricas if metricas is not None else Metricas()
+        self._metodos_medidos = tuple(metodos) if metodos is not None else self.METODOS_MEDIDOS
+        instrumentar(self, self._metodos_medidos, self.metricas)
+        return self.metricas
+
+    #Deja de medir; las metricas acumuladas siguen disponibles en el objeto devuelto por activar_metricas
+    def desactivar_metricas(self):
+        if self.metricas is not None:
+            desinstrumentar(self, self._metodos_medidos)
+            self.metricas = None
+
+    def _contar(self, nombre, cantidad=1):
+        if self.metricas is not None:
+            self.metricas.contar(nombre, cantidad)
 
-    # Agregar casa con demanda de agua, si esta no esta ya en los nodos del grafo, y lo guarda
-    def agregar_casa(self, casa, demanda):
+    # Avisos internos de cambios en el grafo, para que los calculos guardados se actualicen y, con el
+    # diario activo, para registrar el cambio
+    def _nodo_agregado(self, nodo):
+        self.version_datos += 1
+        self.version_topologia += 1
+        self._distribucion.nodo_agregado(nodo)
+        self._registrar("nodo", nodo=nodo, datos=self.grafo.nodes[nodo])
+
+    def _nodo_eliminado(self, nodo):
+        self.version_datos += 1
+        self.version_topologia += 1
+        self._distribucion.nodo_eliminado(nodo)
+        self._registrar("eliminar_nodo", nodo=nodo)
+
+    def _arista_agregada(self, nodo1, nodo2):
+        self.version_datos += 1
+        self.version_topologia += 1
+        self._distribucion.arista_agregada(nodo1, nodo2)
+        self._registrar("tuberia", nodo1=nodo1, nodo2=nodo2, datos=self.grafo[nodo1][nodo2])
+
+    def _arista_modificada(self, nodo1, nodo2):
+        self.version_datos += 1
+        self._distribucion.arista_modificada(nodo1, nodo2)
+        self._registrar("tuberia", nodo1=nodo1, nodo2=nodo2, datos=self.grafo[nodo1][nodo2])
+        compacta = self._compacta_vigente()
+        if compacta is not None and not compacta.actualizar_arista(nodo1, nodo2, self.grafo[nodo1][nodo2]):
+            self._compacta = None
+
+    def _arista_eliminada(self, nodo1, nodo2):
+        self.version_datos += 1
+        self.version_topologia += 1
+        self._distribucion.arista_eliminada(nodo1, nodo2)
+        self._registrar("eliminar_tuberia", nodo1=nodo1, nodo2=nodo2)
+
+    def _nivel_modificado(self, tanque):
+        self.version_datos += 1
+        self._distribucion.nivel_modificado(tanque)
+        self._registrar("nodo", nodo=tanque, datos=self.grafo.nodes[tanque])
+        compacta = self._compacta_vigente()
+        if compacta is not None and not compacta.actualizar_nivel(tanque, self.grafo.nodes[tanque]["nivel"]):
+            self._compacta = None
+
+    def _red_reemplazada(self):
+        self.version_datos += 1
+        self.version_topologia += 1
+        self._distribucion.invalidar()
+        if self._diario is not None:
+            self._diario.red_reemplazada()
+
+    # Copia de solo lectura de la red para calcular en otro hilo mientras esta se sigue editando. El grafo
+    # se copia y se congela (agregar o quitar nodos o tuberías lanza un error); la copia no tiene archivo
+    # json, diario, guardado diferido ni metricas, y sus mensajes salen por el mismo canal de eventos. Se
+    # reutiliza la misma copia mientras la red no cambie. Con congelada=False se arma siempre una copia
+    # nueva que si se puede modificar (por ejemplo para cargar un json sobre ella, ver adoptar).
+    def instantanea(self, congelada=True):
+        copia = self._instantanea
+        if congelada and copia is not None and copia.version_datos == self.version_datos:
+            return copia
+        copia = RedDeAgua(archivo_json=None)
+        copia.grafo = self.grafo.copy()
+        copia._distribucion = DistribucionIncremental(copia.grafo)
+        copia.version_topologia = self.version_topologia
+        copia.version_datos = self.version_datos
+        copia.eventos = self.eventos
+        if congelada:
+            nx.freeze(copia.grafo)
+            self._instantanea = copia
+        return copia
+
+    # Reemplaza la red por `otra` (una copia de instantanea(congelada=False) modificada en otro hilo) sin
+    # copiar nada: su grafo y su distribucion de flujo ya calculada pasan a esta red, y `otra` no se debe
+    # seguir usando. Igual que despues de cargar un json, la red queda con cambios pendientes de guardar.
+    @_modifica_red
+    def adoptar(self, otra):
+        self.grafo = otra.grafo
+        self._distribucion = otra._distribucion
+        self.version_topologia = max(self.version_topologia, otra.version_topologia) + 1
+        self.version_datos += 1
+        if self._diario is not None:
+            self._diario.grafo = self.grafo
+            self._diario.red_reemplazada()
+        self.cambios_sin_guardar = True
+
+    def _registrar(self, operacion, **campos):
+        if self._diario is not None:
+            self._diario.registrar(operacion, **campos)
+
+    # Devuelve la copia compacta de la red (ids enteros, adyacencia CSR y atributos en arreglos de NumPy).
+    # Se reconstruye cuando cambia la topologia; los cambios de capacidad, obstruccion o nivel se copian
+    # directamente sobre los arreglos.
+    def red_compacta(self):
+        compacta = self._compacta_vigente()
+        if compacta is None:
+            compacta = RedCompacta.desde_grafo(self.grafo, self.version_topologia)
+            self._compacta = compacta
+            self._contar("reconstrucciones_red_compacta")
+        return compacta
+
+    def _compacta_vigente(self):
+        compacta = self._compacta
+        if compacta is not None and compacta.version == self.version_topologia:
+            return compacta
+        return None
+
+    # Devuelve el indice de nodos alcanzables desde los tanques. Se arma con un solo recorrido y se
+    # reutiliza hasta que cambie la topologia de la red. Con `con_tanques=True` tambien registra que
+    # tanques llegan a cada nodo.
+    def indice_alcance(self, con_tanques=False):
+        indice = self._indice_alcance
+        if indice is None or indice.version != self.version_topologia or (con_tanques and indice.tanques_por_nodo is None):
+            indice = IndiceAlcance(self.grafo, self.version_topologia, con_tanques)
+            self._indice_alcance = indice
+            self._contar("recorridos_alcance")
+        return indice
+
+    # Devuelve el indice de dependencias (arbol de dominadores desde los tanques), armado sobre la copia
+    # compacta y reutilizado hasta que cambie la topologia de la red
+    def indice_dependencias(self):
+        indice = self._indice_dependencias
+        if indice is None or indice.version != self.version_topologia:
+            indice = IndiceDependencias(self.red_compacta())
+            self._indice_dependencias = indice
+            self._contar("recorridos_dependencias")
+        return indice
+
+    #Nodos y tuberías por los que pasa toda el agua que llega a la casa (None si no recibe agua)
+    def puntos_unicos_de_falla(self, casa):
+        return self.indice_dependencias().puntos_unicos_de_falla(casa)
+
+    #Casas que se quedan sin agua si se corta la tubería
+    def casas_dependientes_de_tuberia(self, nodo1, nodo2):
+        return self.indice_dependencias().casas_dependientes_de_tuberia(nodo1, nodo2)
+
+    # Agregar casa con demanda de agua (y su posicion x, y si se conoce), si esta no esta ya en los nodos del
+    # grafo, y lo guarda
+    @_modifica_red
+    def agregar_casa(self, casa, demanda, x=None, y=None):
         if casa not in self.grafo.nodes:
-            self.grafo.add_node(casa, tipo="casa", demanda=demanda)
+            self.grafo.add_node(casa, tipo="casa", demanda=demanda, **({} if x is None or y is None else {"x": x, "y": y}))
+            self._nodo_agregado(casa)
             self.guardar_en_json()
         else:
-            print(f"La casa {casa} ya existe en la red.")
+            if self.eventos:
+                self.eventos.emitir("casa_existente", casa=casa)
             
     #elimina una casa si existe en los nodos del grafo y lo guarda
+    @_modifica_red
     def eliminar_casa(self, casa):
         if casa in self.grafo.nodes and self.grafo.nodes[casa]["tipo"] == "casa":
             self.grafo.remove_node(casa)
-            print(f"La casa {casa} ha sido eliminada.")
+            self._nodo_eliminado(casa)
+            if self.eventos:
+                self.eventos.emitir("casa_eliminada", casa=casa)
             self.guardar_en_json()
         else:
-            print(f"La casa {casa} no existe en la red.")
+            if self.eventos:
+                self.eventos.emitir("casa_inexistente", casa=casa)
             
     #agrega un tanque con capacidad y sus respectivas conexiones, inicializa el nivel=capacidad y le resta la capacidad
     #de flujo de las tuberias conectadas en sentido saliente del tanque, y lo guarda en el json
-    def agregar_tanque_con_capacidad(self, nombre, capacidad, conexiones):
+    @_modifica_red
+    def agregar_tanque_con_capacidad(self, nombre, capacidad, conexiones, x=None, y=None):
         if nombre in self.grafo.nodes:
-            print(f"El tanque {nombre} ya existe en la red.")
+            if self.eventos:
+                self.eventos.emitir("tanque_existente", tanque=nombre)
             return
 
-        # El nivel inicial será igual a la capacidad del tanque
-        nivel_inicial = capacidad
-        self.grafo.add_node(nombre, tipo="tanque", capacidad=capacidad, nivel=nivel_inicial)
+        with self.lote():
+            # El nivel inicial será igual a la capacidad del tanque
+            nivel_inicial = capacidad
+            self.grafo.add_node(nombre, tipo="tanque", capacidad=capacidad, nivel=nivel_inicial,
+                                **({} if x is None or y is None else {"x": x, "y": y}))
+            self._nodo_agregado(nombre)
 
-        for nodo in conexiones:
-            if nodo in self.grafo.nodes:
-                self.agregar_tuberia(nombre, nodo, capacidad_flujo=0)
+            for nodo in conexiones:
+                if nodo in self.grafo.nodes:
+                    self.agregar_tuberia(nombre, nodo, capacidad_flujo=0)
 
-                # Restar la capacidad de flujo de la tubería al nivel del tanque
-                self.grafo.nodes[nombre]["nivel"] -= self.grafo.edges[nombre, nodo]["capacidad_flujo"]
-            else:
-                print(f"El nodo {nodo} no existe. No se pudo agregar la conexión.")
+                    # Restar la capacidad de flujo de la tubería al nivel del tanque
+                    self.grafo.nodes[nombre]["nivel"] -= self.grafo.edges[nombre, nodo]["capacidad_flujo"]
+                    self._nivel_modificado(nombre)
+                else:
+                    if self.eventos:
+                        self.eventos.emitir("conexion_invalida", nodo=nodo)
 
-        self.guardar_en_json()
+            self.guardar_en_json()
         
     #elimina un tanque si este esta en los nodos del grafo y se guarda el json
+    @_modifica_red
     def eliminar_tanque(self, tanque):
         if tanque in self.grafo.nodes and self.grafo.nodes[tanque]["tipo"] == "tanque":
             self.grafo.remove_node(tanque)
-            print(f"El tanque {tanque} ha sido eliminado.")
+            self._nodo_eliminado(tanque)
+            if self.eventos:
+                self.eventos.emitir("tanque_eliminado", tanque=tanque)
             self.guardar_en_json()
         else:
-            print(f"El tanque {tanque} no existe en la red.")
+            if self.eventos:
+                self.eventos.emitir("tanque_inexistente", tanque=tanque)
     
     #Agrega una tubería entre dos nodos y distribuye el flujo entre ellos.
+    @_modifica_red
     def agregar_tuberia(self, nodo1, nodo2, capacidad_flujo):
         if nodo1 in self.grafo.nodes and nodo2 in self.grafo.nodes:
             self.grafo.add_edge(nodo1, nodo2, capacidad_flujo=capacidad_flujo)
-            print(f"Tubería agregada de {nodo1} a {nodo2} con capacidad de flujo {capacidad_flujo} L/s.")
+            self._arista_agregada(nodo1, nodo2)
+            if self.eventos:
+                self.eventos.emitir("tuberia_agregada", nodo1=nodo1, nodo2=nodo2, capacidad_flujo=capacidad_flujo)
             
             if self.grafo.nodes[nodo1]["tipo"] == "tanque":
                 self.actualizar_nivel_tanque(nodo1)
@@ -83,18 +434,21 @@ class RedDeAgua:
                 # Si el flujo restante es positivo, se suma al tanque
                 if flujo_disponible > 0:
                     self.grafo.nodes[nodo2]["nivel"] += flujo_disponible
-                    print(f"El tanque {nodo2} ha recibido {flujo_disponible} L/s. Nivel actual: {self.grafo.nodes[nodo2]['nivel']} L.") 
+                    self._nivel_modificado(nodo2)
+                    if self.eventos:
+                        self.eventos.emitir("tanque_recibio_flujo", tanque=nodo2, flujo=flujo_disponible, nivel=self.grafo.nodes[nodo2]["nivel"])
 
+            # La distribucion de flujo se actualiza solo aguas abajo de la tubería nueva, la proxima vez
+            # que se consulte con distribucion_flujo
             self.guardar_en_json()
-
-            # Después de agregar todas las tuberías, recalcular el flujo total
-            self.calcular_distribucion_flujo()  # Esto asegura que todos los flujos se distribuyan correctamente
         else:
-            print("Uno o ambos nodos no existen en la red.")
+            if self.eventos:
+                self.eventos.emitir("nodos_inexistentes")
             
     #Verifica si la demanda de la casa destino está siendo suplida por el flujo de la tubería
     #y distribuye el flujo sobrante a la siguiente casa. Si no está siendo suplida correctamente,
     #se devuelve una sugerencia de solución.
+    @_modifica_red
     def verificar_y_distribuir_flujo(self, nodo_origen, nodo_destino, capacidad_flujo):
         # Obtener la demanda de la casa
         demanda = self.grafo.nodes[nodo_destino]["demanda"]
@@ -102,13 +456,15 @@ class RedDeAgua:
         # Calcular el flujo entrante a la casa sumando todas las tuberías que llegan
         flujo_disponible = sum(self.grafo[nodo][nodo_destino]["capacidad_flujo"] for nodo, _ in self.grafo.in_edges(nodo_destino))
 
-        print(f"Casa {nodo_destino} - Demanda: {demanda}, Flujo Entrante: {flujo_disponible}")
+        if self.eventos:
+            self.eventos.emitir("flujo_casa", casa=nodo_destino, demanda=demanda, flujo=flujo_disponible)
 
         # Si el flujo entrante es suficiente para cubrir la demanda
         if flujo_disponible >= demanda:
             flujo_utilizado = demanda  # El flujo utilizado es igual a la demanda
             flujo_sobrante = flujo_disponible - flujo_utilizado  # El sobrante es lo que queda después de cubrir la demanda
-            print(f"Casa {nodo_destino} - Flujo Utilizado: {flujo_utilizado}, Sobrante: {flujo_sobrante}")
+            if self.eventos:
+                self.eventos.emitir("flujo_utilizado", casa=nodo_destino, utilizado=flujo_utilizado, sobrante=flujo_sobrante)
 
             # Si hay un sobrante, distribuirlo a la siguiente casa
             if flujo_sobrante > 0:
@@ -116,7 +472,8 @@ class RedDeAgua:
                 self.distribuir_sobrante_a_siguiente_casa(nodo_destino, flujo_sobrante)
 
         else:
-            print(f"La demanda de la casa {nodo_destino} NO está siendo suplida adecuadamente.")
+            if self.eventos:
+                self.eventos.emitir("demanda_no_suplida", casa=nodo_destino)
             # Si el flujo es insuficiente, devolver un mensaje de advertencia
             sugerencia = f"Se recomienda agregar un tanque conectado a {nodo_destino}."
             return sugerencia  # Devolver la sugerencia
@@ -124,6 +481,7 @@ class RedDeAgua:
         return None  # Si no hay sugerencia, devolver None
     
     # Distribuye el flujo sobrante a la siguiente casa o tanque en la red.
+    @_modifica_red
     def distribuir_sobrante_a_siguiente_casa(self, nodo, flujo_sobrante):
         for _, vecino in self.grafo.out_edges(nodo):
             capacidad_tuberia = self.grafo[nodo][vecino]["capacidad_flujo"]
@@ -131,8 +489,10 @@ class RedDeAgua:
             if capacidad_tuberia > 0:  # Solo distribuir si la tubería tiene capacidad
                 if self.grafo.nodes[vecino]["tipo"] == "tanque":
                     # Si el flujo va a un tanque, actualizamos su nivel
-                    print(f"Devolviendo {flujo_sobrante} L/s al tanque {vecino}.")
+                    if self.eventos:
+                        self.eventos.emitir("sobrante_devuelto", flujo=flujo_sobrante, tanque=vecino)
                     self.grafo.nodes[vecino]["nivel"] += flujo_sobrante
+                    self._nivel_modificado(vecino)
                     return  # El flujo sobrante se devuelve al tanque y terminamos
                 elif self.grafo.nodes[vecino]["tipo"] == "casa":
                     # Si el flujo va a una casa, calculamos cuánto necesita
@@ -140,13 +500,15 @@ class RedDeAgua:
                     flujo_a_enviar = min(flujo_sobrante, demanda_vecino)
 
                     flujo_sobrante -= flujo_a_enviar  # Reducir el sobrante en lo enviado
-                    print(f"Distribuyendo {flujo_a_enviar} L/s a {vecino}. Flujo sobrante restante: {flujo_sobrante}")
+                    if self.eventos:
+                        self.eventos.emitir("sobrante_distribuido", flujo=flujo_a_enviar, casa=vecino, sobrante=flujo_sobrante)
 
                     # Continuar distribuyendo el sobrante si queda
                     if flujo_sobrante > 0:
                         self.distribuir_sobrante_a_siguiente_casa(vecino, flujo_sobrante)
                         
             #se edita la capacidad de la tuberia ingresando un porcentaje de reduccion
+    @_modifica_red
     def editar_tuberia(self, nodo1, nodo2, nueva_obstruccion):
         if self.grafo.has_edge(nodo1, nodo2):
             # Validar obstrucción
@@ -156,7 +518,8 @@ class RedDeAgua:
                 capacidad_original = self.grafo[nodo1][nodo2]['capacidad_flujo']
                 capacidad_reducida = capacidad_original * (1 - nueva_obstruccion / 100)
             else:
-                print("Error: El porcentaje de obstrucción debe estar entre 0 y 100 o ser -1 para obstrucción total.")
+                if self.eventos:
+                    self.eventos.emitir("obstruccion_invalida")
                 return
             
             # Calcular la diferencia en el flujo debido a la obstrucción
@@ -165,72 +528,313 @@ class RedDeAgua:
             # Actualizar atributos del borde
             self.grafo[nodo1][nodo2]['capacidad_flujo'] = capacidad_reducida
             self.grafo[nodo1][nodo2]['obstruccion'] = nueva_obstruccion
+            self._arista_modificada(nodo1, nodo2)
 
-            print(f"Tubería de {nodo1} a {nodo2} actualizada con nueva capacidad de {capacidad_reducida:.2f} L/s y obstrucción {nueva_obstruccion}%.")
-            self.guardar_en_json()
+            if self.eventos:
+                self.eventos.emitir("tuberia_actualizada", nodo1=nodo1, nodo2=nodo2, capacidad=capacidad_reducida, obstruccion=nueva_obstruccion)
             
             # Si el nodo de origen es un tanque, devolver el flujo perdido al tanque
             if self.grafo.nodes[nodo1]["tipo"] == "tanque":
                 tanque = self.grafo.nodes[nodo1]
                 tanque["nivel"] += flujo_perdido
-                print(f"El tanque {nodo1} recuperó {flujo_perdido:.2f} L de agua. Nuevo nivel: {tanque['nivel']}L.")
+                self._nivel_modificado(nodo1)
+                if self.eventos:
+                    self.eventos.emitir("tanque_recupero_agua", tanque=nodo1, flujo=flujo_perdido, nivel=tanque["nivel"])
             
             # Guardar los cambios en el archivo JSON
             self.guardar_en_json()
         else:
-            print("Error: La tubería especificada no existe en el grafo.")
+            if self.eventos:
+                self.eventos.emitir("tuberia_inexistente", nodo1=nodo1, nodo2=nodo2)
             
         #Elimina la tubería entre dos nodos, recalcula el nivel de los tanques
         #y verifica la distribución del flujo.
+    @_modifica_red
     def eliminar_tuberia(self, nodo1, nodo2):
         if self.grafo.has_edge(nodo1, nodo2):
             # Eliminar la tubería
             self.grafo.remove_edge(nodo1, nodo2)
-            print(f"La tubería entre {nodo1} y {nodo2} ha sido eliminada.")
+            self._arista_eliminada(nodo1, nodo2)
+            if self.eventos:
+                self.eventos.emitir("tuberia_eliminada", nodo1=nodo1, nodo2=nodo2)
 
-            # Recalcular el nivel de los tanques afectados
-            for nodo in self.grafo.nodes:
-                if self.grafo.nodes[nodo]["tipo"] == "tanque":
-                    self.actualizar_nivel_tanque(nodo)  # Usamos el método existente para actualizar el nivel
+            # Recalcular el nivel del tanque afectado: solo cambian las salidas de nodo1
+            if self.grafo.nodes[nodo1]["tipo"] == "tanque":
+                self.actualizar_nivel_tanque(nodo1)  # Usamos el método existente para actualizar el nivel
 
-            # Verificar y recalcular la distribución de flujo
-            flujo_disponible = self.calcular_distribucion_flujo()
+            # Verificar y recalcular la distribución de flujo aguas abajo de la tubería eliminada
+            flujo_disponible = self.distribucion_flujo()
 
-            # Verificar si hay casas sin suficiente flujo
-            for nodo, flujo in flujo_disponible.items():
+            # Verificar si hay casas sin suficiente flujo entre las que pudieron cambiar
+            for nodo in self._distribucion.ultima_region:
                 if self.grafo.nodes[nodo]["tipo"] == "casa":
-                    if flujo < self.grafo.nodes[nodo]["demanda"]:
-                        print(f"La casa {nodo} no tiene suficiente flujo. Se recomienda redistribuir el flujo.")
+                    if flujo_disponible[nodo] < self.grafo.nodes[nodo]["demanda"]:
+                        if self.eventos:
+                            self.eventos.emitir("flujo_insuficiente", casa=nodo)
 
             # Guardar cambios en el JSON
             self.guardar_en_json()
         else:
-            print(f"No existe una tubería entre {nodo1} y {nodo2}.")
+            if self.eventos:
+                self.eventos.emitir("tuberia_inexistente", nodo1=nodo1, nodo2=nodo2)
 
-    # Cargar datos desde archivo JSON
+    # Cargar datos desde archivo JSON. Los nodos que ya existen en la red se conservan, igual que al
+    # agregarlos uno por uno. La carga no escribe el archivo: la red queda marcada con cambios pendientes
+    # y se guarda con la siguiente modificacion (o con `escribir_json`).
+    @_modifica_red
     def cargar_desde_json(self, archivo):
         with open(archivo, 'r') as f:
             datos = json.load(f)
 
-        for casa, info in datos.get("casas", {}).items():
-            self.agregar_casa(casa, info["demanda"])
+        self._cargar_datos(datos)
+        self.cambios_sin_guardar = True
+        if self.eventos:
+            self.eventos.emitir("datos_cargados", archivo=archivo)
+
+    # Construye la red a partir de los datos del json en una sola pasada: agrega casas, tanques y tuberias
+    # en bloque y calcula la distribucion de flujo una sola vez al final. El nivel de los tanques queda
+    # igual que si se repitieran agregar_casa, agregar_tanque_con_capacidad y agregar_tuberia en el orden
+    # del json (ver _niveles_carga_secuencial), pero sin sus costos por tubería.
+    def _cargar_datos(self, datos):
+        self.grafo.add_nodes_from(
+            (casa, {"tipo": "casa", "demanda": info["demanda"], **_posicion(info)})
+            for casa, info in datos.get("casas", {}).items() if casa not in self.grafo
+        )
+
+        # Los tanques se agregan en orden porque sus conexiones solo pueden apuntar a nodos que ya existen
+        aristas = []
         for tanque, info in datos.get("tanques", {}).items():
-            self.agregar_tanque_con_capacidad(tanque, info["capacidad"], info["conexiones"])
-        for tuberia in datos.get("tuberias", []):
-            self.agregar_tuberia(tuberia["nodo1"], tuberia["nodo2"], tuberia["capacidad_flujo"])
+            if tanque in self.grafo:
+                if self.eventos:
+                    self.eventos.emitir("tanque_existente", tanque=tanque)
+                continue
+            self.grafo.add_node(tanque, tipo="tanque", capacidad=info["capacidad"], nivel=info["capacidad"], **_posicion(info))
+            aristas.extend((tanque, nodo, {"capacidad_flujo": 0}) for nodo in info["conexiones"] if nodo in self.grafo)
+
+        nodos = self.grafo.nodes
+        aristas.extend(
+            (tuberia["nodo1"], tuberia["nodo2"], {"capacidad_flujo": tuberia["capacidad_flujo"]})
+            for tuberia in datos.get("tuberias", [])
+            if tuberia["nodo1"] in nodos and tuberia["nodo2"] in nodos
+        )
+        niveles = self._niveles_carga_secuencial(aristas)
+        self.grafo.add_edges_from(aristas)
+        for tanque, nivel in niveles.items():
+            nodos[tanque]["nivel"] = nivel
+
+        # Recalcular el flujo total una sola vez, ya con todas las tuberías
+        self._red_reemplazada()
+        self._distribucion.recalcular_todo()
+
+    # Nivel final de los tanques si las tuberías de `aristas` (origen, destino, datos) se agregaran una por
+    # una con agregar_tuberia, que depende del orden: cada tubería que sale de un tanque reinicia su nivel a
+    # la capacidad menos sus tuberías salientes (como actualizar_nivel_tanque), la que llega a un tanque le
+    # devuelve lo que sobra despues de la demanda de las casas que ya lo alimentan, y la que llega a una
+    # casa reparte su sobrante aguas abajo (como distribuir_sobrante_a_siguiente_casa). Se repite sobre
+    # diccionarios propios, antes de agregar las tuberías al grafo, con las mismas operaciones en el mismo
+    # orden, asi el resultado es identico al de benchmarks.cargar_secuencial. Los totales se llevan al dia
+    # en lugar de volver a sumar todas las tuberías del nodo en cada paso.
+    def _niveles_carga_secuencial(self, aristas):
+        nodos = self.grafo.nodes
+        tipo = dict(nodos(data="tipo"))
+        demanda = dict(nodos(data="demanda"))
+        salidas, entradas, restante, entrante, niveles = {}, {}, {}, {}, {}
+
+        # Tuberías de cada nodo: las que ya tenia el grafo mas las agregadas hasta ahora, en el mismo orden
+        def salida(nodo):
+            if nodo not in salidas:
+                salidas[nodo] = {v: datos.get("capacidad_flujo", 0) for v, datos in self.grafo.succ[nodo].items()}
+            return salidas[nodo]
+
+        def entrada(nodo):
+            if nodo not in entradas:
+                entradas[nodo] = {u: datos.get("capacidad_flujo", 0) for u, datos in self.grafo.pred[nodo].items()}
+            return entradas[nodo]
+
+        def nivel(tanque):
+            if tanque not in niveles:
+                niveles[tanque] = nodos[tanque]["nivel"]
+            return niveles[tanque]
+
+        # Capacidad menos las tuberías salientes, restadas en orden como en actualizar_nivel_tanque
+        def recalcular_restante(tanque):
+            valor = nodos[tanque]["capacidad"]
+            for capacidad in salida(tanque).values():
+                valor -= capacidad
+            restante[tanque] = valor
+
+        # Flujo que entra a la casa, sumado en orden como en verificar_y_distribuir_flujo
+        def recalcular_entrante(casa):
+            entrante[casa] = sum(entrada(casa).values())
+
+        # Igual que distribuir_sobrante_a_siguiente_casa, con una pila en lugar de recursion. Cada marco es
+        # (vecinos que faltan, sobrante). En redes con bucles ese reparto puede volver a pasar por las mismas
+        # casas una cantidad exponencial de veces (o sin fin, con demandas en cero): no se baja mas alla del
+        # limite de recursion de Python, donde la version recursiva fallaria, y cada reparto se corta despues
+        # de `presupuesto` pasos. Hasta ese punto el resultado es el mismo.
+        limite = sys.getrecursionlimit()
+        presupuesto = max(1_000_000, 10 * len(nodos))
+
+        def distribuir(casa, sobrante):
+            pila = [[iter(salida(casa).items()), sobrante]]
+            pasos = 0
+            while pila and pasos < presupuesto:
+                pasos += 1
+                marco = pila[-1]
+                for vecino, capacidad in marco[0]:
+                    if capacidad > 0:
+                        if tipo[vecino] == "tanque":
+                            niveles[vecino] = nivel(vecino) + marco[1]
+                            pila.pop()
+                            break
+                        elif tipo[vecino] == "casa":
+                            marco[1] -= min(marco[1], demanda[vecino])
+                            if marco[1] > 0 and len(pila) < limite:
+                                pila.append([iter(salida(vecino).items()), marco[1]])
+                                break
+                else:
+                    pila.pop()
+
+        for origen, destino, datos in aristas:
+            capacidad_flujo = datos["capacidad_flujo"]
+            vecinos = salida(origen)
+            repetida = destino in vecinos
+            vecinos[destino] = capacidad_flujo
+            entrada(destino)[origen] = capacidad_flujo
+
+            if tipo[origen] == "tanque":
+                if repetida or origen not in restante:
+                    recalcular_restante(origen)
+                else:
+                    restante[origen] -= capacidad_flujo
+                nivel(origen)
+                niveles[origen] = max(0, restante[origen])
+
+            if tipo[destino] == "casa":
+                if repetida or destino not in entrante:
+                    recalcular_entrante(destino)
+                else:
+                    entrante[destino] += capacidad_flujo
+                sobrante = entrante[destino] - demanda[destino]
+                if entrante[destino] >= demanda[destino] and sobrante > 0:
+                    distribuir(destino, sobrante)
+
+            if tipo[destino] == "tanque":
+                flujo_disponible = capacidad_flujo
+                for casa in entrada(destino):
+                    if tipo[casa] == "casa":
+                        flujo_disponible -= min(demanda[casa], flujo_disponible)
+                if flujo_disponible > 0:
+                    niveles[destino] = nivel(destino) + flujo_disponible
+        return niveles
 
-    # Guardar estado actual en archivo JSON
+    # Guarda la red en el formato binario de RedCompacta (tabla de nombres y arreglos planos), con las
+    # coordenadas de los nodos que las tienen. A diferencia del json, conserva el nivel de los tanques y la
+    # obstruccion de las tuberías tal como estan.
+    def guardar_binario(self, ruta):
+        self.red_compacta().guardar_binario(ruta)
+        if self.eventos:
+            self.eventos.emitir("datos_guardados", archivo=ruta)
+
+    # Reemplaza la red por la de un archivo binario. Los arreglos del archivo (abiertos con copia al
+    # escribir, asi el archivo nunca se modifica) quedan como copia compacta de la red, y los calculos
+    # vectorizados no tienen que reconstruirla.
+    @_modifica_red
+    def cargar_binario(self, ruta):
+        compacta = RedCompacta.abrir_binario(ruta, modo="c")
+        nombres = list(compacta.nombres)
+        tipo = compacta.tipo.tolist()
+        demanda = compacta.demanda.tolist()
+        capacidad = compacta.capacidad.tolist()
+        nivel = compacta.nivel.tolist()
+        nodos = [
+            (nombre, {"tipo": "tanque", "capacidad": _numero(capacidad[i]), "nivel": _numero(nivel[i])})
+            if tipo[i] == TIPO_TANQUE else (nombre, {"tipo": "casa", "demanda": _numero(demanda[i])})
+            for i, nombre in enumerate(nombres)
+        ]
+        for (_, data), x, y in zip(nodos, compacta.x.tolist(), compacta.y.tolist()):
+            if x == x and y == y: #NaN: el nodo no tiene coordenadas
+                data["x"] = _numero(x)
+                data["y"] = _numero(y)
+
+        aristas = []
+        for origen, destino, capacidad_flujo, obstruccion in zip(
+            compacta.origen.tolist(), compacta.destino.tolist(), compacta.capacidad_flujo.tolist(), compacta.obstruccion.tolist()
+        ):
+            datos_arista = {"capacidad_flujo": _numero(capacidad_flujo)}
+            if obstruccion != 0:
+                datos_arista["obstruccion"] = _numero(obstruccion)
+            aristas.append((nombres[origen], nombres[destino], datos_arista))
+
+        self.grafo.clear()
+        self.grafo.add_nodes_from(nodos)
+        self.grafo.add_edges_from(aristas)
+        self._red_reemplazada()
+        compacta.version = self.version_topologia
+        self._compacta = compacta
+        self.cambios_sin_guardar = True
+        if self.eventos:
+            self.eventos.emitir("datos_cargados", archivo=ruta)
+
+    # Guardar estado actual en archivo JSON. Dentro de un lote solo marca la red como modificada, con el
+    # diario activo confirma los registros del diario en lugar de escribir el json, y con el guardado
+    # diferido activo deja la escritura agendada para el hilo en segundo plano. Una red sin archivo json
+    # (solo lectura) nunca escribe: los cambios quedan en memoria.
     def guardar_en_json(self):
-        datos = {
+        self.cambios_sin_guardar = True
+        if self._lotes_abiertos > 0 or self.archivo_json is None:
+            return
+        if self._diario is not None:
+            self._diario.confirmar()
+            self.cambios_sin_guardar = False
+            return
+        if self._escritor_diferido is not None:
+            self._escritor_diferido.agendar()
+            return
+        self.escribir_json()
+
+    # Escribe de inmediato el estado actual en el archivo JSON (temporal + renombrado) y limpia la marca
+    # de cambios pendientes.
+    def escribir_json(self):
+        if self.archivo_json is None:
+            raise ValueError("La red no tiene archivo json asociado (modo solo lectura).")
+        with self._cerrojo_cambios:
+            datos, version = self._datos_a_escribir()
+        self._escribir_datos(datos, version)
+
+    # Copia los datos del json y limpia la marca de cambios pendientes. Se llama con el cerrojo de cambios
+    # tomado; la copia no comparte nada con el grafo, asi que se puede serializar fuera del cerrojo.
+    def _datos_a_escribir(self):
+        self.cambios_sin_guardar = False
+        self._version_copiada = self.version_datos
+        return self._datos_json(), self.version_datos
+
+    # Serializa y escribe los datos copiados con _datos_a_escribir. Si otro hilo ya escribio una version
+    # mas nueva de la red, esta copia vieja se descarta.
+    def _escribir_datos(self, datos, version):
+        contenido = json.dumps(datos, indent=4)
+        with self._cerrojo_escritura:
+            if version < self._version_escrita:
+                return
+            escribir_archivo_atomico(self.archivo_json, contenido)
+            self._version_escrita = version
+        self._contar("bytes_json_escritos", len(contenido.encode()))
+        if self.eventos:
+            self.eventos.emitir("datos_guardados", archivo=self.archivo_json)
+
+    # Arma el diccionario con el formato de red_agua.json
+    def _datos_json(self):
+        return {
             "casas": {
-                nodo: {"demanda": data["demanda"]}
+                nodo: {"demanda": data["demanda"], **_posicion(data)}
                 for nodo, data in self.grafo.nodes(data=True) if data["tipo"] == "casa"
             },
             "tanques": {
                 nodo: {
                     "capacidad": data["capacidad"],
                     "nivel": data["nivel"],  # Aquí agregamos el nivel del tanque
-                    "conexiones": list(self.grafo.neighbors(nodo))
+                    "conexiones": list(self.grafo.neighbors(nodo)),
+                    **_posicion(data),
                 }
                 for nodo, data in self.grafo.nodes(data=True) if data["tipo"] == "tanque"
             },
@@ -239,10 +843,8 @@ class RedDeAgua:
                 for u, v, datos in self.grafo.edges(data=True)
             ]
         }
-        with open(self.archivo_json, 'w') as f:
-            json.dump(datos, f, indent=4)
-        print(f"Datos guardados en {self.archivo_json}")
     
+    @_modifica_red
     def actualizar_nivel_tanque(self, tanque):
         if tanque in self.grafo.nodes and self.grafo.nodes[tanque]["tipo"] == "tanque":
             # Reiniciar el nivel al máximo (capacidad del tanque)
@@ -256,9 +858,12 @@ class RedDeAgua:
 
             # Asegurar que el nivel no sea negativo
             self.grafo.nodes[tanque]["nivel"] = max(0, nivel_actual)
-            print(f"El nivel del tanque '{tanque}' se actualizó a {nivel_actual}.")
+            self._nivel_modificado(tanque)
+            if self.eventos:
+                self.eventos.emitir("nivel_actualizado", tanque=tanque, nivel=nivel_actual)
         else:
-            print(f"El nodo '{tanque}' no es un tanque o no existe en la red.")
+            if self.eventos:
+                self.eventos.emitir("nodo_no_es_tanque", tanque=tanque)
             
         #Verifica si las tuberías que alimentan a una casa satisfacen su demanda de agua.
         #Retorna True si la demanda es satisfecha, False en caso contrario.
@@ -272,16 +877,26 @@ class RedDeAgua:
                 flujo_total += self.grafo[origen][casa].get("capacidad_flujo", 0)
 
             if flujo_total >= demanda:
-                print(f"La demanda de la casa '{casa}' está satisfecha ({flujo_total}/{demanda}).")
+                if self.eventos:
+                    self.eventos.emitir("demanda_satisfecha", casa=casa, flujo=flujo_total, demanda=demanda)
                 return True
             else:
-                print(f"La demanda de la casa '{casa}' NO está satisfecha ({flujo_total}/{demanda}).")
+                if self.eventos:
+                    self.eventos.emitir("demanda_no_satisfecha", casa=casa, flujo=flujo_total, demanda=demanda)
                 return False
         else:
-            print(f"El nodo '{casa}' no es una casa o no existe en la red.")
+            if self.eventos:
+                self.eventos.emitir("nodo_no_es_casa", casa=casa)
             return False
         
+        #Devuelve el flujo disponible por nodo. Usa el motor incremental, que despues de cada cambio
+        #recalcula solo los nodos aguas abajo; el resultado es el mismo de calcular_distribucion_flujo.
+        #El diccionario devuelto no debe modificarse.
+    def distribucion_flujo(self):
+        return self._distribucion.resultado()
+
         #Calcula la distribución de flujo en la red, verificando excedentes en cada nodo.
+        #Recorre toda la red; se conserva como referencia del motor incremental.
     def calcular_distribucion_flujo(self):
         flujo_disponible = {nodo: 0 for nodo in self.grafo.nodes}
 
@@ -291,11 +906,12 @@ class RedDeAgua:
                 flujo_disponible[nodo] = data["nivel"]
 
         # Realizar un recorrido BFS desde los tanques
+        self._contar("recorridos_distribucion")
         visitados = set()
-        cola = [nodo for nodo, data in self.grafo.nodes(data=True) if data["tipo"] == "tanque"]
+        cola = deque(nodo for nodo, data in self.grafo.nodes(data=True) if data["tipo"] == "tanque")
 
         while cola:
-            nodo_actual = cola.pop(0)
+            nodo_actual = cola.popleft()
             if nodo_actual in visitados:
                 continue
 
@@ -327,156 +943,270 @@ class RedDeAgua:
     
     #Verifica el suministro de agua para todas las casas y devuelve un resumen detallado.
     def verificar_suministro(self):
-            resultados = {}
-
-            for nodo, data in self.grafo.nodes(data=True):
-                if data["tipo"] == "casa":
-                    if not self.esta_conectada_a_tanque(nodo):
-                        resultados[nodo] = {
-                            "mensaje": "No está conectada a un tanque.",
-                            "flujo_recibido": 0,
-                            "demanda": data["demanda"]
-                        }
-                        continue
-
-                    # Calcular el flujo recibido
-                    flujo_recibido = sum(
-                        self.grafo[origen][nodo]["capacidad_flujo"]
-                        for origen, _ in self.grafo.in_edges(nodo)
-                        if self.grafo[origen][nodo]["capacidad_flujo"] > 0
-                    )
-
-                    # Verificar si el flujo recibido es suficiente
-                    if flujo_recibido >= data["demanda"]:
-                        resultados[nodo] = {
-                            "mensaje": "Suministro completo.",
-                            "flujo_recibido": flujo_recibido,
-                            "demanda": data["demanda"]
-                        }
-                    else:
-                        resultados[nodo] = {
-                            "mensaje": "No tiene suficiente agua.",
-                            "flujo_recibido": flujo_recibido,
-                            "demanda": data["demanda"]
-                        }
-            return resultados
+            indice = self.indice_alcance()
+            return {
+                nodo: self._estado_suministro(nodo, indice)
+                for nodo, data in self.grafo.nodes(data=True) if data["tipo"] == "casa"
+            }
+
+    #Estado del suministro de una casa: si esta conectada a un tanque y si el flujo que le llega por sus
+    #tuberías cubre su demanda
+    def _estado_suministro(self, casa, indice):
+        demanda = self.grafo.nodes[casa]["demanda"]
+        if not indice.esta_conectado(casa):
+            return {"mensaje": "No está conectada a un tanque.", "flujo_recibido": 0, "demanda": demanda}
+
+        # Calcular el flujo recibido
+        flujo_recibido = sum(
+            datos_arista["capacidad_flujo"]
+            for datos_arista in self.grafo.pred[casa].values()
+            if datos_arista["capacidad_flujo"] > 0
+        )
+
+        # Verificar si el flujo recibido es suficiente
+        return {
+            "mensaje": "Suministro completo." if flujo_recibido >= demanda else "No tiene suficiente agua.",
+            "flujo_recibido": flujo_recibido,
+            "demanda": demanda
+        }
+
+    #Version vectorizada de verificar_suministro: suma el flujo entrante de todas las casas de una vez sobre
+    #el arreglo de tuberías de la red compacta y lo compara con la demanda usando NumPy. Devuelve la misma
+    #estructura; con solo_fallas=True solo arma las entradas de las casas con problemas.
+    def verificar_suministro_vectorizado(self, solo_fallas=False):
+        compacta = self.red_compacta()
+        casas, conectadas, flujo_recibido, suficiente = compacta.verificar_suministro()
+        nodos = self.grafo.nodes
+        nombres = compacta.nombres
+
+        if solo_fallas:
+            seleccion = np.flatnonzero(~(conectadas & suficiente))
+        else:
+            seleccion = range(len(casas))
+        conectadas = conectadas.tolist()
+        suficiente = suficiente.tolist()
+
+        resultados = {}
+        for i in seleccion:
+            casa = nombres[casas[i]]
+            demanda = nodos[casa]["demanda"]
+            if not conectadas[i]:
+                resultados[casa] = {"mensaje": "No está conectada a un tanque.", "flujo_recibido": 0, "demanda": demanda}
+            else:
+                resultados[casa] = {
+                    "mensaje": "Suministro completo." if suficiente[i] else "No tiene suficiente agua.",
+                    "flujo_recibido": _numero(flujo_recibido[i]),
+                    "demanda": demanda
+                }
+        return resultados
+        
         
+    #Simula `horas` horas en pasos de `paso_minutos` minutos y devuelve como arreglos el nivel de cada tanque
+    #y la demanda no cubierta en cada paso (ver simulacion.simular). `perfiles` es un diccionario
+    #nombre -> factores de demanda a lo largo del dia; cada casa usa el perfil indicado en `perfil_de_casa`
+    #(casa -> nombre), o el perfil con su mismo nombre, o una demanda constante. `recarga` indica los
+    #litros por segundo que entran a cada tanque. No modifica el nivel guardado de los tanques.
+    def simular_periodo_extendido(self, horas=24, paso_minutos=1, perfiles=None, perfil_de_casa=None, recarga=None, detalle_casas=False):
+        compacta = self.red_compacta()
+        perfiles = dict(perfiles or {})
+        perfil_de_casa = perfil_de_casa or {}
+        nombres_perfiles = list(perfiles) + [None]
+        posicion_perfil = {nombre: i for i, nombre in enumerate(nombres_perfiles)}
+        lista_perfiles = list(perfiles.values()) + [[1.0]]
+
+        nombres = compacta.nombres
+        casas = np.flatnonzero(compacta.tipo == TIPO_CASA)
+        perfil_por_casa = []
+        for i in casas.tolist():
+            casa = nombres[i]
+            nombre_perfil = perfil_de_casa.get(casa, casa)
+            perfil_por_casa.append(posicion_perfil.get(nombre_perfil, posicion_perfil[None]))
+        for casa, nombre_perfil in perfil_de_casa.items():
+            if nombre_perfil not in perfiles:
+                raise ValueError(f"El perfil {nombre_perfil} de la casa {casa} no existe.")
+
+        tanques = np.flatnonzero(compacta.tipo == TIPO_TANQUE)
+        recarga = recarga or {}
+        recarga_por_tanque = np.array([recarga.get(nombres[i], 0) for i in tanques.tolist()], dtype=np.float64)
+
+        paso_segundos = paso_minutos * 60
+        resultado = simulacion.simular(
+            compacta, int(round(horas * 60 / paso_minutos)), paso_segundos, lista_perfiles, perfil_por_casa,
+            recarga_por_tanque, detalle_casas,
+        )
+        resultado["tanques"] = [nombres[i] for i in resultado["tanques"].tolist()]
+        resultado["casas"] = [nombres[i] for i in resultado["casas"].tolist()]
+        return resultado
+
+    #Analisis de contingencia: para cada tubería, que casas pierden el servicio si falla (sin modificar la
+    #red). Con `muestras` > 0 tambien evalua esa cantidad de fallas simultaneas de `k` tuberías al azar.
+    #Devuelve los escenarios ordenados de mayor a menor demanda insatisfecha, cada uno con sus tuberías,
+    #la demanda que deja de cubrirse y las casas afectadas.
+    def analisis_contingencia(self, muestras=0, k=2, semilla=0, procesos=None):
+        compacta = self.red_compacta()
+        escenarios = contingencia.escenarios_de_falla(compacta.num_aristas, k, muestras, semilla)
+        resultados = contingencia.evaluar_escenarios(compacta, escenarios, procesos)
+
+        nombres = compacta.nombres
+        origen = compacta.origen.tolist()
+        destino = compacta.destino.tolist()
+        ranking = [
+            {
+                "tuberias": [(nombres[origen[arista]], nombres[destino[arista]]) for arista in escenario],
+                "demanda_insatisfecha": _numero(demanda),
+                "casas_afectadas": [nombres[casa] for casa in casas],
+            }
+            for escenario, (demanda, casas) in zip(escenarios, resultados)
+        ]
+        ranking.sort(key=lambda fila: (fila["demanda_insatisfecha"], len(fila["casas_afectadas"])), reverse=True)
+        return ranking
         
         #Verifica si el nodo está conectado a un tanque, directa o indirectamente.
+        #Consulta el indice de alcance, que se recalcula solo cuando cambia la topologia.
     def esta_conectada_a_tanque(self, nodo):
-        # Obtener todos los tanques del grafo
-        tanques = [n for n, d in self.grafo.nodes(data=True) if d["tipo"] == "tanque"]
-
-        # Verificar si existe un camino desde algún tanque hasta el nodo
-        for tanque in tanques:
-            if nx.has_path(self.grafo, tanque, nodo):
-                return True
-        return False
+        return self.indice_alcance().esta_conectado(nodo)
     
+    #Busca la ruta de mayor capacidad (la de mejor cuello de botella) desde algun tanque hasta la casa.
+    #Devuelve la ruta desde el tanque hasta la casa y su flujo, o (None, 0) si no hay ruta o ningun
+    #tanque alcanza a cubrir la demanda. Es la busqueda de rutas_alternativas_optimas limitada a la casa,
+    #asi que las dos dan siempre la misma ruta, tambien cuando hay varias con el mismo cuello de botella.
     def buscar_ruta_alternativa_optima(self, casa_afectada):
-        if casa_afectada not in self.grafo.nodes or self.grafo.nodes[casa_afectada]["tipo"] != "casa":
-            raise ValueError(f"El nodo {casa_afectada} no es una casa válida.")
-        
-        demanda = self.grafo.nodes[casa_afectada]["demanda"]
-        flujo_maximo = {nodo: 0 for nodo in self.grafo.nodes}
-        rutas = {nodo: [] for nodo in self.grafo.nodes}
-        
-        # Iniciar la cola de prioridad
-        pq = [(0, casa_afectada)]  
-        flujo_maximo[casa_afectada] = float('inf')
-        rutas[casa_afectada] = [casa_afectada]
-        
+        return self.rutas_alternativas_optimas([casa_afectada])[casa_afectada]
+
+    #Arbol de rutas de mayor capacidad desde todos los tanques a la vez: una sola busqueda tipo Dijkstra
+    #por las tuberías en su sentido, que guarda para cada nodo su predecesor en la mejor ruta y el cuello
+    #de botella de esa ruta. Usa la misma capacidad ajustada que buscar_ruta_alternativa_optima.
+    #Con `region` (nodos) solo se recorren esos nodos y las tuberías entre ellos. Entre rutas con el mismo
+    #cuello de botella se queda la primera que se encuentra: los nodos se visitan de mayor a menor ancho
+    #y, con el mismo ancho, por nombre.
+    def arbol_rutas_mas_anchas(self, region=None):
+        self._contar("recorridos_rutas_mas_anchas")
+        padre = {}
+        ancho = {}
+        pq = []
+        for nodo, datos in self.grafo.nodes(data=True):
+            if datos["tipo"] == "tanque" and (region is None or nodo in region):
+                padre[nodo] = None
+                ancho[nodo] = float('inf')
+                pq.append((-ancho[nodo], nodo))
+        heapq.heapify(pq)
+
         while pq:
-            _, nodo_actual = heapq.heappop(pq)
+            negativo, nodo_actual = heapq.heappop(pq)
+            if -negativo < ancho[nodo_actual]:
+                continue  # Entrada vieja, el nodo ya se mejoro despues
             
-            for vecino in self.grafo.predecessors(nodo_actual):
-                datos_arista = self.grafo[vecino][nodo_actual]
+            for vecino, datos_arista in self.grafo.adj[nodo_actual].items():
                 capacidad_flujo = datos_arista.get("capacidad_flujo", 0)
                 obstruccion = datos_arista.get("obstruccion", 0)
-                
-                if obstruccion == -1 or capacidad_flujo == 0:
+                if obstruccion == -1 or capacidad_flujo == 0 or (region is not None and vecino not in region):
                     continue
-                
-                # Calcular flujo ajustado
+
                 capacidad_ajustada = capacidad_flujo * (1 - obstruccion / 100)
-                flujo_disponible = min(flujo_maximo[nodo_actual], capacidad_ajustada)
-                
-                if flujo_disponible > flujo_maximo[vecino]:
-                    flujo_maximo[vecino] = flujo_disponible
-                    rutas[vecino] = rutas[nodo_actual] + [vecino]
+                flujo_disponible = min(ancho[nodo_actual], capacidad_ajustada)
+                if flujo_disponible > ancho.get(vecino, 0):
+                    ancho[vecino] = flujo_disponible
+                    padre[vecino] = nodo_actual
                     heapq.heappush(pq, (-flujo_disponible, vecino))
         
-        # Buscar el tanque más cercano que pueda suplir
-        for tanque in [nodo for nodo, datos in self.grafo.nodes(data=True) if datos["tipo"] == "tanque"]:
-            if flujo_maximo[tanque] >= demanda:
-                return rutas[tanque][::-1] + [casa_afectada], flujo_maximo[tanque]
-        
-        return None, 0
+        return padre, ancho
+
+    #Version por lotes de buscar_ruta_alternativa_optima: con un solo arbol de rutas de mayor capacidad
+    #obtiene la ruta y el flujo de cada casa (todas, o las indicadas) siguiendo los predecesores. Si se
+    #indican las casas, el arbol solo recorre la parte de la red aguas arriba de ellas, la unica por la
+    #que pueden pasar sus rutas.
+    def rutas_alternativas_optimas(self, casas=None):
+        nodos = self.grafo.nodes
+        if casas is None:
+            casas = [nodo for nodo, datos in nodos(data=True) if datos["tipo"] == "casa"]
+            region = None
+        else:
+            for casa in casas:
+                if casa not in nodos or nodos[casa]["tipo"] != "casa":
+                    raise ValueError(f"El nodo {casa} no es una casa válida.")
+            region = self._region(casas, self.grafo.pred)
+        padre, ancho = self.arbol_rutas_mas_anchas(region)
+
+        resultados = {}
+        for casa in casas:
+            flujo = ancho.get(casa, 0)
+            if flujo == 0 or flujo < nodos[casa]["demanda"]:
+                resultados[casa] = (None, 0)
+                continue
+            ruta = [casa]
+            nodo = padre[casa]
+            while nodo is not None:
+                ruta.append(nodo)
+                nodo = padre[nodo]
+            resultados[casa] = (ruta[::-1], flujo)
+        return resultados
     
+    # Impacto de un cambio en la tubería nodo1 -> nodo2 (una obstruccion ya aplicada con editar_tuberia).
+    # Solo se revisan las casas cuyo suministro puede cambiar: las que estan aguas abajo de la tubería, o
+    # de su tanque de origen si sale de un tanque (editar_tuberia tambien cambia su nivel). Devuelve:
+    #
+    # - "afectadas": las casas revisadas, en orden de cercania a la tubería;
+    # - "sin_suministro": casa -> estado (como en verificar_suministro) de las que quedaron con problemas;
+    # - "rutas": casa -> (ruta, flujo) de la mejor ruta alternativa de cada casa con problemas, o (None, 0).
+    #
+    # El costo depende del tamaño de la zona afectada, no del de la red.
+    def impacto_obstruccion(self, nodo1, nodo2):
+        if not self.grafo.has_edge(nodo1, nodo2):
+            raise ValueError(f"No existe una tubería de {nodo1} a {nodo2}.")
+        nodos = self.grafo.nodes
+        inicio = nodo1 if nodos[nodo1]["tipo"] == "tanque" else nodo2
+        afectadas = [nodo for nodo in self._region([inicio], self.grafo.adj) if nodos[nodo]["tipo"] == "casa"]
+        self._contar("casas_revisadas_obstruccion", len(afectadas))
+
+        indice = self.indice_alcance()
+        sin_suministro = {}
+        for casa in afectadas:
+            estado = self._estado_suministro(casa, indice)
+            if estado["flujo_recibido"] < estado["demanda"]:
+                sin_suministro[casa] = estado
+        rutas = self.rutas_alternativas_optimas(list(sin_suministro)) if sin_suministro else {}
+        return {"afectadas": afectadas, "sin_suministro": sin_suministro, "rutas": rutas}
+
+    #Nodos alcanzables desde `inicio` (incluidos) siguiendo `vecinos`: grafo.adj para ir aguas abajo o
+    #grafo.pred para ir aguas arriba. Devuelve un diccionario con los nodos en orden de recorrido.
+    def _region(self, inicio, vecinos):
+        region = dict.fromkeys(inicio)
+        cola = deque(region)
+        while cola:
+            for vecino in vecinos[cola.popleft()]:
+                if vecino not in region:
+                    region[vecino] = None
+                    cola.append(vecino)
+        return region
+
         #Cambia el sentido de una tubería en la red.
         #Si el nuevo destino es un tanque, ajusta su nivel con el flujo disponible en el nodo origen.
         #También actualiza el JSON para reflejar el nuevo orden de los nodos.
+    @_modifica_red
     def cambiar_sentido_tuberia(self, nodo1, nodo2):
         if not self.grafo.has_edge(nodo1, nodo2):
-            print("La tubería no existe en esta dirección.")
+            if self.eventos:
+                self.eventos.emitir("tuberia_inexistente", nodo1=nodo1, nodo2=nodo2)
             return
 
         # Obtener la capacidad de la tubería
         capacidad_flujo = self.grafo[nodo1][nodo2]["capacidad_flujo"]
 
-        # Eliminar la tubería actual del grafo
-        self.grafo.remove_edge(nodo1, nodo2)
-
-        # Agregar la tubería en la dirección opuesta
-        self.grafo.add_edge(nodo2, nodo1, capacidad_flujo=capacidad_flujo)
-        print(f"Tubería cambiada de dirección: {nodo1} -> {nodo2} ahora es {nodo2} -> {nodo1}.")
-
-        # Actualizar el JSON
-        with open(self.archivo_json, 'r') as f:
-            datos = json.load(f)
+        with self.lote():
+            # Eliminar la tubería actual del grafo; si salia de un tanque, este recupera ese flujo
+            self.grafo.remove_edge(nodo1, nodo2)
+            self._arista_eliminada(nodo1, nodo2)
+            if self.grafo.nodes[nodo1]["tipo"] == "tanque":
+                self.actualizar_nivel_tanque(nodo1)
 
-        # Buscar y actualizar la tubería en el JSON
-        tuberias = datos.get("tuberias", [])
-        tuberia_a_eliminar = None
-        for tuberia in tuberias:
-            if tuberia["nodo1"] == nodo1 and tuberia["nodo2"] == nodo2:
-                tuberia_a_eliminar = tuberia
-                break
-        
-        if tuberia_a_eliminar:
-            tuberias.remove(tuberia_a_eliminar)  # Eliminar la tubería original
-            # Agregar la tubería con el nuevo orden
-            tuberias.append({"nodo1": nodo2, "nodo2": nodo1, "capacidad_flujo": capacidad_flujo})
-        
-        # Guardar los cambios en el JSON
-        datos["tuberias"] = tuberias
-        with open(self.archivo_json, 'w') as f:
-            json.dump(datos, f, indent=4)
+            # Agregar la tubería en la dirección opuesta, con los mismos ajustes de nivel y flujo
+            # que cualquier tubería nueva
+            self.agregar_tuberia(nodo2, nodo1, capacidad_flujo)
+            if self.eventos:
+                self.eventos.emitir("sentido_cambiado", nodo1=nodo1, nodo2=nodo2)
 
-        # Recargar el grafo para reflejar los cambios
-        self.cargar_desde_json(self.archivo_json)
+            self.guardar_en_json()
         
-        #Verifica si hay conexiones duplicadas en el grafo y devuelve los mensajes.
-    def verificar_conexiones_duplicadas(self):
-        mensajes = []
-        for nodo1, nodo2 in self.grafo.edges:
-            if self.grafo.has_edge(nodo2, nodo1):  # Si ya existe la conexión en la dirección opuesta
-                mensajes.append(f"Conexión duplicada encontrada entre {nodo1} y {nodo2}.")
-        return mensajes
-    
-    #Detecta bucles (ciclos) en la red de distribución de agua y devuelve los mensajes.
-    def detectar_bucles(self):
-        mensajes = []
-        try:
-            # Detectar ciclos en el grafo dirigido
-            ciclos = list(nx.simple_cycles(self.grafo))
-            if ciclos:
-                for ciclo in ciclos:
-                    mensajes.append(f"Se ha detectado un bucle en el flujo: {' -> '.join(ciclo)}.")
-        except Exception as e:
-            mensajes.append(f"Error al detectar ciclos: {e}")
-        return mensajes
-
     #Verifica si hay conexiones duplicadas en el grafo y devuelve los mensajes.
     def verificar_conexiones_duplicadas(self):
         mensajes = []
@@ -485,18 +1215,61 @@ class RedDeAgua:
                 mensajes.append(f"Conexión duplicada encontrada entre {nodo1} y {nodo2}.")
         return mensajes
 
-    #Detecta bucles (ciclos) en la red de distribución de agua y devuelve los mensajes.
-    def detectar_bucles(self):
+    #Regiones de la red con bucles: componentes fuertemente conexas con mas de un nodo, o un nodo con una
+    #tubería hacia si mismo. Se calculan en tiempo lineal; cada region es una lista de nodos en el orden
+    #en que aparecen en la red.
+    def regiones_con_bucles(self):
+        self._contar("recorridos_bucles")
+        orden = {nodo: i for i, nodo in enumerate(self.grafo)}
+        regiones = []
+        for componente in nx.strongly_connected_components(self.grafo):
+            if len(componente) > 1 or any(self.grafo.has_edge(nodo, nodo) for nodo in componente):
+                regiones.append(sorted(componente, key=orden.__getitem__))
+        regiones.sort(key=lambda region: orden[region[0]])
+        return regiones
+
+    #Detecta bucles (ciclos) en la red de distribución de agua y devuelve un mensaje por cada region con
+    #bucles, sin enumerar los ciclos (pueden ser exponencialmente muchos).
+    def detectar_bucles(self, max_nodos_mostrados=10):
         mensajes = []
-        try:
-            # Detectar ciclos en el grafo dirigido
-            ciclos = list(nx.simple_cycles(self.grafo))
-            if ciclos:
-                for ciclo in ciclos:
-                    mensajes.append(f"Se ha detectado un bucle en el flujo: {' -> '.join(ciclo)}.")
-        except Exception as e:
-            mensajes.append(f"Error al detectar ciclos: {e}")
+        for region in self.regiones_con_bucles():
+            nodos = ', '.join(region[:max_nodos_mostrados])
+            if len(region) > max_nodos_mostrados:
+                nodos += f" y {len(region) - max_nodos_mostrados} más"
+            mensajes.append(f"Se ha detectado una región con bucles en el flujo ({len(region)} nodos): {nodos}.")
         return mensajes
+
+    #Enumera los ciclos uno por uno, solo dentro de las regiones con bucles, y se detiene al llegar a
+    #max_ciclos ciclos o despues de max_segundos segundos (None quita el limite). Es un generador: los ciclos
+    #se calculan a medida que se piden. Cada ciclo se reporta una sola vez, empezando por su nodo que aparece
+    #primero en la region.
+    def enumerar_bucles(self, max_ciclos=1000, max_segundos=5.0):
+        limite = None if max_segundos is None else time.perf_counter() + max_segundos
+        adyacencia = self.grafo.adj
+        encontrados = 0
+        for region in self.regiones_con_bucles():
+            posicion = {nodo: i for i, nodo in enumerate(region)}
+            for k, inicio in enumerate(region):
+                # Recorrido en profundidad por los nodos de la region posteriores al inicio
+                camino = [inicio]
+                en_camino = {inicio}
+                pila = [iter(adyacencia[inicio])]
+                while pila:
+                    if limite is not None and time.perf_counter() > limite:
+                        return
+                    vecino = next(pila[-1], None)
+                    if vecino is None:
+                        pila.pop()
+                        en_camino.discard(camino.pop())
+                    elif vecino == inicio:
+                        if max_ciclos is not None and encontrados >= max_ciclos:
+                            return
+                        encontrados += 1
+                        yield list(camino)
+                    elif vecino not in en_camino and posicion.get(vecino, -1) > k:
+                        camino.append(vecino)
+                        en_camino.add(vecino)
+                        pila.append(iter(adyacencia[vecino]))
     
     #Verifica si hay conexiones con nodos no definidos (por ejemplo, un tanque o barrio no existente).
     def verificar_conexiones_con_nodos_no_definidos(self):
@@ -510,6 +1283,7 @@ class RedDeAgua:
     # Realiza una búsqueda en amplitud (BFS) para encontrar un camino aumentante.
     #Trabaja sobre una copia del grafo.
     def bfs(self, grafo, source, sink, parent):
+        self._contar("recorridos_bfs")
         visited = set()
         queue = deque([source])
         visited.add(source)
@@ -563,50 +1337,195 @@ class RedDeAgua:
         
         return max_flow
     
+    #Calcula el flujo maximo desde 'fuente' hasta 'sumidero' con Dinic o push-relabel, sobre la red compacta
+    #y sin copiar el grafo. Da el mismo valor que ford_fulkerson.
+    def flujo_maximo(self, fuente, sumidero, metodo="dinic"):
+        return self.analisis_flujo_maximo(fuente, sumidero, metodo, detalle=False)["valor"]
+
+    #Igual que flujo_maximo, pero ademas devuelve el flujo asignado a cada tubería (solo las que llevan
+    #flujo) y las tuberías del corte minimo, que son el cuello de botella entre los dos nodos.
+    def analisis_flujo_maximo(self, fuente, sumidero, metodo="dinic", detalle=True):
+        for nodo in (fuente, sumidero):
+            if nodo not in self.grafo.nodes:
+                raise ValueError(f"El nodo {nodo} no existe en la red.")
+        compacta = self.red_compacta()
+        residual = flujo_maximo.RedResidual(compacta.num_nodos, compacta.origen, compacta.destino, compacta.capacidad_flujo)
+        i_fuente, i_sumidero = compacta.indice[fuente], compacta.indice[sumidero]
+        valor = flujo_maximo.resolver(residual, i_fuente, i_sumidero, metodo)
+        resultado = {"valor": _numero(valor)}
+        if not detalle:
+            return resultado
+
+        nombres = compacta.nombres
+        flujos = residual.flujos()
+        resultado["flujos"] = {
+            (nombres[compacta.origen[i]], nombres[compacta.destino[i]]): _numero(flujos[i])
+            for i in np.flatnonzero(flujos > 0)
+        }
+        lado_fuente = residual.lado_fuente(i_fuente)
+        corte = np.flatnonzero(lado_fuente[compacta.origen] & ~lado_fuente[compacta.destino])
+        resultado["corte"] = [(nombres[compacta.origen[i]], nombres[compacta.destino[i]]) for i in corte]
+        return resultado
+    
+    #Verifica si la red completa puede abastecer a todas las casas con un solo calculo de flujo maximo:
+    #una fuente virtual alimenta a cada tanque con su nivel y cada casa descarga en un sumidero virtual
+    #con su demanda. Devuelve el flujo total entregable, la demanda no cubierta de cada casa y el corte
+    #minimo, separado en tuberías, tanques cuyo nivel limita y casas cuya demanda ya se cubre por completo.
+    def factibilidad_suministro(self, metodo="dinic"):
+        compacta = self.red_compacta()
+        n = compacta.num_nodos
+        fuente, sumidero = n, n + 1
+        tanques = np.flatnonzero(compacta.tipo == TIPO_TANQUE)
+        casas = np.flatnonzero(compacta.tipo == TIPO_CASA)
+
+        origen = np.concatenate([compacta.origen, np.full(len(tanques), fuente), casas])
+        destino = np.concatenate([compacta.destino, tanques, np.full(len(casas), sumidero)])
+        capacidad = np.concatenate([compacta.capacidad_flujo, np.maximum(compacta.nivel[tanques], 0), compacta.demanda[casas]])
+        residual = flujo_maximo.RedResidual(n + 2, origen, destino, capacidad)
+        flujo_total = flujo_maximo.resolver(residual, fuente, sumidero, metodo)
+
+        m, t = compacta.num_aristas, len(tanques)
+        flujos = residual.flujos()
+        faltante = compacta.demanda[casas] - flujos[m + t:]
+        lado_fuente = residual.lado_fuente(fuente)
+        nombres = compacta.nombres
+        corte_tuberias = np.flatnonzero(lado_fuente[compacta.origen] & ~lado_fuente[compacta.destino])
+
+        return {
+            "flujo_total": _numero(flujo_total),
+            "demanda_total": _numero(compacta.demanda[casas].sum()),
+            "demanda_insatisfecha": {
+                nombres[casas[i]]: _numero(faltante[i]) for i in np.flatnonzero(faltante > 0)
+            },
+            "corte": {
+                "tuberias": [(nombres[compacta.origen[i]], nombres[compacta.destino[i]]) for i in corte_tuberias],
+                "tanques": [nombres[i] for i in tanques[~lado_fuente[tanques]]],
+                "casas": [nombres[i] for i in casas[lado_fuente[casas]]],
+            },
+        }
+
     #Recarga el archivo JSON y actualiza el grafo.
+    @_modifica_red
     def recargar_json(self):
         try:
+            # Con el guardado diferido puede haber cambios que todavia no estan en el archivo (agendados,
+            # o copiados por el hilo pero sin escribir): se escriben antes de leerlo, asi la recarga no los
+            # pierde, igual que cuando cada cambio se escribia al momento
+            if self.cambios_sin_guardar or self._version_copiada > self._version_escrita:
+                self.escribir_json()
             with open(self.archivo_json, 'r') as f:
                 datos = json.load(f)
 
             # Limpiar el grafo actual
             self.grafo.clear()
+            self._red_reemplazada()
 
             # Reconstruir el grafo desde el JSON
-            for casa, info in datos.get("casas", {}).items():
-                self.agregar_casa(casa, info["demanda"])
-            for tanque, info in datos.get("tanques", {}).items():
-                self.agregar_tanque_con_capacidad(tanque, info["capacidad"], info["conexiones"])
-            for tuberia in datos.get("tuberias", []):
-                self.agregar_tuberia(tuberia["nodo1"], tuberia["nodo2"], tuberia["capacidad_flujo"])
-
-            print(f"Datos recargados desde {self.archivo_json}.")
+            self._cargar_datos(datos)
+            self.cambios_sin_guardar = False
+
+            if self.eventos:
+                self.eventos.emitir("datos_recargados", archivo=self.archivo_json)
         except Exception as e:
-            print(f"Error al recargar JSON: {e}")
+            if self.eventos:
+                self.eventos.emitir("error_recarga", error=e)
             
-            #  Proponer nuevas conexiones entre tanques para mejorar la cobertura en caso de obstrucciones,
-            #teniendo en cuenta las capacidades de los tanques y las restricciones de presión.
-    def proponer_nuevas_conexiones(self):
-        sugerencias = []
-        
-        # Obtener los tanques con capacidad disponible
-        for tanque_origen, data_origen in self.grafo.nodes(data=True):
-            if data_origen["tipo"] == "tanque" and self.es_presion_adecuada(data_origen):
-                capacidad_disponible = data_origen["capacidad"] - data_origen["nivel"]
-                
-                # Buscar tanques posibles para conectar
-                for tanque_destino, data_destino in self.grafo.nodes(data=True):
-                    if tanque_origen != tanque_destino and data_destino["tipo"] == "tanque" and self.es_presion_adecuada(data_destino):
-                        capacidad_adecuada = data_destino["capacidad"] - data_destino["nivel"]
-                        
-                        # Verificar si la conexión es posible según las capacidades
-                        if capacidad_disponible <= capacidad_adecuada:
-                            # Verificar si la presión es adecuada
-                            if self.es_conexion_valida(tanque_origen, tanque_destino):
-                                sugerencias.append(f"Conectar {tanque_origen} con {tanque_destino} para optimizar flujo.")
-        
-        # Retornar las sugerencias generadas
-        return sugerencias
+    # Proponer nuevas conexiones entre tanques para mejorar la cobertura en caso de obstrucciones, teniendo
+    # en cuenta las capacidades de los tanques y las restricciones de presión. Devuelve las `k` mejores
+    # de conexiones_entre_tanques (todas con k=None) como texto.
+    def proponer_nuevas_conexiones(self, k=20, radio=None, adyacentes=False):
+        return [
+            f"Conectar {tanque_origen} con {tanque_destino} para optimizar flujo ({beneficio} L más de espacio libre en {tanque_destino})."
+            for tanque_origen, tanque_destino, beneficio in self.conexiones_entre_tanques(k, radio, adyacentes)
+        ]
+
+    # Pares de tanques (origen, destino) que conviene conectar, con las mismas reglas que
+    # es_conexion_valida: los dos con presion adecuada y el destino con al menos tanto espacio libre
+    # (capacidad - nivel) como el origen. El beneficio es cuanto espacio libre de mas tiene el destino, y
+    # se devuelven los `k` pares de mas beneficio, de mayor a menor (todos con k=None).
+    # Los tanques con presion adecuada se filtran una vez y se ordenan por espacio libre, asi los destinos
+    # validos de cada origen son un tramo del orden que se ubica con busqueda binaria, y los k mejores pares
+    # salen de un heap con el mejor destino restante de cada origen, sin armar los T^2 pares.
+    # Con `radio` solo se consideran tanques a esa distancia o menos (los que no tienen coordenadas
+    # quedan fuera) y con `adyacentes` solo los unidos por una tubería o que alimentan un mismo nodo.
+    def conexiones_entre_tanques(self, k=20, radio=None, adyacentes=False):
+        compacta = self.red_compacta()
+        tanques = np.flatnonzero(compacta.tipo == TIPO_TANQUE)
+        capacidad = compacta.capacidad[tanques]
+        nivel = compacta.nivel[tanques]
+        # Misma banda que es_presion_adecuada
+        tanques = tanques[(nivel >= capacidad * 0.1) & (nivel <= capacidad * 0.9)]
+        espacio = compacta.capacidad[tanques] - compacta.nivel[tanques]
+        nombres = compacta.nombres
+        if k is not None and k <= 0 or len(tanques) < 2:
+            return []
+
+        if radio is None and not adyacentes:
+            orden = np.argsort(espacio, kind="stable")
+            ordenado = espacio[orden]
+            desde = np.searchsorted(ordenado, ordenado, side="left").tolist() #primer destino valido de cada origen
+            ordenado = ordenado.tolist()
+            ultimo = len(ordenado) - 1
+            heap = []
+            for posicion in range(len(ordenado)):
+                destino = ultimo if ultimo != posicion else ultimo - 1
+                if destino >= desde[posicion]:
+                    heap.append((ordenado[posicion] - ordenado[destino], posicion, destino))
+            heapq.heapify(heap)
+            pares = []
+            while heap and (k is None or len(pares) < k):
+                menos_beneficio, posicion, destino = heapq.heappop(heap)
+                pares.append((orden[posicion], orden[destino], -menos_beneficio))
+                destino -= 1
+                if destino == posicion:
+                    destino -= 1
+                if destino >= desde[posicion]:
+                    heapq.heappush(heap, (ordenado[posicion] - ordenado[destino], posicion, destino))
+            return [(nombres[tanques[o]], nombres[tanques[d]], _numero(beneficio)) for o, d, beneficio in pares]
+
+        # Con restricciones se arman solo los pares candidatos y se filtran igual
+        if adyacentes:
+            posicion = {int(t): i for i, t in enumerate(tanques.tolist())}
+            candidatos = set()
+            for i, t in enumerate(tanques.tolist()):
+                nodo = nombres[t]
+                for vecino in list(self.grafo.succ[nodo]) + list(self.grafo.pred[nodo]):
+                    j = posicion.get(compacta.indice[vecino])
+                    if j is not None:
+                        candidatos.update(((i, j), (j, i)))
+                for vecino in self.grafo.succ[nodo]:
+                    for otro in self.grafo.pred[vecino]:
+                        j = posicion.get(compacta.indice[otro])
+                        if j is not None and j != i:
+                            candidatos.add((i, j))
+            origen = np.array([o for o, _ in candidatos], dtype=np.int64)
+            destino = np.array([d for _, d in candidatos], dtype=np.int64)
+        if radio is not None:
+            nodos = self.grafo.nodes
+            con_posicion = [i for i, t in enumerate(tanques.tolist()) if "x" in nodos[nombres[t]] and "y" in nodos[nombres[t]]]
+            puntos = np.array([(nodos[nombres[tanques[i]]]["x"], nodos[nombres[tanques[i]]]["y"]) for i in con_posicion], dtype=np.float64).reshape(-1, 2)
+            con_posicion = np.array(con_posicion, dtype=np.int64)
+            if adyacentes:
+                ubicacion = np.full((len(tanques), 2), np.nan)
+                ubicacion[con_posicion] = puntos
+                diferencia = ubicacion[origen] - ubicacion[destino]
+                cerca = np.hypot(diferencia[:, 0], diferencia[:, 1]) <= radio #NaN (sin coordenadas) queda fuera
+                origen, destino = origen[cerca], destino[cerca]
+            else:
+                indice = IndiceEspacial(puntos)
+                vecinos = [indice.en_radio(x, y, radio) for x, y in puntos.tolist()]
+                origen = np.repeat(con_posicion, [len(v) for v in vecinos])
+                destino = con_posicion[np.concatenate(vecinos)] if vecinos else np.zeros(0, dtype=np.int64)
+
+        validos = (origen != destino) & (espacio[destino] >= espacio[origen])
+        origen, destino = origen[validos], destino[validos]
+        beneficio = espacio[destino] - espacio[origen]
+        elegidos = np.lexsort((destino, origen, -beneficio))[:k]
+        return [
+            (nombres[tanques[o]], nombres[tanques[d]], _numero(b))
+            for o, d, b in zip(origen[elegidos].tolist(), destino[elegidos].tolist(), beneficio[elegidos].tolist())
+        ]
+
     #  Verificar si la presión del tanque es adecuada.
     # La presión es adecuada si el nivel está entre el 10% y el 90% de la capacidad.
     def es_presion_adecuada(self, tanque_data):
@@ -637,15 +1556,19 @@ class RedDeAgua:
 
         return True
     
-        #Identificar casas que no están siendo abastecidas correctamente.
-        #Usamos verificar_y_distribuir_flujo para detectar casas con demanda no cubierta.
+        #Identificar casas que no están siendo abastecidas correctamente: las que no están conectadas
+        #a ningun tanque o cuyas tuberías entrantes no alcanzan a cubrir la demanda.
     def identificar_casas_sin_servicio(self):
         casas_sin_servicio = []
+        indice = self.indice_alcance()
         
         for casa, data in self.grafo.nodes(data=True):
             if data["tipo"] == "casa":
-                sugerencia = self.verificar_y_distribuir_flujo(None, casa, None)  # Solo verificamos flujo, sin necesidad de origen/destino
-                if sugerencia:  # Si la sugerencia no es None, significa que la casa no tiene suficiente agua
+                if not indice.esta_conectado(casa):
+                    casas_sin_servicio.append(casa)
+                    continue
+                flujo_entrante = sum(datos["capacidad_flujo"] for datos in self.grafo.pred[casa].values())
+                if flujo_entrante < data["demanda"]:
                     casas_sin_servicio.append(casa)
         
         return casas_sin_servicio
@@ -667,6 +1590,7 @@ class RedDeAgua:
     # Realiza una búsqueda en profundidad (DFS) para encontrar todas las casas conectadas a una casa en particular
     # que no tienen suficiente suministro de agua.
     def dfs_buscar_grupo(self, casa, casas_visitadas):
+        self._contar("recorridos_dfs")
         grupo = []
         stack = [casa]
         
@@ -683,15 +1607,94 @@ class RedDeAgua:
         
         return grupo
     
-    #Proponer la instalación de nuevos tanques para abastecer a los grupos de casas sin servicio.
-    def proponer_nuevos_tanques(self, grupos_casas):
+    # Proponer la instalación de nuevos tanques para abastecer a los grupos de casas sin servicio. Las casas
+    # con coordenadas se reparten entre tanques ubicados con ubicar_tanques (sin `capacidad_maxima`, la
+    # cantidad de tanques se calcula con la capacidad mediana de los tanques actuales); para los grupos sin
+    # coordenadas se sugiere, como antes, la primera casa del grupo.
+    def proponer_nuevos_tanques(self, grupos_casas, metodo="mediana", radio=None, capacidad_maxima=None, max_casas_mostradas=10):
         sugerencias_tanques = []
-        
+        nodos = self.grafo.nodes
+        con_posicion = []
+
         for grupo in grupos_casas:
-            if grupo:
+            casas = [nodo for nodo in grupo if nodos[nodo]["tipo"] == "casa"]
+            if casas and all("x" in nodos[casa] and "y" in nodos[casa] for casa in casas):
+                con_posicion.extend(casas)
+            elif grupo:
                 # Suponemos que el primer nodo del grupo puede ser la ubicación del nuevo tanque
                 tanque_sugerido = grupo[0]
                 sugerencias_tanques.append(f"Instalar un nuevo tanque en {tanque_sugerido} para abastecer a las casas: {', '.join(grupo)}")
-        
+
+        if con_posicion:
+            if capacidad_maxima is None:
+                capacidades = [data["capacidad"] for _, data in nodos(data=True) if data["tipo"] == "tanque"]
+                capacidad_maxima = float(np.median(capacidades)) if capacidades else None
+            for tanque in self.ubicar_tanques(con_posicion, metodo=metodo, radio=radio, capacidad_maxima=capacidad_maxima):
+                casas = tanque["casas"]
+                nombres = ", ".join(casas[:max_casas_mostradas])
+                if len(casas) > max_casas_mostradas:
+                    nombres += f" y {len(casas) - max_casas_mostradas} más"
+                sugerencias_tanques.append(
+                    f"Instalar un nuevo tanque de {tanque['capacidad']} L en ({tanque['x']:.2f}, {tanque['y']:.2f}), "
+                    f"junto a {tanque['casa_cercana']}, para abastecer {len(casas)} casas a menos de "
+                    f"{tanque['distancia_maxima']:.2f} de distancia: {nombres}"
+                )
+
         return sugerencias_tanques
+
+    # Ubica tanques nuevos para abastecer a `casas` (las que no tienen coordenadas x, y se ignoran), con la
+    # demanda de cada casa como peso. metodo "mediana" minimiza la distancia ponderada de las casas a su
+    # tanque (k-mediana) y "centro" la distancia de la casa mas lejana (k-centro). Se usan al menos `k`
+    # tanques, los que hacen falta para cubrir la demanda total con tanques de `capacidad_maxima` (las casas
+    # se asignan por cercania, asi que alguno puede necesitar mas) y, con `radio`, los que necesita k-centro
+    # para que todas las casas queden a esa distancia o menos de un tanque (la k-mediana usa la misma
+    # cantidad, pero puede dejar alguna casa un poco mas lejos).
+    # Devuelve un diccionario por tanque con su posicion, la casa mas cercana a ella, la capacidad
+    # necesaria (la demanda de sus casas), las casas que abastece y la distancia a la mas lejana.
+    def ubicar_tanques(self, casas, metodo="mediana", k=None, radio=None, capacidad_maxima=None):
+        if metodo not in ("mediana", "centro"):
+            raise ValueError(f"Metodo desconocido: {metodo}. Opciones: mediana, centro.")
+        nodos = self.grafo.nodes
+        casas = [casa for casa in casas if "x" in nodos[casa] and "y" in nodos[casa]]
+        if not casas:
+            return []
+        puntos = np.array([(nodos[casa]["x"], nodos[casa]["y"]) for casa in casas], dtype=np.float64)
+        demanda = np.array([nodos[casa]["demanda"] for casa in casas], dtype=np.float64)
+        indice = IndiceEspacial(puntos)
+
+        cantidad = max(1, k or 1)
+        if capacidad_maxima:
+            cantidad = max(cantidad, int(np.ceil(demanda.sum() / capacidad_maxima)))
+        cantidad = min(cantidad, len(casas))
+        if radio is not None:
+            centros, asignado, distancia = k_centro(indice, demanda, radio=radio)
+            if len(centros) < cantidad:
+                centros, asignado, distancia = k_centro(indice, demanda, k=cantidad)
+            cantidad = len(centros)
+        elif metodo == "centro":
+            centros, asignado, distancia = k_centro(indice, demanda, k=cantidad)
+        if metodo == "centro":
+            posiciones = puntos[centros]
+        else:
+            posiciones, asignado, distancia = k_mediana(indice, demanda, cantidad)
+
+        cercanas, _ = indice.mas_cercanos(posiciones)
+        capacidades = np.bincount(asignado, weights=demanda, minlength=len(posiciones))
+        distancia_maxima = np.zeros(len(posiciones))
+        np.maximum.at(distancia_maxima, asignado, distancia)
+        orden = np.argsort(asignado, kind="stable")
+        cortes = np.cumsum(np.bincount(asignado, minlength=len(posiciones)))[:-1]
+        tanques = []
+        for i, grupo in enumerate(np.split(orden, cortes)):
+            if grupo.size == 0:
+                continue #centro sin casas asignadas
+            tanques.append({
+                "x": float(posiciones[i, 0]),
+                "y": float(posiciones[i, 1]),
+                "casa_cercana": casas[cercanas[i]],
+                "capacidad": _numero(capacidades[i]),
+                "casas": [casas[j] for j in grupo.tolist()],
+                "distancia_maxima": float(distancia_maxima[i]),
+            })
+        return tanques
     
\ No newline at end of file
@@ -1,14 +1,19 @@
+import contextlib #para correr una accion con o sin perfil
+import os #RED_AGUA_METRICAS activa las metricas
 import sys
-import networkx as nx
-import matplotlib.pyplot as plt
-from matplotlib.offsetbox import OffsetImage, AnnotationBbox
+from collections import deque #buffer circular de los mensajes del log
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QPushButton, QVBoxLayout, QHBoxLayout, QWidget,
-    QInputDialog, QMessageBox, QFileDialog, QDialog, QComboBox, QSpinBox, QLabel, QTextEdit
+    QInputDialog, QMessageBox, QFileDialog, QTextEdit, QProgressBar
 )
+from PyQt5.QtCore import QTimer
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 from grafo import RedDeAgua
+from metricas import Perfil, instrumentar #tiempos de cada accion y perfil con cProfile
+from eventos import INFO
+from dibujo import DibujoRed #dibujo de la red que se actualiza por partes
+from trabajos import EjecutorTrabajos, Trabajo #analisis largos fuera del hilo de la interfaz
 
 class MplCanvas(FigureCanvas):
     def __init__(self, parent=None):
@@ -19,89 +24,135 @@ class MplCanvas(FigureCanvas):
         
         # Aristas resaltadas para mantener el estado
         self.aristas_resaltadas = set()
+        self.dibujo = DibujoRed(self.axes)
+        self.dibujo.activar_navegacion() #rueda para acercar o alejar, arrastrar para mover la ventana
 
+    # Dibuja la red resaltando las rutas alternativas encontradas. El dibujo se actualiza por partes
+    # (ver DibujoRed): cambiar una obstruccion o un nivel no vuelve a dibujar toda la red.
     def dibujar_grafo(self, grafo, ruta_alternativa=None):
-        self.axes.clear()
-        pos = nx.circular_layout(grafo.grafo)
-
-        # Dibujar las aristas primero
-        colores_aristas = {
-            (u, v): (
-                "red" if datos.get("obstruccion", 0) == -1 else
-                "orange" if 0 < datos.get("obstruccion", 0) <= 100 else
-                "blue"
-            )
-            for u, v, datos in grafo.grafo.edges(data=True)
-        }
-
-        # Resaltar la ruta alternativa y almacenar aristas resaltadas
         if ruta_alternativa:
-            for i in range(len(ruta_alternativa) - 1):
-                u, v = ruta_alternativa[i], ruta_alternativa[i + 1]
+            for u, v in zip(ruta_alternativa, ruta_alternativa[1:]):
                 if grafo.grafo.has_edge(u, v):
                     self.aristas_resaltadas.add((u, v))
-
-        # Aplicar colores resaltados
-        for arista in self.aristas_resaltadas:
-            if arista in colores_aristas:
-                colores_aristas[arista] = "green"
-
-        nx.draw(
-            grafo.grafo, pos, with_labels=False, ax=self.axes,
-            edge_color=[colores_aristas.get((u, v), "blue") for u, v in grafo.grafo.edges]
+        self.dibujo.dibujar(grafo, self.aristas_resaltadas)
+
+
+# Log de la interfaz: los mensajes (textos o eventos de la red, que se formatean recien al mostrarse) se
+# guardan en un buffer circular, desde cualquier hilo, y un QTimer los agrega al QTextEdit por tandas con
+# un solo append. Si llegan mas de `capacidad` mensajes entre dos tandas se descartan los mas viejos y se
+# avisa cuantos se omitieron; el QTextEdit conserva solo las ultimas `max_lineas` lineas.
+class RegistroInterfaz:
+    def __init__(self, widget, capacidad=2000, intervalo_ms=100, max_lineas=5000):
+        self.widget = widget
+        self.buffer = deque(maxlen=capacidad)
+        self.omitidos = 0
+        widget.document().setMaximumBlockCount(max_lineas)
+        self.temporizador = QTimer(widget)
+        self.temporizador.timeout.connect(self.vaciar)
+        self.temporizador.start(intervalo_ms)
+
+    def agregar(self, mensaje):
+        if len(self.buffer) == self.buffer.maxlen:
+            self.omitidos += 1
+        self.buffer.append(mensaje)
+
+    def vaciar(self):
+        if not self.buffer:
+            return
+        mensajes = []
+        try:
+            while True:
+                mensajes.append(str(self.buffer.popleft()))
+        except IndexError:
+            pass
+        if self.omitidos:
+            mensajes.insert(0, f"... {self.omitidos} mensajes omitidos ...")
+            self.omitidos = 0
+        self.widget.append("\n".join(mensajes))
+        self.widget.ensureCursorVisible()  # Desplazar el log hacia el final
+
+
+# Analisis que corren en un Trabajo, fuera del hilo de la interfaz y sobre una instantanea de la red. No
+# tocan ningun widget: devuelven lo que la interfaz muestra cuando terminan.
+
+# Verificacion completa del suministro: consistencia de la red, conexiones y tanques propuestos,
+# capacidad de la red y casas con problemas. Devuelve las sugerencias para el log y si hay casas con
+# problemas de suministro.
+def auditar_suministro(trabajo, red):
+    sugerencias = []
+
+    # Verificar conexiones duplicadas, detectar bucles, y verificar nodos no definidos
+    trabajo.avanzar(5, "Revisando la consistencia de la red")
+    sugerencias.extend(red.verificar_conexiones_duplicadas())
+    sugerencias.extend(red.detectar_bucles())
+    sugerencias.extend(red.verificar_conexiones_con_nodos_no_definidos())
+
+    # Proponer nuevas conexiones para mejorar la red en caso de problemas
+    trabajo.avanzar(25, "Proponiendo nuevas conexiones")
+    sugerencias.extend(red.proponer_nuevas_conexiones())
+
+    # Agrupar casas sin servicio y proponer nuevos tanques
+    trabajo.avanzar(40, "Buscando casas sin servicio")
+    casas_sin_servicio = red.identificar_casas_sin_servicio()
+    if casas_sin_servicio:
+        trabajo.avanzar(50, "Proponiendo nuevos tanques")
+        sugerencias.extend(red.proponer_nuevos_tanques(red.agrupar_casas_sin_servicio(casas_sin_servicio)))
+
+    # Capacidad de la red completa para abastecer a todas las casas, con un solo calculo de flujo
+    trabajo.avanzar(60, "Calculando la capacidad de la red")
+    factibilidad = red.factibilidad_suministro()
+    sugerencias.append(
+        f"La red puede entregar {factibilidad['flujo_total']}L/s de una demanda total de "
+        f"{factibilidad['demanda_total']}L/s."
+    )
+    for casa, faltante in factibilidad["demanda_insatisfecha"].items():
+        sugerencias.append(f"{casa}: quedan {faltante}L/s de demanda sin cubrir con el agua de los tanques.")
+    if factibilidad["corte"]["tuberias"]:
+        cuello = ", ".join(f"{u} -> {v}" for u, v in factibilidad["corte"]["tuberias"])
+        sugerencias.append(f"Tuberías que limitan el suministro: {cuello}.")
+
+    # Luego se verifica el suministro (solo se reportan las casas con problemas)
+    trabajo.avanzar(90, "Verificando el suministro de cada casa")
+    resultados = red.verificar_suministro_vectorizado(solo_fallas=True)
+    for casa, info in resultados.items():
+        sugerencias.append(
+            f"{casa}: {info['mensaje']} "
+            f"(Recibido: {info['flujo_recibido']}L/s, Demanda: {info['demanda']}L/s)"
         )
+    return sugerencias, bool(resultados)
 
-        # Dibujar los nodos con imágenes
-        for nodo, data in grafo.grafo.nodes(data=True):
-            x, y = pos[nodo]
-            if data["tipo"] == "casa":
-                self._agregar_imagen("casa.png", x, y)
-            elif data["tipo"] == "tanque":
-                self._agregar_imagen("tanque.png", x, y)
-            
-            # Agregar nombre debajo de cada nodo (casa o tanque)
-            self.axes.text(x, y - 0.15, nodo, fontsize=10, ha='center')
-
-        # Etiquetas de nodos
-        etiquetas_nodos = {
-            nodo: (
-                f"Nivel: {data['nivel']}/{data['capacidad']}L" if data["tipo"] == "tanque" else
-                f"Demanda: {data['demanda']}L/s"
-            )
-            for nodo, data in grafo.grafo.nodes(data=True)
-        }
 
-        # Ajustar las coordenadas para desplazar las etiquetas hacia arriba
-        pos_labels = {nodo: (x, y + 0.1) for nodo, (x, y) in pos.items()}
+def buscar_rutas(trabajo, red):
+    trabajo.avanzar(10, "Calculando las rutas desde los tanques")
+    return red.rutas_alternativas_optimas()
 
-        nx.draw_networkx_labels(
-            grafo.grafo, pos_labels, labels=etiquetas_nodos, font_size=10, ax=self.axes
-        )
 
-        # Etiquetas de flujo en las aristas
-        etiquetas_aristas = nx.get_edge_attributes(grafo.grafo, "capacidad_flujo")
-        nx.draw_networkx_edge_labels(
-            grafo.grafo, pos, edge_labels=etiquetas_aristas, ax=self.axes
-        )
+def calcular_flujo(trabajo, red, fuente, sumidero):
+    trabajo.avanzar(10, f"Flujo de {fuente} a {sumidero}")
+    return fuente, sumidero, red.flujo_maximo(fuente, sumidero)
 
-        # Redibujar el canvas
-        self.draw()
 
+#Carga el json sobre una copia modificable de la red, que la interfaz adopta al terminar
+def cargar_red(trabajo, red, archivo):
+    trabajo.avanzar(10, f"Leyendo {archivo}")
+    red.cargar_desde_json(archivo)
+    return red
 
-    def _agregar_imagen(self, ruta, x, y):
-        try:
-            imagen = plt.imread(ruta)
-            im = OffsetImage(imagen, zoom=0.1)
-            ab = AnnotationBbox(im, (x, y), frameon=False)
-            self.axes.add_artist(ab)
-        except FileNotFoundError:
-            print(f"No se encontró la imagen en {ruta}.")
 
-        
 class Interfaz(QMainWindow):
-    def __init__(self):
+    def __init__(self, metricas=None):
         super().__init__()
         self.red_agua = RedDeAgua()
+        # Guardar en segundo plano para que cada clic no espere la escritura completa del json
+        self.red_agua.activar_guardado_diferido()
+        # Metricas de rendimiento de la red, las acciones y el dibujo; apagadas salvo que se pidan
+        if metricas is None:
+            metricas = os.environ.get("RED_AGUA_METRICAS") == "1"
+        self.metricas = self.red_agua.activar_metricas() if metricas else None
+        self._perfilar_siguiente = False #si la proxima accion se corre dentro de cProfile
+        # Analisis largos en segundo plano, de a uno a la vez
+        self.trabajos = EjecutorTrabajos(self, metricas=self.metricas)
+        self._trabajo = None
 
         # Configuración de la ventana principal
         self.setWindowTitle("Sistema de Distribución de Agua")
@@ -115,62 +166,78 @@ class Interfaz(QMainWindow):
 
         # Botones
         agregar_casa_btn = QPushButton("Agregar Casa")
-        agregar_casa_btn.clicked.connect(self.agregar_casa)
+        agregar_casa_btn.clicked.connect(self._accion(self.agregar_casa))
         layout_botones.addWidget(agregar_casa_btn)
 
         agregar_tuberia_btn = QPushButton("Agregar Tubería")
-        agregar_tuberia_btn.clicked.connect(self.agregar_tuberia)
+        agregar_tuberia_btn.clicked.connect(self._accion(self.agregar_tuberia))
         layout_botones.addWidget(agregar_tuberia_btn)
 
         agregar_tanque_btn = QPushButton("Agregar Tanque con Capacidad")
-        agregar_tanque_btn.clicked.connect(self.agregar_tanque_con_capacidad)
+        agregar_tanque_btn.clicked.connect(self._accion(self.agregar_tanque_con_capacidad))
         layout_botones.addWidget(agregar_tanque_btn)
 
         eliminar_casa_btn = QPushButton("Eliminar Casa")
-        eliminar_casa_btn.clicked.connect(self.eliminar_casa)
+        eliminar_casa_btn.clicked.connect(self._accion(self.eliminar_casa))
         layout_botones.addWidget(eliminar_casa_btn)
 
         eliminar_tanque_btn = QPushButton("Eliminar Tanque")
-        eliminar_tanque_btn.clicked.connect(self.eliminar_tanque)
+        eliminar_tanque_btn.clicked.connect(self._accion(self.eliminar_tanque))
         layout_botones.addWidget(eliminar_tanque_btn)
 
         eliminar_tuberia_btn = QPushButton("Eliminar Tubería")
-        eliminar_tuberia_btn.clicked.connect(self.eliminar_tuberia)
+        eliminar_tuberia_btn.clicked.connect(self._accion(self.eliminar_tuberia))
         layout_botones.addWidget(eliminar_tuberia_btn)
 
         boton_obstruccion = QPushButton("Crear Obstrucción")
-        boton_obstruccion.clicked.connect(self.mostrar_formulario_obstruccion)
+        boton_obstruccion.clicked.connect(self._accion(self.mostrar_formulario_obstruccion))
         layout_botones.addWidget(boton_obstruccion)
 
         cargar_datos_btn = QPushButton("Cargar Datos")
-        cargar_datos_btn.clicked.connect(self.cargar_datos_desde_archivo)
+        cargar_datos_btn.clicked.connect(self._accion(self.cargar_datos_desde_archivo))
         layout_botones.addWidget(cargar_datos_btn)
         
         cambiar_sentido_btn = QPushButton("Cambiar Sentido de Tubería")
-        cambiar_sentido_btn.clicked.connect(self.cambiar_sentido_tuberia)
+        cambiar_sentido_btn.clicked.connect(self._accion(self.cambiar_sentido_tuberia))
         layout_botones.addWidget(cambiar_sentido_btn)
         
         verificar_suministro_btn = QPushButton("Verificar Suministro")
-        verificar_suministro_btn.clicked.connect(self.verificar_suministro)
+        verificar_suministro_btn.clicked.connect(self._accion(self.verificar_suministro))
         layout_botones.addWidget(verificar_suministro_btn)
         
         buscar_ruta_btn = QPushButton("Buscar Ruta Alternativa")
-        buscar_ruta_btn.clicked.connect(self.buscar_y_mostrar_ruta_alternativa)
+        buscar_ruta_btn.clicked.connect(self._accion(self.buscar_y_mostrar_ruta_alternativa))
         layout_botones.addWidget(buscar_ruta_btn)
         
         calcular_flujo_btn = QPushButton("Calcular Flujo Máximo")
-        calcular_flujo_btn.clicked.connect(self.calcular_flujo_maximo)
+        calcular_flujo_btn.clicked.connect(self._accion(self.calcular_flujo_maximo))
         layout_botones.addWidget(calcular_flujo_btn)
         
         recargar_grafo_btn = QPushButton("Recargar Grafo")
-        recargar_grafo_btn.clicked.connect(self.recargar_grafo)
+        recargar_grafo_btn.clicked.connect(self._accion(self.recargar_grafo))
         layout_botones.addWidget(recargar_grafo_btn)
 
+        perfilar_btn = QPushButton("Perfilar Siguiente Acción")
+        perfilar_btn.clicked.connect(self.perfilar_siguiente_accion)
+        layout_botones.addWidget(perfilar_btn)
+
+        metricas_btn = QPushButton("Ver Métricas")
+        metricas_btn.clicked.connect(self.mostrar_metricas)
+        layout_botones.addWidget(metricas_btn)
+
+        # Botones que modifican la red, se desactivan mientras se carga un archivo en segundo plano
+        self._botones_edicion = [
+            agregar_casa_btn, agregar_tuberia_btn, agregar_tanque_btn, eliminar_casa_btn, eliminar_tanque_btn,
+            eliminar_tuberia_btn, boton_obstruccion, cargar_datos_btn, cambiar_sentido_btn, recargar_grafo_btn,
+        ]
+
         # Agregar el layout de botones al layout principal
         layout_principal.addLayout(layout_botones)
 
            # Widget de Matplotlib para el grafo
         self.canvas = MplCanvas(self)
+        if self.metricas is not None:
+            instrumentar(self.canvas, ["dibujar_grafo"], self.metricas, prefijo="interfaz.")
         layout_principal.addWidget(self.canvas)
 
         # Crear un widget de texto para el log de sugerencias
@@ -179,73 +246,26 @@ class Interfaz(QMainWindow):
         # self.log_widget.setFixedWidth(1600)  # Limitar el tamaño
         self.log_widget.setFixedHeight(100)
         layout_principal.addWidget(self.log_widget)
+        # Los mensajes de la red y las sugerencias llegan al log por tandas
+        self.registro = RegistroInterfaz(self.log_widget)
+        self.red_agua.eventos.suscribir(self.registro.agregar, nivel_minimo=INFO)
         
+        # Avance del analisis en curso y boton para cancelarlo, en la barra de estado
+        self.barra_progreso = QProgressBar()
+        self.barra_progreso.setRange(0, 100)
+        self.barra_progreso.setMaximumWidth(200)
+        self.boton_cancelar = QPushButton("Cancelar")
+        self.boton_cancelar.clicked.connect(self.cancelar_trabajo)
+        self.statusBar().addPermanentWidget(self.barra_progreso)
+        self.statusBar().addPermanentWidget(self.boton_cancelar)
+        self.barra_progreso.hide()
+        self.boton_cancelar.hide()
+
         # Widget y layout central
         central_widget = QWidget()
         central_widget.setLayout(layout_principal)
         self.setCentralWidget(central_widget)
         
-    def mostrar_formulario_obstruccion(self):
-        # Crear un formulario para seleccionar la tubería y el porcentaje de obstrucción
-        dialog = QDialog(self)
-        dialog.setWindowTitle("Crear Obstrucción")
-
-        layout = QVBoxLayout(dialog)
-
-        # Campos para seleccionar nodos y porcentaje de obstrucción
-        combo_nodo1 = QComboBox()
-        combo_nodo2 = QComboBox()
-
-        # Rellenar nodos existentes
-        combo_nodo1.addItems(self.red_agua.grafo.nodes)
-        combo_nodo2.addItems(self.red_agua.grafo.nodes)
-
-        input_obstruccion = QSpinBox()
-        input_obstruccion.setRange(-1, 100)  # Rango de obstrucción (-1 para total)
-
-        layout.addWidget(QLabel("Seleccione el nodo 1:"))
-        layout.addWidget(combo_nodo1)
-        layout.addWidget(QLabel("Seleccione el nodo 2:"))
-        layout.addWidget(combo_nodo2)
-        layout.addWidget(QLabel("Porcentaje de obstrucción (0-100, -1 para total):"))
-        layout.addWidget(input_obstruccion)
-
-        # Botón para confirmar
-        boton_confirmar = QPushButton("Aplicar Obstrucción")
-        boton_confirmar.clicked.connect(
-            lambda: self.aplicar_obstruccion(dialog, combo_nodo1, combo_nodo2, input_obstruccion)
-        )
-        layout.addWidget(boton_confirmar)
-
-        dialog.setLayout(layout)
-        dialog.exec()
-
-    def aplicar_obstruccion(self, dialog, combo_nodo1, combo_nodo2, input_obstruccion):
-        nodo1 = combo_nodo1.currentText()
-        nodo2 = combo_nodo2.currentText()
-        obstruccion = input_obstruccion.value()
-
-        try:
-            self.red_agua.editar_tuberia(nodo1, nodo2, obstruccion)
-
-            # Verificar si alguna casa no está siendo suplida y buscar rutas alternativas
-            for casa in [nodo for nodo, data in self.red_agua.grafo.nodes(data=True) if data["tipo"] == "casa"]:
-                flujo_suficiente = self.red_agua.verificar_demanda_casa(casa)
-                if not flujo_suficiente:
-                    ruta_alternativa, flujo = self.red_agua.buscar_ruta_alternativa(casa)
-                    if ruta_alternativa:
-                        self.mostrar_sugerencia(
-                            f"Ruta alternativa encontrada para {casa}: {' -> '.join(ruta_alternativa)} con flujo {flujo}L/s."
-                        )
-                        self.canvas.dibujar_grafo(self.red_agua, ruta_alternativa)
-                    else:
-                        self.mostrar_sugerencia(f"No se encontró una ruta alternativa para {casa}.")
-                        QMessageBox.warning(self, "Sin Rutas Alternativas", f"No se encontró una ruta para suplir {casa}.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Error al aplicar la obstrucción: {e}")
-
-        dialog.accept()
-        
     def cambiar_sentido_tuberia(self):
         """
         Permite cambiar el sentido de una tubería.
@@ -340,23 +360,37 @@ class Interfaz(QMainWindow):
         if not ok3:
             return
 
-        # Llamar al backend para aplicar la obstrucción
+        # Llamar al backend para aplicar la obstrucción y revisar solo las casas aguas abajo de la tubería
         try:
+            if not self.red_agua.grafo.has_edge(nodo1, nodo2):
+                raise ValueError(f"No existe una tubería de {nodo1} a {nodo2}.")
             self.red_agua.editar_tuberia(nodo1, nodo2, obstruccion)
-            QMessageBox.information(self, "Éxito", f"Se aplicó una obstrucción del {obstruccion}% entre {nodo1} y {nodo2}.")
-            self.canvas.dibujar_grafo(self.red_agua)
+            impacto = self.red_agua.impacto_obstruccion(nodo1, nodo2)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"No se pudo aplicar la obstrucción: {e}")
+            return
 
-    def aplicar_obstruccion(self, dialog):
-        nodo1 = self.combo_nodo1.currentText()
-        nodo2 = self.combo_nodo2.currentText()
-        obstruccion = self.input_obstruccion.value()
-
-        # Llamar al backend para modificar la tubería
-        self.backend.editar_tuberia(nodo1, nodo2, obstruccion)
-        dialog.accept()
+        sin_ruta = []
+        for casa, (ruta_alternativa, flujo) in impacto["rutas"].items():
+            if ruta_alternativa:
+                self.mostrar_sugerencia(
+                    f"Ruta alternativa encontrada para {casa}: {' -> '.join(ruta_alternativa)} con flujo {flujo}L/s."
+                )
+                self.canvas.aristas_resaltadas.update(zip(ruta_alternativa, ruta_alternativa[1:]))
+            else:
+                self.mostrar_sugerencia(f"No se encontró una ruta alternativa para {casa}.")
+                sin_ruta.append(casa)
+        # Redibujar una sola vez con todas las rutas resaltadas
+        self.canvas.dibujar_grafo(self.red_agua)
 
+        mensaje = (
+            f"Se aplicó una obstrucción {'total' if obstruccion == -1 else f'del {obstruccion}%'} entre {nodo1} y {nodo2}. "
+            f"Casas revisadas: {len(impacto['afectadas'])}, con problemas de suministro: {len(impacto['sin_suministro'])}."
+        )
+        if sin_ruta:
+            QMessageBox.warning(self, "Sin Rutas Alternativas", f"{mensaje}\nNo se encontró una ruta para suplir: {', '.join(sin_ruta)}.")
+        else:
+            QMessageBox.information(self, "Éxito", mensaje)
 
     def agregar_tanque_con_capacidad(self):
         nombre_tanque, ok1 = QInputDialog.getText(self, "Agregar Tanque", "Ingrese el nombre del tanque:")
@@ -387,106 +421,145 @@ class Interfaz(QMainWindow):
     def cargar_datos_desde_archivo(self):
         archivo, _ = QFileDialog.getOpenFileName(self, "Seleccionar Archivo JSON", "", "Archivos JSON (*.json)")
         if archivo:
-            try:
-                self.red_agua.cargar_desde_json(archivo)
-                QMessageBox.information(self, "Éxito", "Datos cargados exitosamente.")
-                self.canvas.dibujar_grafo(self.red_agua)
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"No se pudieron cargar los datos: {e}")
+            # El json se carga en segundo plano sobre una copia; mientras tanto no se puede editar la red
+            self._lanzar_trabajo(
+                "Cargar datos", cargar_red, self.red_agua.instantanea(congelada=False), archivo,
+                al_terminar=self._datos_cargados, mensaje_error="No se pudieron cargar los datos", bloquear_edicion=True,
+            )
+
+    def _datos_cargados(self, red):
+        self.red_agua.adoptar(red)
+        # La red cargada se guarda como cualquier otro cambio (con el guardado diferido, queda agendada)
+        self.red_agua.guardar_en_json()
+        QMessageBox.information(self, "Éxito", "Datos cargados exitosamente.")
+        self.canvas.dibujar_grafo(self.red_agua)
+
+    # Corre `funcion` en un Trabajo en segundo plano y muestra su avance en la barra de estado. Al terminar
+    # se llama `al_terminar` con el resultado, en el hilo de la interfaz; si falla se muestra el error.
+    # Solo se corre un analisis a la vez.
+    def _lanzar_trabajo(self, nombre, funcion, *args, al_terminar, mensaje_error=None, bloquear_edicion=False):
+        if self._trabajo is not None:
+            QMessageBox.information(self, "Análisis en curso", f"Espere a que termine '{self._trabajo.nombre}' o cancélelo.")
+            return None
+        trabajo = Trabajo(nombre, funcion, *args)
+        senales = trabajo.senales
+        for senal in (senales.terminado, senales.fallo, senales.cancelado):
+            senal.connect(self._trabajo_finalizado)
+        senales.progreso.connect(self._mostrar_progreso)
+        senales.terminado.connect(al_terminar)
+        senales.fallo.connect(
+            lambda e: QMessageBox.critical(self, "Error", f"{mensaje_error or 'Error en ' + nombre}: {e}")
+        )
+        senales.cancelado.connect(lambda: self.registro.agregar(f"{nombre}: cancelado."))
+
+        self._trabajo = trabajo
+        if bloquear_edicion:
+            for boton in self._botones_edicion:
+                boton.setEnabled(False)
+        self.barra_progreso.setValue(0)
+        self.barra_progreso.show()
+        self.boton_cancelar.show()
+        self.statusBar().showMessage(nombre)
+        return self.trabajos.lanzar(trabajo)
+
+    def _mostrar_progreso(self, porcentaje, mensaje):
+        self.barra_progreso.setValue(porcentaje)
+        if mensaje and self._trabajo is not None:
+            self.statusBar().showMessage(f"{self._trabajo.nombre}: {mensaje}")
+
+    def _trabajo_finalizado(self, *_):
+        self._trabajo = None
+        for boton in self._botones_edicion:
+            boton.setEnabled(True)
+        self.barra_progreso.hide()
+        self.boton_cancelar.hide()
+        self.statusBar().clearMessage()
+
+    #Pide cancelar el analisis en curso; termina en cuanto este llegue a su siguiente paso
+    def cancelar_trabajo(self):
+        if self._trabajo is not None:
+            self._trabajo.cancelar()
+            self.statusBar().showMessage(f"{self._trabajo.nombre}: cancelando...")
         
+    # Envuelve el manejador de un boton: con las metricas activas mide la accion completa (incluye los
+    # dialogos y el dibujo) como "interfaz.<metodo>", y si se pidio perfilar la corre dentro de cProfile
+    def _accion(self, metodo):
+        operacion = f"interfaz.{metodo.__name__}"
+
+        def accion(*_): #clicked envia el estado del boton, que los manejadores no usan
+            perfil = None
+            if self._perfilar_siguiente:
+                self._perfilar_siguiente = False
+                perfil = Perfil(archivo=f"perfil_{metodo.__name__}.prof")
+            with perfil or contextlib.nullcontext():
+                with self.metricas.medir(operacion) if self.metricas is not None else contextlib.nullcontext():
+                    metodo()
+            if perfil is not None:
+                self.registro.agregar(f"Perfil de {metodo.__name__} guardado en {perfil.archivo}:\n{perfil.resumen}")
+        return accion
+
+    def perfilar_siguiente_accion(self):
+        self._perfilar_siguiente = True
+        self.registro.agregar("La siguiente acción se ejecutará con cProfile.")
+
+    # Muestra en el log un resumen de las metricas y las exporta en formato de Prometheus
+    def mostrar_metricas(self):
+        if self.metricas is None:
+            QMessageBox.information(self, "Métricas", "Las métricas están desactivadas (se activan con RED_AGUA_METRICAS=1).")
+            return
+        instantanea = self.metricas.instantanea()
+        for operacion, datos in sorted(instantanea["operaciones"].items(), key=lambda item: -item[1]["total_s"]):
+            self.registro.agregar(
+                f"{operacion}: {datos['llamadas']} llamadas, total {datos['total_s']:.3f} s, "
+                f"p50 {datos['p50_s'] * 1000:.1f} ms, p99 {datos['p99_s'] * 1000:.1f} ms"
+            )
+        for nombre, valor in instantanea["contadores"].items():
+            self.registro.agregar(f"{nombre}: {valor}")
+        with open("metricas_red_agua.prom", 'w') as f:
+            f.write(self.metricas.texto_prometheus())
+        self.registro.agregar("Métricas exportadas en metricas_red_agua.prom.")
+
     def mostrar_sugerencia(self, sugerencia):
         """
         Muestra una sugerencia en el log.
         """
-        self.log_widget.append(f"Sugerencia: {sugerencia}")
-        self.log_widget.ensureCursorVisible()  # Desplazar el log hacia el final
+        self.registro.agregar(f"Sugerencia: {sugerencia}")
 
 
     def verificar_suministro(self):
         """
-        Llama al backend para verificar el suministro de agua y realiza la verificación de consistencia de la red.
+        Verifica el suministro de agua y la consistencia de la red en segundo plano, sobre una instantanea
+        de la red; los resultados llegan al log cuando termina.
         """
-        # Verificar la consistencia de la red antes de realizar cualquier acción
-        errores_red = []
-        
-        # Verificar conexiones duplicadas, detectar bucles, y verificar nodos no definidos
-        errores_red.extend(self.red_agua.verificar_conexiones_duplicadas())
-        errores_red.extend(self.red_agua.detectar_bucles())
-        errores_red.extend(self.red_agua.verificar_conexiones_con_nodos_no_definidos())
-
-        # Mostrar las sugerencias de la red (si hay errores)
-        if errores_red:
-            for error in errores_red:
-                self.mostrar_sugerencia(error)  # Mostrar la sugerencia en la interfaz
-
-        # Proponer nuevas conexiones para mejorar la red en caso de problemas
-        sugerencias_conexiones = self.red_agua.proponer_nuevas_conexiones()  # Obtener sugerencias
-
-        # Mostrar las sugerencias de nuevas conexiones
-        for sugerencia in sugerencias_conexiones:
-            self.mostrar_sugerencia(sugerencia)  # Mostrar sugerencia en la interfaz
-
-        # Identificar casas sin servicio
-        casas_sin_servicio = self.red_agua.identificar_casas_sin_servicio()
-
-        if casas_sin_servicio:
-            # Agrupar casas sin servicio y proponer nuevos tanques
-            grupos_casas = self.red_agua.agrupar_casas_sin_servicio(casas_sin_servicio)
-            sugerencias_tanques = self.red_agua.proponer_nuevos_tanques(grupos_casas)
+        self._lanzar_trabajo("Verificar suministro", auditar_suministro, self.red_agua.instantanea(), al_terminar=self._suministro_verificado)
 
-            # Mostrar sugerencias de nuevos tanques
-            for sugerencia in sugerencias_tanques:
-                self.mostrar_sugerencia(sugerencia)  # Mostrar sugerencia en la interfaz
-
-        # Luego se verifica el suministro
-        resultados = self.red_agua.verificar_suministro()
-
-        if not resultados:
+    def _suministro_verificado(self, resultado):
+        sugerencias, hay_problemas = resultado
+        for sugerencia in sugerencias:
+            self.mostrar_sugerencia(sugerencia)  # Mostrar la sugerencia en la interfaz
+        if not hay_problemas:
             QMessageBox.information(self, "Suministro Completo", "Todas las casas tienen suficiente agua.")
         else:
-            for casa, info in resultados.items():
-                self.mostrar_sugerencia(
-                    f"{casa}: {info['mensaje']} "
-                    f"(Recibido: {info['flujo_recibido']}L/s, Demanda: {info['demanda']}L/s)"
-                )
             QMessageBox.warning(
                 self, "Problemas de Suministro", "Algunas casas no tienen suficiente agua. Revisa el log para más detalles."
             )
 
 
-    def dibujar_grafo(self, grafo, ruta_alternativa=None):
-        self.axes.clear()
-        pos = nx.circular_layout(grafo.grafo)
-        
-        colores_nodos = ["blue" if data["tipo"] == "tanque" else "green" 
-                        for _, data in grafo.grafo.nodes(data=True)]
-        colores_aristas = ["orange" if datos.get("obstruccion", 0) > 0 else "blue"
-                        for _, _, datos in grafo.grafo.edges(data=True)]
-        
-        # Resaltar la ruta alternativa
-        if ruta_alternativa:
-            for i in range(len(ruta_alternativa) - 1):
-                u, v = ruta_alternativa[i], ruta_alternativa[i+1]
-                if (u, v) in grafo.grafo.edges:
-                    idx = list(grafo.grafo.edges).index((u, v))
-                    colores_aristas[idx] = "green"
-        
-        nx.draw(
-            grafo.grafo, pos, with_labels=True, node_color=colores_nodos, 
-            edge_color=colores_aristas, node_size=600, font_weight="bold", ax=self.axes
-        )
-        self.draw()
-        
     def buscar_y_mostrar_ruta_alternativa(self):
-        for casa in [nodo for nodo, datos in self.red_agua.grafo.nodes(data=True) if datos["tipo"] == "casa"]:
-            ruta_alternativa, flujo = self.red_agua.buscar_ruta_alternativa_optima(casa)
+        # Un solo arbol de rutas desde todos los tanques da la mejor ruta de cada casa, en segundo plano
+        self._lanzar_trabajo("Buscar rutas alternativas", buscar_rutas, self.red_agua.instantanea(), al_terminar=self._rutas_encontradas)
+
+    def _rutas_encontradas(self, rutas):
+        for casa, (ruta_alternativa, flujo) in rutas.items():
             if ruta_alternativa:
                 self.mostrar_sugerencia(
                     f"Ruta alternativa encontrada para {casa}: {' -> '.join(ruta_alternativa)} con flujo {flujo} L/s."
                 )
-                self.canvas.dibujar_grafo(self.red_agua, ruta_alternativa)
+                self.canvas.aristas_resaltadas.update(zip(ruta_alternativa, ruta_alternativa[1:]))
             else:
                 self.mostrar_sugerencia(f"No se encontró una ruta alternativa para {casa}.")
+        # Redibujar una sola vez con todas las rutas resaltadas
+        self.canvas.dibujar_grafo(self.red_agua)
     
     def calcular_flujo_maximo(self):
         # Pedir el nodo fuente
@@ -499,12 +572,23 @@ class Interfaz(QMainWindow):
         if not ok2 or not sumidero:
             return
         
-        # Llamar al método Ford-Fulkerson para calcular el flujo máximo
-        flujo_maximo = self.red_agua.ford_fulkerson(fuente, sumidero)
-        
+        # Calcular el flujo máximo (Dinic sobre la red compacta) en segundo plano
+        self._lanzar_trabajo(
+            "Flujo máximo", calcular_flujo, self.red_agua.instantanea(), fuente, sumidero,
+            al_terminar=self._flujo_calculado, mensaje_error="No se pudo calcular el flujo máximo",
+        )
+
+    def _flujo_calculado(self, resultado):
+        fuente, sumidero, flujo_maximo = resultado
         # Mostrar el flujo máximo calculado
         QMessageBox.information(self, "Flujo Máximo", f"El flujo máximo desde {fuente} hasta {sumidero} es: {flujo_maximo} L/s.")
         
+    def closeEvent(self, evento):
+        # Cancelar los analisis en curso y escribir los cambios que hayan quedado pendientes antes de cerrar la ventana
+        self.trabajos.detener()
+        self.red_agua.desactivar_guardado_diferido()
+        super().closeEvent(evento)
+
     def recargar_grafo(self):
         try:
             # Llama al método `recargar_json` del backend
@@ -0,0 +1,148 @@
+import cProfile #perfil detallado de una sola accion
+import functools
+import io
+import pstats
+import re
+import threading #el escritor diferido mide sus escrituras desde otro hilo
+import time
+from collections import deque #ventana de las ultimas duraciones de cada operacion
+from contextlib import contextmanager
+
+
+# Metricas de rendimiento: por operacion, cantidad de llamadas, tiempo acumulado, maximo y percentiles
+# sobre las ultimas `muestras_por_operacion` duraciones; ademas contadores libres (bytes escritos,
+# recorridos del grafo, ...). Se exportan como diccionario (instantanea) o en el formato de texto de
+# Prometheus (texto_prometheus).
+class Metricas:
+    def __init__(self, muestras_por_operacion=1024):
+        self.muestras_por_operacion = muestras_por_operacion
+        self.contadores = {}
+        self._operaciones = {} #nombre -> [llamadas, segundos acumulados, maximo, ultimas duraciones]
+        self._cerrojo = threading.Lock()
+
+    def registrar_tiempo(self, operacion, segundos):
+        with self._cerrojo:
+            datos = self._operaciones.get(operacion)
+            if datos is None:
+                datos = [0, 0.0, 0.0, deque(maxlen=self.muestras_por_operacion)]
+                self._operaciones[operacion] = datos
+            datos[0] += 1
+            datos[1] += segundos
+            datos[2] = max(datos[2], segundos)
+            datos[3].append(segundos)
+
+    def contar(self, nombre, cantidad=1):
+        with self._cerrojo:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + cantidad
+
+    #Mide el bloque como una llamada a `operacion`, aunque termine con una excepcion
+    @contextmanager
+    def medir(self, operacion):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar_tiempo(operacion, time.perf_counter() - inicio)
+
+    def reiniciar(self):
+        with self._cerrojo:
+            self.contadores.clear()
+            self._operaciones.clear()
+
+    # Diccionario con el estado actual: {"operaciones": {nombre: {...}}, "contadores": {...}}. Los
+    # percentiles (p50, p90, p99) son del rango mas cercano sobre la ventana de duraciones recientes.
+    def instantanea(self):
+        with self._cerrojo:
+            operaciones = {nombre: (datos[0], datos[1], datos[2], sorted(datos[3])) for nombre, datos in self._operaciones.items()}
+            contadores = dict(self.contadores)
+        resumen = {}
+        for nombre, (llamadas, total, maximo, duraciones) in sorted(operaciones.items()):
+            resumen[nombre] = {
+                "llamadas": llamadas,
+                "total_s": total,
+                "promedio_s": total / llamadas,
+                "max_s": maximo,
+                **{f"p{p}_s": _percentil(duraciones, p) for p in (50, 90, 99)},
+            }
+        return {"operaciones": resumen, "contadores": dict(sorted(contadores.items()))}
+
+    # Texto en el formato de exposicion de Prometheus: un resumen (summary) con los tiempos de todas las
+    # operaciones y un contador por cada contador libre
+    def texto_prometheus(self, prefijo="red_agua"):
+        instantanea = self.instantanea()
+        lineas = [
+            f"# HELP {prefijo}_operacion_segundos Duracion de las operaciones de la red.",
+            f"# TYPE {prefijo}_operacion_segundos summary",
+        ]
+        for nombre, datos in instantanea["operaciones"].items():
+            etiqueta = f'operacion="{_escapar(nombre)}"'
+            for p in (50, 90, 99):
+                lineas.append(f'{prefijo}_operacion_segundos{{{etiqueta},quantile="{p / 100}"}} {datos[f"p{p}_s"]!r}')
+            lineas.append(f"{prefijo}_operacion_segundos_sum{{{etiqueta}}} {datos['total_s']!r}")
+            lineas.append(f"{prefijo}_operacion_segundos_count{{{etiqueta}}} {datos['llamadas']}")
+        for nombre, valor in instantanea["contadores"].items():
+            metrica = f"{prefijo}_{re.sub(r'[^a-zA-Z0-9_]', '_', nombre)}_total"
+            lineas.append(f"# TYPE {metrica} counter")
+            lineas.append(f"{metrica} {valor}")
+        return "\n".join(lineas) + "\n"
+
+
+def _percentil(ordenados, p):
+    if not ordenados:
+        return 0.0
+    return ordenados[min(len(ordenados) - 1, max(0, -(-p * len(ordenados) // 100) - 1))]
+
+
+def _escapar(texto):
+    return texto.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Reemplaza, solo en esta instancia, cada metodo de la lista por una version que mide sus llamadas en
+# `metricas` con el nombre prefijo + metodo. Los demas objetos de la clase no cambian y, sin instrumentar,
+# no hay ningun costo extra. Las llamadas internas (self.metodo) tambien pasan por la version medida.
+def instrumentar(objeto, metodos, metricas, prefijo=""):
+    for nombre in metodos:
+        original = getattr(type(objeto), nombre).__get__(objeto)
+        setattr(objeto, nombre, _medido(original, metricas, prefijo + nombre))
+
+
+#Devuelve los metodos de la instancia a los de su clase
+def desinstrumentar(objeto, metodos):
+    for nombre in metodos:
+        if nombre in vars(objeto):
+            delattr(objeto, nombre)
+
+
+def _medido(funcion, metricas, operacion):
+    @functools.wraps(funcion)
+    def medido(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            metricas.registrar_tiempo(operacion, time.perf_counter() - inicio)
+    return medido
+
+
+# Perfil de cProfile alrededor del bloque. Al salir, `perfil.resumen` tiene las `limite` funciones con
+# mas tiempo acumulado como texto y, si se indica `archivo`, el perfil completo se guarda ahi (se puede
+# abrir con pstats o snakeviz).
+class Perfil:
+    def __init__(self, archivo=None, limite=25):
+        self.archivo = archivo
+        self.limite = limite
+        self.resumen = ""
+        self._perfil = cProfile.Profile()
+
+    def __enter__(self):
+        self._perfil.enable()
+        return self
+
+    def __exit__(self, *excepcion):
+        self._perfil.disable()
+        if self.archivo:
+            self._perfil.dump_stats(self.archivo)
+        texto = io.StringIO()
+        pstats.Stats(self._perfil, stream=texto).sort_stats("cumulative").print_stats(self.limite)
+        self.resumen = texto.getvalue()
+        return False
@@ -0,0 +1,280 @@
+import struct #cabecera del formato binario
+
+import numpy as np #arreglos compactos para los atributos y la adyacencia de la red
+
+from almacenamiento import escribir_archivo_atomico #el archivo binario se reemplaza completo, nunca a medias
+
+TIPO_CASA = 0
+TIPO_TANQUE = 1
+
+# Formato binario de la red compacta: una cabecera fija seguida de los arreglos, cada uno alineado a 8
+# bytes y en el orden de _secciones, asi el archivo se puede abrir con np.memmap sin copiar nada. La
+# version 2 agrega las coordenadas x, y de los nodos; los archivos de la version 1 se siguen leyendo.
+MAGIA_BINARIO = b"REDAGUA\0"
+VERSION_BINARIO = 2
+VERSIONES_LEGIBLES = (1, 2)
+_CABECERA = struct.Struct("<8sIIqqq") #magia, version, reservado, nodos, tuberías, bytes de la tabla de nombres
+
+
+# Copia compacta de la red para los calculos pesados: cada nodo es un entero, la adyacencia se guarda en
+# formato CSR (hacia adelante y hacia atras) y cada atributo es un arreglo de NumPy.
+#
+# Las tuberías estan ordenadas por nodo de origen y, dentro de cada origen, en el mismo orden que la
+# adyacencia de networkx, asi que las tuberías que salen del nodo u son los ids
+# inicio_salida[u] .. inicio_salida[u + 1] - 1. Las coordenadas x, y de los nodos que no las tienen son NaN.
+class RedCompacta:
+    def __init__(self, nombres, tipo, demanda, nivel, capacidad, origen, destino, capacidad_flujo, obstruccion, version=None,
+                 x=None, y=None):
+        self.version = version #version de la topologia de la red con la que se armo
+        self.nombres = nombres #nombre de cada nodo, por id
+        self.tipo = np.asarray(tipo, dtype=np.int8)
+        self.demanda = np.asarray(demanda, dtype=np.float64)
+        self.nivel = np.asarray(nivel, dtype=np.float64)
+        self.capacidad = np.asarray(capacidad, dtype=np.float64)
+        self.x = np.full(len(nombres), np.nan) if x is None else np.asarray(x, dtype=np.float64)
+        self.y = np.full(len(nombres), np.nan) if y is None else np.asarray(y, dtype=np.float64)
+
+        origen = np.asarray(origen, dtype=np.int32)
+        orden = np.argsort(origen, kind="stable")
+        self.origen = origen[orden]
+        self.destino = np.asarray(destino, dtype=np.int32)[orden]
+        self.capacidad_flujo = np.asarray(capacidad_flujo, dtype=np.float64)[orden]
+        self.obstruccion = np.asarray(obstruccion, dtype=np.float64)[orden]
+
+        n = len(nombres)
+        self.inicio_salida = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.origen, minlength=n), out=self.inicio_salida[1:])
+        self.aristas_entrada = np.argsort(self.destino, kind="stable").astype(np.int32)
+        self.inicio_entrada = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.destino, minlength=n), out=self.inicio_entrada[1:])
+        self._indice = None
+
+    # Arma la copia compacta a partir del grafo de networkx de una RedDeAgua
+    @classmethod
+    def desde_grafo(cls, grafo, version=None):
+        nombres = list(grafo)
+        indice = {nombre: i for i, nombre in enumerate(nombres)}
+        n = len(nombres)
+        tipo = np.zeros(n, dtype=np.int8)
+        demanda = np.zeros(n)
+        nivel = np.zeros(n)
+        capacidad = np.zeros(n)
+        x = np.full(n, np.nan)
+        y = np.full(n, np.nan)
+        for i, data in enumerate(grafo.nodes.values()):
+            if "x" in data and "y" in data:
+                x[i] = data["x"]
+                y[i] = data["y"]
+            if data["tipo"] == "tanque":
+                tipo[i] = TIPO_TANQUE
+                nivel[i] = data["nivel"]
+                capacidad[i] = data["capacidad"]
+            else:
+                demanda[i] = data["demanda"]
+
+        origen = []
+        destino = []
+        capacidad_flujo = []
+        obstruccion = []
+        for u, vecinos in grafo.adj.items():
+            i = indice[u]
+            for v, datos in vecinos.items():
+                origen.append(i)
+                destino.append(indice[v])
+                capacidad_flujo.append(datos.get("capacidad_flujo", 0))
+                obstruccion.append(datos.get("obstruccion", 0))
+
+        red = cls(nombres, tipo, demanda, nivel, capacidad, origen, destino, capacidad_flujo, obstruccion, version, x, y)
+        red._indice = indice
+        return red
+
+    @property
+    def num_nodos(self):
+        return len(self.nombres)
+
+    @property
+    def num_aristas(self):
+        return len(self.destino)
+
+    # Diccionario nombre -> id, se arma solo si se necesita
+    @property
+    def indice(self):
+        if self._indice is None:
+            self._indice = {nombre: i for i, nombre in enumerate(self.nombres)}
+        return self._indice
+
+    # Id de la tubería u -> v, o None si no existe
+    def id_arista(self, nodo1, nodo2):
+        u = self.indice.get(nodo1)
+        v = self.indice.get(nodo2)
+        if u is None or v is None:
+            return None
+        inicio, fin = self.inicio_salida[u], self.inicio_salida[u + 1]
+        posiciones = np.flatnonzero(self.destino[inicio:fin] == v)
+        return int(inicio + posiciones[0]) if posiciones.size else None
+
+    # Mantiene la copia al dia cuando solo cambian atributos (capacidad u obstruccion de una tubería,
+    # nivel de un tanque). Devuelve False si el elemento no existe y hay que reconstruirla.
+    def actualizar_arista(self, nodo1, nodo2, datos):
+        arista = self.id_arista(nodo1, nodo2)
+        if arista is None:
+            return False
+        self.capacidad_flujo[arista] = datos.get("capacidad_flujo", 0)
+        self.obstruccion[arista] = datos.get("obstruccion", 0)
+        return True
+
+    def actualizar_nivel(self, tanque, nivel):
+        i = self.indice.get(tanque)
+        if i is None:
+            return False
+        self.nivel[i] = nivel
+        return True
+
+    # Ids de todas las tuberías que salen de los nodos dados, sin ciclos de Python
+    def aristas_salientes(self, nodos):
+        return _expandir(self.inicio_salida, nodos)
+
+    def aristas_entrantes(self, nodos):
+        return self.aristas_entrada[_expandir(self.inicio_entrada, nodos)]
+
+    # Arreglo booleano con los nodos alcanzables desde algun tanque (BFS por niveles vectorizado)
+    def alcanzables(self):
+        visitado = np.zeros(self.num_nodos, dtype=bool)
+        frontera = np.flatnonzero(self.tipo == TIPO_TANQUE)
+        visitado[frontera] = True
+        while frontera.size:
+            vecinos = self.destino[self.aristas_salientes(frontera)]
+            vecinos = np.unique(vecinos[~visitado[vecinos]])
+            visitado[vecinos] = True
+            frontera = vecinos
+        return visitado
+
+    # Suma de la capacidad de las tuberías que llegan a cada nodo
+    def flujo_entrante(self, solo_positivas=False):
+        capacidades = self.capacidad_flujo
+        if solo_positivas:
+            capacidades = np.where(capacidades > 0, capacidades, 0)
+        return np.bincount(self.destino, weights=capacidades, minlength=self.num_nodos)
+
+    # Verificacion de suministro de todas las casas a la vez. Devuelve los ids de las casas y, para cada
+    # una, si esta conectada a un tanque, el flujo que recibe por tuberías con capacidad positiva y si ese
+    # flujo cubre su demanda.
+    def verificar_suministro(self):
+        casas = np.flatnonzero(self.tipo == TIPO_CASA)
+        conectadas = self.alcanzables()[casas]
+        flujo_recibido = self.flujo_entrante(solo_positivas=True)[casas]
+        suficiente = flujo_recibido >= self.demanda[casas]
+        return casas, conectadas, flujo_recibido, suficiente
+
+    # Guarda la copia compacta en el formato binario. Los nombres se guardan como una tabla de cadenas
+    # (UTF-8 concatenado mas el inicio de cada nombre).
+    def guardar_binario(self, ruta):
+        codificados = [nombre.encode("utf-8") for nombre in self.nombres]
+        nombres_inicio = np.zeros(len(codificados) + 1, dtype=np.int64)
+        np.cumsum([len(nombre) for nombre in codificados], out=nombres_inicio[1:])
+        nombres_datos = np.frombuffer(b"".join(codificados), dtype=np.uint8)
+
+        arreglos = {
+            "nombres_inicio": nombres_inicio, "nombres_datos": nombres_datos, "tipo": self.tipo,
+            "demanda": self.demanda, "nivel": self.nivel, "capacidad": self.capacidad,
+            "origen": self.origen, "destino": self.destino, "capacidad_flujo": self.capacidad_flujo,
+            "obstruccion": self.obstruccion, "inicio_salida": self.inicio_salida,
+            "aristas_entrada": self.aristas_entrada, "inicio_entrada": self.inicio_entrada, "x": self.x, "y": self.y,
+        }
+        partes = [_CABECERA.pack(MAGIA_BINARIO, VERSION_BINARIO, 0, self.num_nodos, self.num_aristas, len(nombres_datos))]
+        posicion = _CABECERA.size
+        for nombre, tipo, cantidad, desplazamiento in _secciones(self.num_nodos, self.num_aristas, len(nombres_datos)):
+            partes.append(b"\0" * (desplazamiento - posicion))
+            datos = np.ascontiguousarray(arreglos[nombre], dtype=tipo).tobytes()
+            partes.append(datos)
+            posicion = desplazamiento + len(datos)
+        escribir_archivo_atomico(ruta, b"".join(partes))
+
+    # Abre un archivo binario como copia compacta respaldada por np.memmap: no se lee nada hasta que se
+    # usa y varios procesos que abren el mismo archivo comparten las paginas. Con modo "r" los arreglos
+    # son de solo lectura; con modo "c" se pueden modificar en memoria sin tocar el archivo.
+    @classmethod
+    def abrir_binario(cls, ruta, modo="r"):
+        with open(ruta, 'rb') as f:
+            magia, version, _, n, m, bytes_nombres = _CABECERA.unpack(f.read(_CABECERA.size))
+        if magia != MAGIA_BINARIO:
+            raise ValueError(f"{ruta} no es un archivo binario de red de agua.")
+        if version not in VERSIONES_LEGIBLES:
+            raise ValueError(f"Version de formato binario no soportada: {version}.")
+
+        arreglos = {"x": np.full(n, np.nan), "y": np.full(n, np.nan)} #la version 1 no tiene coordenadas
+        for nombre, tipo, cantidad, desplazamiento in _secciones(n, m, bytes_nombres, version):
+            if cantidad == 0:
+                arreglos[nombre] = np.zeros(0, dtype=tipo)
+            else:
+                arreglos[nombre] = np.memmap(ruta, dtype=tipo, mode=modo, offset=desplazamiento, shape=(cantidad,))
+
+        red = cls.__new__(cls)
+        red.version = None
+        red.nombres = TablaDeNombres(arreglos.pop("nombres_inicio"), arreglos.pop("nombres_datos"))
+        for nombre, arreglo in arreglos.items():
+            setattr(red, nombre, arreglo)
+        red._indice = None
+        return red
+
+    # Bytes ocupados por los arreglos de la copia compacta (sin contar los nombres)
+    def memoria_arreglos(self):
+        return sum(
+            arreglo.nbytes for arreglo in (
+                self.tipo, self.demanda, self.nivel, self.capacidad, self.origen, self.destino,
+                self.capacidad_flujo, self.obstruccion, self.inicio_salida, self.aristas_entrada, self.inicio_entrada,
+                self.x, self.y,
+            )
+        )
+
+
+# Dado un arreglo de inicios CSR y un conjunto de nodos, devuelve todas las posiciones de sus filas
+def _expandir(inicio, nodos):
+    nodos = np.asarray(nodos)
+    inicios = inicio[nodos]
+    cantidades = inicio[nodos + 1] - inicios
+    total = int(cantidades.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    acumulado = np.cumsum(cantidades) - cantidades
+    return np.repeat(inicios - acumulado, cantidades) + np.arange(total)
+
+
+# Secciones del formato binario: (nombre, tipo, cantidad de elementos, desplazamiento en el archivo)
+def _secciones(n, m, bytes_nombres, version=VERSION_BINARIO):
+    secciones = []
+    desplazamiento = _CABECERA.size
+    for nombre, tipo, cantidad in (
+        ("nombres_inicio", np.int64, n + 1), ("nombres_datos", np.uint8, bytes_nombres),
+        ("tipo", np.int8, n), ("demanda", np.float64, n), ("nivel", np.float64, n), ("capacidad", np.float64, n),
+        ("origen", np.int32, m), ("destino", np.int32, m), ("capacidad_flujo", np.float64, m),
+        ("obstruccion", np.float64, m), ("inicio_salida", np.int64, n + 1), ("aristas_entrada", np.int32, m),
+        ("inicio_entrada", np.int64, n + 1), *((("x", np.float64, n), ("y", np.float64, n)) if version >= 2 else ()),
+    ):
+        desplazamiento = (desplazamiento + 7) // 8 * 8
+        secciones.append((nombre, tipo, cantidad, desplazamiento))
+        desplazamiento += cantidad * np.dtype(tipo).itemsize
+    return secciones
+
+
+# Nombres de los nodos leidos de la tabla de cadenas del formato binario. Se comporta como la lista de
+# nombres de RedCompacta, pero solo decodifica los nombres que se piden.
+class TablaDeNombres:
+    def __init__(self, inicio, datos):
+        self.inicio = inicio
+        self.datos = datos
+
+    def __len__(self):
+        return len(self.inicio) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        i = range(len(self))[i]
+        return bytes(self.datos[self.inicio[i]:self.inicio[i + 1]]).decode("utf-8")
+
+    def __iter__(self):
+        datos = bytes(self.datos)
+        inicio = self.inicio.tolist()
+        for desde, hasta in zip(inicio, inicio[1:]):
+            yield datos[desde:hasta].decode("utf-8")
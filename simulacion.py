@@ -0,0 +1,101 @@
+import numpy as np #todos los nodos se actualizan juntos en cada paso
+
+from red_compacta import TIPO_CASA, TIPO_TANQUE
+
+SEGUNDOS_DIA = 24 * 3600
+
+
+# Asigna cada nodo al tanque mas cercano (en cantidad de tuberías) con un recorrido por niveles que sale
+# de todos los tanques a la vez. Devuelve los ids de los tanques y, por nodo, la posicion de su tanque en
+# ese arreglo, o -1 si no le llega agua de ninguno.
+def asignar_tanques(compacta):
+    tanques = np.flatnonzero(compacta.tipo == TIPO_TANQUE)
+    asignado = np.full(compacta.num_nodos, -1, dtype=np.int64)
+    asignado[tanques] = np.arange(len(tanques))
+    frontera = tanques
+    while frontera.size:
+        aristas = compacta.aristas_salientes(frontera)
+        vecinos = compacta.destino[aristas]
+        nuevos = asignado[vecinos] < 0
+        vecinos, primera = np.unique(vecinos[nuevos], return_index=True)
+        asignado[vecinos] = asignado[compacta.origen[aristas[nuevos][primera]]]
+        frontera = vecinos
+    return tanques, asignado
+
+
+# Simulacion en periodo extendido: cada casa toma agua del tanque que se le asigno, hasta su demanda
+# (base por el factor de su perfil en ese momento) y sin superar la capacidad de las tuberías que le
+# llegan. Si un tanque no alcanza para todas sus casas, reparte lo que tiene en la misma proporcion.
+#
+# - perfiles: lista de perfiles; cada uno es una secuencia de factores de demanda repartidos a lo largo de
+#   un dia (24 valores son un factor por hora), y en cada paso se usa el de su hora del dia.
+# - perfil_de_casa: para cada casa (en el orden de las casas de la red compacta), la posicion de su perfil.
+# - recarga: litros por segundo que entran a cada tanque (escalar o arreglo por tanque).
+#
+# Devuelve los niveles de los tanques y la demanda no cubierta en cada paso, como arreglos. La serie por
+# casa solo se guarda con detalle_casas=True (pasos x casas, en float32); siempre se devuelve el total
+# acumulado por casa.
+def simular(compacta, pasos, paso_segundos, perfiles=None, perfil_de_casa=None, recarga=0.0, detalle_casas=False):
+    tanques, asignado = asignar_tanques(compacta)
+    casas = np.flatnonzero(compacta.tipo == TIPO_CASA)
+    tanque_de_casa = asignado[casas]
+    conectada = tanque_de_casa >= 0
+    zona = np.where(conectada, tanque_de_casa, len(tanques)) #las casas sin tanque van a una zona aparte
+
+    demanda_base = compacta.demanda[casas]
+    capacidad_positiva = np.where(compacta.capacidad_flujo > 0, compacta.capacidad_flujo, 0)
+    limite = np.bincount(compacta.destino, weights=capacidad_positiva, minlength=compacta.num_nodos)[casas]
+
+    # Los perfiles pueden tener distinto largo: se guardan uno detras de otro en un solo arreglo
+    if perfiles is None:
+        perfiles = [[1.0]]
+    largos = np.array([len(perfil) for perfil in perfiles], dtype=np.int64)
+    inicios = np.cumsum(largos) - largos
+    factores = np.concatenate([np.asarray(perfil, dtype=np.float64) for perfil in perfiles])
+    if perfil_de_casa is None:
+        perfil_de_casa = np.zeros(len(casas), dtype=np.int64)
+    perfil_de_casa = np.asarray(perfil_de_casa, dtype=np.int64)
+
+    nivel = compacta.nivel[tanques].astype(np.float64)
+    capacidad = compacta.capacidad[tanques]
+    recarga = np.broadcast_to(np.asarray(recarga, dtype=np.float64), nivel.shape) * paso_segundos
+
+    niveles = np.empty((pasos + 1, len(tanques)))
+    niveles[0] = nivel
+    insatisfecha_por_zona = np.empty((pasos, len(tanques) + 1))
+    insatisfecha_total = np.zeros(len(casas))
+    detalle = np.empty((pasos, len(casas)), dtype=np.float32) if detalle_casas else None
+
+    for paso in range(pasos):
+        hora_del_dia = (paso * paso_segundos % SEGUNDOS_DIA) / SEGUNDOS_DIA
+        factor = factores[inicios + np.minimum((hora_del_dia * largos).astype(np.int64), largos - 1)]
+        demanda = demanda_base * factor[perfil_de_casa] * paso_segundos
+        pedido = np.where(conectada, np.minimum(demanda, limite * paso_segundos), 0)
+
+        pedido_por_tanque = np.bincount(tanque_de_casa[conectada], weights=pedido[conectada], minlength=len(tanques))
+        fraccion = np.ones(len(tanques) + 1)
+        con_pedido = pedido_por_tanque > 0
+        fraccion[:-1][con_pedido] = np.minimum(1, nivel[con_pedido] / pedido_por_tanque[con_pedido])
+        entregado = pedido * fraccion[zona]
+
+        nivel = np.clip(nivel - pedido_por_tanque * fraccion[:-1] + recarga, 0, capacidad)
+        niveles[paso + 1] = nivel
+        faltante = demanda - entregado
+        insatisfecha_por_zona[paso] = np.bincount(zona, weights=faltante, minlength=len(tanques) + 1)
+        insatisfecha_total += faltante
+        if detalle is not None:
+            detalle[paso] = faltante
+
+    resultado = {
+        "tiempos": np.arange(pasos + 1) * paso_segundos,
+        "tanques": tanques,
+        "niveles": niveles,
+        "demanda_insatisfecha": insatisfecha_por_zona.sum(axis=1),
+        "insatisfecha_por_tanque": insatisfecha_por_zona[:, :-1],
+        "insatisfecha_sin_tanque": insatisfecha_por_zona[:, -1],
+        "casas": casas,
+        "insatisfecha_por_casa_total": insatisfecha_total,
+    }
+    if detalle is not None:
+        resultado["insatisfecha_por_casa"] = detalle
+    return resultado
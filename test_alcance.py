@@ -0,0 +1,68 @@
+import random
+
+import networkx as nx
+import pytest
+
+from benchmarks import obstruir_parcialmente
+from generador_redes import TOPOLOGIAS, generar_red
+from grafo import RedDeAgua
+
+
+def red_generada(topologia, semilla=0):
+    red = RedDeAgua(None)
+    red._cargar_datos(obstruir_parcialmente(generar_red(topologia, num_casas=300, semilla=semilla), semilla=semilla))
+    return red
+
+
+def alcanzables_de_referencia(grafo):
+    tanques = [nodo for nodo, tipo in grafo.nodes(data="tipo") if tipo == "tanque"]
+    return set(tanques).union(*(nx.descendants(grafo, tanque) for tanque in tanques))
+
+
+@pytest.mark.parametrize("topologia", TOPOLOGIAS)
+def test_alcance_igual_a_networkx(topologia):
+    red = red_generada(topologia)
+    rng = random.Random(0)
+    for contador in range(60):
+        tuberias = list(red.grafo.edges)
+        cambio = rng.choice(["eliminar", "invertir", "agregar", "nueva_casa"])
+        if cambio == "eliminar":
+            red.eliminar_tuberia(*rng.choice(tuberias))
+        elif cambio == "invertir":
+            red.cambiar_sentido_tuberia(*rng.choice(tuberias))
+        elif cambio == "agregar":
+            red.agregar_tuberia(*rng.sample(list(red.grafo), 2), 5)
+        else:
+            red.agregar_casa(f"Nueva{contador}", 5)
+
+        alcanzables = alcanzables_de_referencia(red.grafo)
+        assert {nodo for nodo in red.grafo if red.esta_conectada_a_tanque(nodo)} == alcanzables
+        suministro = red.verificar_suministro()
+        assert {casa for casa, estado in suministro.items() if estado["mensaje"] != "No está conectada a un tanque."} == (
+            alcanzables & set(suministro)
+        )
+
+
+def test_tanques_de_cada_nodo():
+    red = red_generada("malla")
+    grafo = red.grafo
+    indice = red.indice_alcance(con_tanques=True)
+    for nodo in grafo:
+        esperados = [
+            tanque for tanque in indice.tanques if tanque == nodo or tanque in nx.ancestors(grafo, nodo)
+        ]
+        assert indice.tanques_de(nodo) == esperados
+    with pytest.raises(ValueError):
+        red_generada("arbol").indice_alcance().tanques_de("Casa0")
+
+
+# El indice se reutiliza mientras solo cambien atributos y se rearma al cambiar la topologia
+def test_indice_se_reutiliza():
+    red = red_generada("mixta")
+    indice = red.indice_alcance()
+    nodo1, nodo2 = next(iter(red.grafo.edges))
+    red.editar_tuberia(nodo1, nodo2, 50)
+    red.actualizar_nivel_tanque("Tanque0")
+    assert red.indice_alcance() is indice
+    red.eliminar_tuberia(nodo1, nodo2)
+    assert red.indice_alcance() is not indice
@@ -0,0 +1,104 @@
+import json
+import random
+
+import networkx as nx
+import pytest
+
+from almacenamiento import DiarioDeCambios
+from generador_redes import generar_red
+from grafo import RedDeAgua
+
+
+def red_con_diario(tmp_path, compactar_cada=1000):
+    ruta = tmp_path / "red.json"
+    ruta.write_text(json.dumps(generar_red("mixta", num_casas=100)))
+    red = RedDeAgua(str(ruta))
+    red.cargar_desde_json(str(ruta))
+    red.activar_diario(compactar_cada=compactar_cada)
+    return red
+
+
+# Red recuperada desde el diario que dejo `red` en disco, como al abrir la aplicacion de nuevo
+def red_recuperada(tmp_path):
+    red = RedDeAgua(str(tmp_path / "otra.json"))
+    red.activar_diario(ruta_base=str(tmp_path / "red"))
+    return red
+
+
+def misma_red(red1, red2):
+    assert dict(red1.grafo.nodes(data=True)) == dict(red2.grafo.nodes(data=True))
+    assert {(u, v): datos for u, v, datos in red1.grafo.edges(data=True)} == {
+        (u, v): datos for u, v, datos in red2.grafo.edges(data=True)
+    }
+
+
+def cambios_al_azar(red, semilla, cantidad):
+    rng = random.Random(semilla)
+    for contador in range(cantidad):
+        tuberias = list(red.grafo.edges)
+        cambio = rng.choice(["editar", "eliminar", "agregar", "invertir", "nueva_casa", "quitar_casa", "nivel"])
+        if cambio == "editar":
+            red.editar_tuberia(*rng.choice(tuberias), rng.choice([-1, 10, 50]))
+        elif cambio == "eliminar":
+            red.eliminar_tuberia(*rng.choice(tuberias))
+        elif cambio == "agregar":
+            red.agregar_tuberia(*rng.sample(list(red.grafo), 2), rng.uniform(0, 40))
+        elif cambio == "invertir":
+            red.cambiar_sentido_tuberia(*rng.choice(tuberias))
+        elif cambio == "nueva_casa":
+            red.agregar_casa(f"Nueva{contador}", rng.uniform(1, 30), x=rng.uniform(0, 100), y=rng.uniform(0, 100))
+        elif cambio == "quitar_casa":
+            red.eliminar_casa(rng.choice([nodo for nodo, tipo in red.grafo.nodes(data="tipo") if tipo == "casa"]))
+        else:
+            red.actualizar_nivel_tanque("Tanque0")
+
+
+def lineas_del_diario(tmp_path):
+    return (tmp_path / "red.diario.jsonl").read_text().splitlines()
+
+
+@pytest.mark.parametrize("compactar_cada", [1000, 7])
+@pytest.mark.parametrize("semilla", range(5))
+def test_recuperar_igual_a_la_red(tmp_path, compactar_cada, semilla):
+    red = red_con_diario(tmp_path, compactar_cada)
+    cambios_al_azar(red, semilla, 200)
+    assert len(lineas_del_diario(tmp_path)) <= compactar_cada
+    misma_red(red, red_recuperada(tmp_path))
+
+
+def test_ultima_linea_a_medio_escribir(tmp_path):
+    red = red_con_diario(tmp_path)
+    cambios_al_azar(red, 0, 20)
+    registros = len(lineas_del_diario(tmp_path))
+    with open(tmp_path / "red.diario.jsonl", "a") as f:
+        f.write('{"n":999,"op":"eliminar_nodo","nod')
+
+    recuperada = red_recuperada(tmp_path)
+    misma_red(red, recuperada)
+    assert len(lineas_del_diario(tmp_path)) == registros
+    # Los registros siguientes quedan en lineas completas despues del corte
+    recuperada.agregar_casa("Ultima", 3)
+    misma_red(recuperada, red_recuperada(tmp_path))
+
+
+# El proceso se interrumpe despues de escribir la instantanea pero antes de vaciar el diario: los registros
+# que ya estan en la instantanea no se vuelven a aplicar
+def test_diario_ya_incluido_en_la_instantanea(tmp_path):
+    red = red_con_diario(tmp_path)
+    cambios_al_azar(red, 1, 30)
+    anterior = (tmp_path / "red.diario.jsonl").read_text()
+    red._diario.compactar()
+    (tmp_path / "red.diario.jsonl").write_text(anterior)
+
+    diario = DiarioDeCambios(nx.DiGraph(), str(tmp_path / "red"))
+    assert diario.cargar() == 0
+    assert diario.secuencia == red._diario.secuencia
+    misma_red(red, red_recuperada(tmp_path))
+
+
+def test_operacion_desconocida(tmp_path):
+    red = red_con_diario(tmp_path)
+    with open(tmp_path / "red.diario.jsonl", "a") as f:
+        f.write('{"n":1000000,"op":"otra"}\n')
+    with pytest.raises(ValueError):
+        red_recuperada(tmp_path)
@@ -0,0 +1,79 @@
+import io
+import json
+
+import pytest
+
+from analisis_lotes import ANALISIS, analizar_archivo, analizar_lote, expandir_archivos
+from benchmarks import obstruir_parcialmente
+from generador_redes import generar_red
+from grafo import RedDeAgua
+
+PARES = [["Tanque0", "Casa5"], ["Tanque0", "NoExiste"]]
+
+
+# Guarda redes generadas como json y una de ellas tambien en el formato binario
+@pytest.fixture
+def archivos(tmp_path):
+    rutas = []
+    for i, topologia in enumerate(["arbol", "malla", "mixta"]):
+        ruta = tmp_path / f"red{i}.json"
+        ruta.write_text(json.dumps(obstruir_parcialmente(generar_red(topologia, num_casas=200, semilla=i))))
+        rutas.append(str(ruta))
+    red = RedDeAgua(None)
+    red.cargar_desde_json(rutas[0])
+    red.guardar_binario(str(tmp_path / "red0.bin"))
+    return rutas
+
+
+def sin_tiempos(resultado):
+    return {clave: valor for clave, valor in resultado.items() if clave != "tiempos"}
+
+
+def test_analizar_archivo_igual_a_la_red(archivos):
+    red = RedDeAgua(None)
+    red.cargar_desde_json(archivos[1])
+    with open(archivos[1]) as f:
+        contenido = f.read()
+    resultado = analizar_archivo(archivos[1], ANALISIS, PARES)
+
+    assert set(resultado["tiempos"]) == {"carga", *ANALISIS}
+    assert resultado["nodos"] == red.grafo.number_of_nodes()
+    assert resultado["suministro"]["fallas"] == red.verificar_suministro_vectorizado(solo_fallas=True)
+    assert resultado["bucles"] == red.regiones_con_bucles()
+    assert resultado["sin_servicio"] == red.identificar_casas_sin_servicio()
+    assert resultado["flujo_maximo"][0]["valor"] == red.flujo_maximo("Tanque0", "Casa5")
+    assert "error" in resultado["flujo_maximo"][1]
+    assert "errores" not in resultado
+    # Se analiza sin archivo asociado: el json queda como estaba
+    with open(archivos[1]) as f:
+        assert f.read() == contenido
+
+
+def test_binario_igual_a_json(archivos):
+    binario = archivos[0].replace(".json", ".bin")
+    assert sin_tiempos(analizar_archivo(binario, ANALISIS, PARES)) == {
+        **sin_tiempos(analizar_archivo(archivos[0], ANALISIS, PARES)), "archivo": binario
+    }
+
+
+def test_archivo_que_no_carga(tmp_path):
+    ruta = tmp_path / "roto.json"
+    ruta.write_text("{no es json")
+    resultado = analizar_archivo(str(ruta), ANALISIS)
+    assert "error" in resultado and "nodos" not in resultado
+
+
+def test_lote_en_varios_procesos(archivos, tmp_path):
+    roto = tmp_path / "roto.json"
+    roto.write_text("[]")
+    salida = io.StringIO()
+    todos = expandir_archivos([str(tmp_path / "*.json"), archivos[0]])
+    assert sorted(todos) == sorted(archivos + [str(roto)])
+
+    analizar_lote(todos, ["suministro", "bucles"], procesos=2, salida=salida)
+    resultados = {resultado["archivo"]: resultado for resultado in map(json.loads, salida.getvalue().splitlines())}
+    assert set(resultados) == set(todos)
+    assert "error" in resultados[str(roto)]
+    for archivo in archivos:
+        esperado = json.loads(json.dumps(analizar_archivo(archivo, ["suministro", "bucles"])))
+        assert sin_tiempos(resultados[archivo]) == sin_tiempos(esperado)
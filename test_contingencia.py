@@ -0,0 +1,42 @@
+import pytest
+
+from benchmarks import obstruir_parcialmente
+from generador_redes import TOPOLOGIAS, generar_red
+from grafo import RedDeAgua
+
+
+def red_generada(topologia, num_casas=150):
+    red = RedDeAgua(None)
+    red._cargar_datos(obstruir_parcialmente(generar_red(topologia, num_casas=num_casas)))
+    return red
+
+
+def casas_servidas(red):
+    return {casa for casa, estado in red.verificar_suministro().items() if estado["mensaje"] == "Suministro completo."}
+
+
+# Casas que pierden el servicio al quitar de verdad las tuberías de una copia de la red
+def afectadas_de_referencia(red, tuberias):
+    copia = red.instantanea(congelada=False)
+    for nodo1, nodo2 in tuberias:
+        copia.eliminar_tuberia(nodo1, nodo2)
+    return casas_servidas(red) - casas_servidas(copia)
+
+
+@pytest.mark.parametrize("topologia", TOPOLOGIAS)
+def test_contingencia_igual_a_quitar_la_tuberia(topologia):
+    red = red_generada(topologia)
+    ranking = red.analisis_contingencia(muestras=100, k=3, procesos=1)
+    assert len([fila for fila in ranking if len(fila["tuberias"]) == 1]) == red.grafo.number_of_edges()
+
+    demandas = [fila["demanda_insatisfecha"] for fila in ranking]
+    assert demandas == sorted(demandas, reverse=True)
+    for fila in ranking:
+        afectadas = afectadas_de_referencia(red, fila["tuberias"])
+        assert set(fila["casas_afectadas"]) == afectadas
+        assert fila["demanda_insatisfecha"] == pytest.approx(sum(red.grafo.nodes[casa]["demanda"] for casa in afectadas))
+
+
+def test_contingencia_en_varios_procesos():
+    red = red_generada("mixta", num_casas=800)
+    assert red.analisis_contingencia(muestras=50, procesos=2) == red.analisis_contingencia(muestras=50, procesos=1)
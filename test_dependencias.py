@@ -0,0 +1,75 @@
+import random
+
+import networkx as nx
+import pytest
+
+from benchmarks import obstruir_parcialmente
+from generador_redes import TOPOLOGIAS, generar_red
+from grafo import RedDeAgua
+
+
+def red_generada(topologia, semilla=0):
+    red = RedDeAgua(None)
+    red._cargar_datos(obstruir_parcialmente(generar_red(topologia, num_casas=200, semilla=semilla), semilla=semilla))
+    # Tuberías extra al azar para tener nodos alcanzados por varios caminos y bucles
+    rng = random.Random(semilla)
+    for _ in range(40):
+        red.agregar_tuberia(*rng.sample(list(red.grafo), 2), 5)
+    return red
+
+
+# Dominadores con networkx sobre el mismo grafo partido: una raiz unida a los tanques y un nodo
+# intermedio por tubería
+def dominadores_de_referencia(grafo):
+    partido = nx.DiGraph()
+    partido.add_node(("raiz",))
+    for nodo, tipo in grafo.nodes(data="tipo"):
+        partido.add_node(nodo)
+        if tipo == "tanque":
+            partido.add_edge(("raiz",), nodo)
+    for u, v in grafo.edges:
+        partido.add_edge(u, ("tuberia", u, v))
+        partido.add_edge(("tuberia", u, v), v)
+    return nx.immediate_dominators(partido, ("raiz",))
+
+
+@pytest.mark.parametrize("topologia", TOPOLOGIAS)
+@pytest.mark.parametrize("semilla", range(3))
+def test_puntos_unicos_de_falla_igual_a_networkx(topologia, semilla):
+    red = red_generada(topologia, semilla)
+    idom = dominadores_de_referencia(red.grafo)
+    for casa, tipo in red.grafo.nodes(data="tipo"):
+        if tipo != "casa":
+            continue
+        if casa not in idom:
+            assert red.puntos_unicos_de_falla(casa) is None
+            continue
+        cadena = []
+        x = idom[casa]
+        while x != ("raiz",):
+            cadena.append(x)
+            x = idom[x]
+        cadena.reverse()
+        assert red.puntos_unicos_de_falla(casa) == {
+            "nodos": [x for x in cadena if not isinstance(x, tuple)],
+            "tuberias": [(x[1], x[2]) for x in cadena if isinstance(x, tuple)],
+        }
+
+
+# Las casas que dependen de una tubería son las que dejan de recibir agua al quitarla
+@pytest.mark.parametrize("topologia", TOPOLOGIAS)
+def test_casas_dependientes_igual_a_quitar_la_tuberia(topologia):
+    red = red_generada(topologia)
+    grafo = red.grafo
+    tanques = [nodo for nodo, tipo in grafo.nodes(data="tipo") if tipo == "tanque"]
+
+    def casas_alcanzadas(g):
+        alcanzados = set(tanques).union(*(nx.descendants(g, tanque) for tanque in tanques))
+        return {nodo for nodo in alcanzados if grafo.nodes[nodo]["tipo"] == "casa"}
+
+    antes = casas_alcanzadas(grafo)
+    for nodo1, nodo2 in random.Random(0).sample(list(grafo.edges), 100):
+        sin_tuberia = nx.restricted_view(grafo, [], [(nodo1, nodo2)])
+        assert set(red.casas_dependientes_de_tuberia(nodo1, nodo2)) == antes - casas_alcanzadas(sin_tuberia)
+    with pytest.raises(ValueError):
+        red.casas_dependientes_de_tuberia("Casa0", "NoExiste")
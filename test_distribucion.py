@@ -0,0 +1,85 @@
+import random
+
+import pytest
+
+from benchmarks import obstruir_parcialmente
+from generador_redes import TOPOLOGIAS, generar_red
+from grafo import RedDeAgua
+
+
+# Aplica a la red un cambio al azar con los mismos metodos que usa la interfaz
+def mutar(red, rng, contador):
+    grafo = red.grafo
+    tuberias = list(grafo.edges)
+    casas = [nodo for nodo, tipo in grafo.nodes(data="tipo") if tipo == "casa"]
+    tanques = [nodo for nodo, tipo in grafo.nodes(data="tipo") if tipo == "tanque"]
+    cambio = rng.choice(["editar", "eliminar", "agregar", "invertir", "nueva_casa", "quitar_casa", "nivel"])
+    if cambio == "editar" and tuberias:
+        red.editar_tuberia(*rng.choice(tuberias), rng.choice([-1, 10, 25, 50, 99]))
+    elif cambio == "eliminar" and tuberias:
+        red.eliminar_tuberia(*rng.choice(tuberias))
+    elif cambio == "agregar":
+        nodo1, nodo2 = rng.sample(list(grafo), 2)
+        red.agregar_tuberia(nodo1, nodo2, rng.choice([5, rng.uniform(0, 40)]))
+    elif cambio == "invertir" and tuberias:
+        red.cambiar_sentido_tuberia(*rng.choice(tuberias))
+    elif cambio == "nueva_casa":
+        casa = f"Nueva{contador}"
+        red.agregar_casa(casa, rng.uniform(1, 30))
+        red.agregar_tuberia(rng.choice(list(grafo)), casa, rng.uniform(0, 40))
+    elif cambio == "quitar_casa" and len(casas) > 1:
+        red.eliminar_casa(rng.choice(casas))
+    elif cambio == "nivel" and tanques:
+        red.actualizar_nivel_tanque(rng.choice(tanques))
+
+
+@pytest.mark.parametrize("topologia", TOPOLOGIAS)
+@pytest.mark.parametrize("semilla", range(3))
+def test_incremental_igual_a_recorrido_completo(topologia, semilla):
+    red = RedDeAgua(None)
+    red._cargar_datos(obstruir_parcialmente(generar_red(topologia, num_casas=300, semilla=semilla), semilla=semilla))
+    assert red.distribucion_flujo() == red.calcular_distribucion_flujo()
+
+    rng = random.Random(semilla)
+    for contador in range(150):
+        mutar(red, rng, contador)
+        assert red.distribucion_flujo() == red.calcular_distribucion_flujo()
+
+
+def test_varios_cambios_antes_de_consultar():
+    red = RedDeAgua(None)
+    red._cargar_datos(obstruir_parcialmente(generar_red("mixta", num_casas=300)))
+    red.distribucion_flujo()
+
+    rng = random.Random(7)
+    for ronda in range(20):
+        for contador in range(10):
+            mutar(red, rng, ronda * 10 + contador)
+        assert red.distribucion_flujo() == red.calcular_distribucion_flujo()
+
+
+# Un tanque que alimenta dos cadenas de miles de casas: las claves BFS de los nodos del final de las
+# cadenas tienen miles de ancestros
+def test_cadenas_profundas():
+    largo = 3000
+    datos = {"casas": {}, "tanques": {"T": {"capacidad": 10 * largo, "conexiones": []}}, "tuberias": []}
+    for cadena in "AB":
+        anterior = "T"
+        for i in range(largo):
+            casa = f"{cadena}{i}"
+            datos["casas"][casa] = {"demanda": 1}
+            datos["tuberias"].append({"nodo1": anterior, "nodo2": casa, "capacidad_flujo": 2 * largo})
+            anterior = casa
+    datos["tuberias"].append({"nodo1": "A10", "nodo2": f"B{largo - 1}", "capacidad_flujo": 5})
+    red = RedDeAgua(None)
+    red._cargar_datos(datos)
+    red.distribucion_flujo()
+
+    red.editar_tuberia("T", "A0", 10)
+    assert red.distribucion_flujo() == red.calcular_distribucion_flujo()
+    red.actualizar_nivel_tanque("T")
+    assert red.distribucion_flujo() == red.calcular_distribucion_flujo()
+    red.agregar_tuberia(f"A{largo - 1}", f"B{largo - 2}", 3)
+    assert red.distribucion_flujo() == red.calcular_distribucion_flujo()
+    red.eliminar_tuberia("B5", "B6")
+    assert red.distribucion_flujo() == red.calcular_distribucion_flujo()
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from espacial import IndiceEspacial, k_centro
+
+
+# Nubes de puntos de distintas formas, incluidas las degeneradas (sobre una linea o repetidos)
+def puntos_de_prueba(forma, n, semilla=0):
+    rng = np.random.default_rng(semilla)
+    if forma == "uniforme":
+        return rng.uniform(0, 100, (n, 2))
+    if forma == "grupos":
+        centros = rng.uniform(0, 1000, (5, 2))
+        return centros[rng.integers(0, 5, n)] + rng.normal(0, 3, (n, 2))
+    if forma == "horizontal":
+        return np.c_[rng.uniform(0, 1, n), np.zeros(n)]
+    if forma == "vertical":
+        return np.c_[np.full(n, 7.0), rng.uniform(-5, 5, n)]
+    if forma == "casi_horizontal":
+        return np.c_[rng.uniform(0, 1, n), rng.uniform(0, 1e-9, n)]
+    if forma == "repetidos":
+        return np.tile([[3.0, 4.0]], (n, 1))
+
+
+FORMAS = ["uniforme", "grupos", "horizontal", "vertical", "casi_horizontal", "repetidos"]
+
+
+def consultas_de_prueba(puntos, semilla=0):
+    rng = np.random.default_rng(semilla + 1)
+    minimo, maximo = puntos.min(axis=0), puntos.max(axis=0)
+    extension = np.maximum(maximo - minimo, 1)
+    cerca = rng.uniform(minimo - 0.2 * extension, maximo + 0.2 * extension, (300, 2))
+    lejos = rng.uniform(minimo - 50 * extension, maximo + 50 * extension, (50, 2))
+    return np.concatenate([cerca, lejos, puntos[:20]])
+
+
+@pytest.mark.parametrize("n", [10, 500, 5000])
+@pytest.mark.parametrize("forma", FORMAS)
+def test_mas_cercanos_igual_a_comparar_con_todos(forma, n):
+    puntos = puntos_de_prueba(forma, n)
+    consultas = consultas_de_prueba(puntos)
+    indice = IndiceEspacial(puntos)
+    assert indice.columnas * indice.filas <= max(n, 1) + 2 * max(indice.columnas, indice.filas)
+
+    mejor, distancia = indice.mas_cercanos(consultas)
+    esperada = np.sqrt(((consultas[:, None, :] - puntos[None, :, :]) ** 2).sum(axis=2)).min(axis=1)
+    np.testing.assert_allclose(distancia, esperada, rtol=1e-12, atol=1e-12)
+    np.testing.assert_allclose(np.hypot(*(puntos[mejor] - consultas).T), esperada, rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize("forma", FORMAS)
+def test_en_radio_igual_a_comparar_con_todos(forma):
+    puntos = puntos_de_prueba(forma, 2000)
+    indice = IndiceEspacial(puntos)
+    extension = max(np.ptp(puntos, axis=0).max(), 1)
+    for x, y in consultas_de_prueba(puntos)[::15]:
+        for radio in (0, 0.01 * extension, 0.3 * extension):
+            esperados = np.flatnonzero(np.hypot(puntos[:, 0] - x, puntos[:, 1] - y) <= radio)
+            assert sorted(indice.en_radio(x, y, radio)) == esperados.tolist()
+
+
+def test_sin_puntos():
+    mejor, distancia = IndiceEspacial(np.zeros((0, 2))).mas_cercanos([[1, 2]])
+    assert mejor.tolist() == [-1] and np.isinf(distancia).all()
+
+
+def test_k_centro_cubre_el_radio():
+    puntos = puntos_de_prueba("grupos", 3000)
+    centros, asignado, distancia = k_centro(IndiceEspacial(puntos), np.ones(len(puntos)), radio=20)
+    assert distancia.max() <= 20
+    np.testing.assert_allclose(distancia, np.hypot(*(puntos - puntos[centros][asignado]).T))
+    # Cada punto queda asignado a su centro mas cercano
+    cercanos, _ = IndiceEspacial(puntos[centros]).mas_cercanos(puntos)
+    np.testing.assert_allclose(distancia, np.hypot(*(puntos - puntos[centros][cercanos]).T))
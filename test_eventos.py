@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from PyQt5.QtWidgets import QApplication, QTextEdit
+
+from eventos import AVISO, DEPURACION, ERROR, INFO, TIPOS, Evento, Eventos
+from grafo import RedDeAgua
+from interfaz import RegistroInterfaz
+
+
+@pytest.fixture(scope="module")
+def aplicacion():
+    return QApplication.instance() or QApplication([])
+
+
+def test_niveles_de_cada_suscriptor():
+    eventos = Eventos()
+    assert not eventos
+    todos, avisos = [], []
+    eventos.suscribir(todos.append, DEPURACION)
+    eventos.suscribir(avisos.append, AVISO)
+    assert eventos
+
+    eventos.emitir("nivel_actualizado", tanque="T", nivel=3)
+    eventos.emitir("casa_eliminada", casa="C")
+    eventos.emitir("casa_existente", casa="C")
+    assert [evento.tipo for evento in todos] == ["nivel_actualizado", "casa_eliminada", "casa_existente"]
+    assert [evento.tipo for evento in avisos] == ["casa_existente"]
+    assert avisos[0] is todos[2]
+
+    eventos.desuscribir(todos.append)
+    eventos.emitir("casa_eliminada", casa="C")
+    assert len(todos) == 3 and len(avisos) == 1
+    eventos.desuscribir(avisos.append)
+    assert not eventos
+
+
+# Por debajo del nivel de todos los suscriptores el evento ni se arma
+def test_eventos_bajo_el_nivel_no_se_arman(monkeypatch):
+    armados = []
+    monkeypatch.setattr(Evento, "__init__", lambda self, *args: armados.append(args) or None)
+    eventos = Eventos()
+    eventos.suscribir(lambda evento: None, INFO)
+    eventos.emitir("flujo_casa", casa="C", demanda=1, flujo=2)
+    assert armados == []
+    eventos.emitir("casa_eliminada", casa="C")
+    assert len(armados) == 1
+
+
+def test_mensajes():
+    evento = Evento("tuberia_actualizada", INFO, {"nodo1": "A", "nodo2": "B", "capacidad": 2.5, "obstruccion": 50})
+    assert str(evento) == "Tubería de A a B actualizada con nueva capacidad de 2.50 L/s y obstrucción 50%."
+    assert repr(evento).startswith("Evento('tuberia_actualizada', INFO,")
+    assert all(nivel in (DEPURACION, INFO, AVISO, ERROR) for nivel, _ in TIPOS.values())
+
+
+def test_red_emite_eventos():
+    red = RedDeAgua(None)
+    recibidos = []
+    red.eventos.suscribir(recibidos.append, INFO)
+    red.agregar_casa("C", 5)
+    red.agregar_casa("C", 5)
+    red.agregar_tanque_con_capacidad("T", 100, [])
+    red.agregar_tuberia("T", "C", 10)
+    red.eliminar_tuberia("C", "T")
+    mensajes = [(evento.tipo, str(evento)) for evento in recibidos]
+    assert ("casa_existente", "La casa C ya existe en la red.") in mensajes
+    assert ("tuberia_agregada", "Tubería agregada de T a C con capacidad de flujo 10 L/s.") in mensajes
+    assert ("tuberia_inexistente", "No existe una tubería de C a T.") in mensajes
+    assert all(evento.nivel >= INFO for evento in recibidos)
+
+
+def test_registro_de_la_interfaz(aplicacion):
+    widget = QTextEdit()
+    registro = RegistroInterfaz(widget, capacidad=3, intervalo_ms=10_000)
+    for i in range(5):
+        registro.agregar(Evento("casa_eliminada", INFO, {"casa": f"C{i}"}))
+    registro.agregar("texto suelto")
+    registro.vaciar()
+    assert widget.toPlainText().splitlines() == [
+        "... 3 mensajes omitidos ...", "La casa C3 ha sido eliminada.", "La casa C4 ha sido eliminada.", "texto suelto",
+    ]
+    registro.vaciar()
+    registro.agregar("otro")
+    registro.vaciar()
+    assert widget.toPlainText().splitlines()[-2:] == ["texto suelto", "otro"]
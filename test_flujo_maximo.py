@@ -0,0 +1,105 @@
+import random
+
+import networkx as nx
+import pytest
+
+import flujo_maximo
+from benchmarks import obstruir_parcialmente, red_sintetica
+from grafo import RedDeAgua
+
+
+# Grafo dirigido al azar con capacidades fraccionarias (y algunas en cero), sin lazos
+def grafo_aleatorio(semilla):
+    rng = random.Random(semilla)
+    n = rng.randint(2, 30)
+    grafo = nx.DiGraph()
+    grafo.add_nodes_from(range(n))
+    for _ in range(rng.randint(0, 4 * n)):
+        u, v = rng.sample(range(n), 2)
+        grafo.add_edge(u, v, capacidad_flujo=rng.choice([0, 0.1, 0.2, 0.7, rng.uniform(0, 60), rng.randint(1, 60) * 0.731]))
+    return grafo
+
+
+@pytest.mark.parametrize("metodo", flujo_maximo.METODOS)
+@pytest.mark.parametrize("semilla", range(200))
+def test_igual_a_networkx_con_capacidades_fraccionarias(metodo, semilla):
+    grafo = grafo_aleatorio(semilla)
+    aristas = list(grafo.edges(data="capacidad_flujo"))
+    origen, destino, capacidad = zip(*aristas) if aristas else ((), (), ())
+    red = flujo_maximo.RedResidual(grafo.number_of_nodes(), origen, destino, capacidad)
+    fuente, sumidero = random.Random(semilla).sample(list(grafo), 2)
+
+    esperado = nx.maximum_flow_value(grafo, fuente, sumidero, capacity="capacidad_flujo")
+    assert flujo_maximo.resolver(red, fuente, sumidero, metodo) == pytest.approx(esperado, rel=1e-9, abs=1e-9)
+
+
+@pytest.mark.parametrize("metodo", flujo_maximo.METODOS)
+def test_red_obstruida(metodo):
+    red = RedDeAgua(None)
+    red._cargar_datos(obstruir_parcialmente(red_sintetica(2000)))
+    fuente = "Tanque0"
+    for sumidero in random.Random(0).sample(sorted(nx.descendants(red.grafo, fuente)), 20):
+        esperado = nx.maximum_flow_value(red.grafo, fuente, sumidero, capacity="capacidad_flujo")
+        assert red.flujo_maximo(fuente, sumidero, metodo) == pytest.approx(esperado, rel=1e-9, abs=1e-9)
+
+
+def test_metodo_desconocido():
+    red = flujo_maximo.RedResidual(2, [0], [1], [1.0])
+    with pytest.raises(ValueError):
+        flujo_maximo.resolver(red, 0, 1, "edmonds_karp")
+
+
+# Flujo maximo de referencia con networkx: una fuente que llena los tanques hasta su nivel y un sumidero
+# al que cada casa entrega a lo sumo su demanda
+def factibilidad_de_referencia(grafo):
+    referencia = nx.DiGraph()
+    referencia.add_edges_from((u, v, {"capacidad": c}) for u, v, c in grafo.edges(data="capacidad_flujo"))
+    for nodo, datos in grafo.nodes(data=True):
+        if datos["tipo"] == "tanque":
+            referencia.add_edge(("fuente",), nodo, capacidad=max(datos["nivel"], 0))
+        else:
+            referencia.add_edge(nodo, ("sumidero",), capacidad=datos["demanda"])
+    return nx.maximum_flow_value(referencia, ("fuente",), ("sumidero",), capacity="capacidad")
+
+
+@pytest.mark.parametrize("metodo", flujo_maximo.METODOS)
+@pytest.mark.parametrize("semilla", range(10))
+def test_factibilidad_igual_a_networkx(metodo, semilla):
+    red = RedDeAgua(None)
+    red._cargar_datos(obstruir_parcialmente(red_sintetica(300 + 50 * semilla, semilla=semilla), semilla=semilla))
+    grafo = red.grafo
+    resultado = red.factibilidad_suministro(metodo)
+
+    assert resultado["flujo_total"] == pytest.approx(factibilidad_de_referencia(grafo), rel=1e-9, abs=1e-9)
+    casas = {nodo: demanda for nodo, demanda in grafo.nodes(data="demanda") if grafo.nodes[nodo]["tipo"] == "casa"}
+    assert resultado["demanda_total"] == pytest.approx(sum(casas.values()))
+    faltante = resultado["demanda_insatisfecha"]
+    assert all(0 < faltante[casa] <= casas[casa] + 1e-9 for casa in faltante)
+    assert resultado["demanda_total"] - sum(faltante.values()) == pytest.approx(resultado["flujo_total"], rel=1e-9, abs=1e-9)
+
+    # El corte minimo tiene la misma capacidad que el flujo
+    corte = resultado["corte"]
+    capacidad_corte = (
+        sum(grafo[u][v]["capacidad_flujo"] for u, v in corte["tuberias"])
+        + sum(max(grafo.nodes[tanque]["nivel"], 0) for tanque in corte["tanques"])
+        + sum(casas[casa] for casa in corte["casas"])
+    )
+    assert capacidad_corte == pytest.approx(resultado["flujo_total"], rel=1e-9, abs=1e-9)
+
+
+# T1 queda con nivel 10 despues de llenar su tubería de 50, menos que la demanda de C2
+def test_factibilidad_limitada_por_tanque_y_casas():
+    red = RedDeAgua(None)
+    red._cargar_datos({
+        "casas": {"C1": {"demanda": 4}, "C2": {"demanda": 30}},
+        "tanques": {"T1": {"capacidad": 60, "conexiones": []}, "T2": {"capacidad": 100, "conexiones": []}},
+        "tuberias": [
+            {"nodo1": "T1", "nodo2": "C2", "capacidad_flujo": 50},
+            {"nodo1": "T2", "nodo2": "C1", "capacidad_flujo": 50},
+        ],
+    })
+    assert red.grafo.nodes["T1"]["nivel"] == 10
+    resultado = red.factibilidad_suministro()
+    assert resultado["flujo_total"] == 14
+    assert resultado["demanda_insatisfecha"] == {"C2": 20}
+    assert resultado["corte"] == {"tuberias": [], "tanques": ["T1"], "casas": ["C1"]}
@@ -0,0 +1,317 @@
+import json
+import math
+import random
+import time
+
+import networkx as nx
+import pytest
+
+from benchmarks import cargar_secuencial, obstruir_parcialmente
+from eventos import DEPURACION
+from generador_redes import TOPOLOGIAS, generar_red
+from grafo import RedDeAgua
+
+
+# Red pequeña al azar con bucles, tuberías repetidas y capacidades fraccionarias, donde el nivel de los
+# tanques depende del orden en que se agregan las tuberías
+def datos_aleatorios(semilla):
+    rng = random.Random(semilla)
+    casas = {f"C{i}": {"demanda": rng.choice([1, 5, 17, rng.uniform(0.5, 20)])} for i in range(rng.randint(1, 12))}
+    nombres = list(casas) + [f"T{i}" for i in range(rng.randint(1, 4))]
+    tanques = {}
+    for tanque in nombres[len(casas):]:
+        capacidad = rng.choice([50, 100, rng.uniform(10, 200)])
+        tanques[tanque] = {"capacidad": capacidad, "nivel": capacidad, "conexiones": rng.sample(nombres, rng.randint(0, min(3, len(nombres))))}
+    tuberias = []
+    for _ in range(rng.randint(0, 20)):
+        nodo1, nodo2 = rng.sample(nombres, 2)
+        tuberias.append({"nodo1": nodo1, "nodo2": nodo2, "capacidad_flujo": rng.choice([3, 33, rng.uniform(0, 40)])})
+    return {"casas": casas, "tanques": tanques, "tuberias": tuberias}
+
+
+def misma_red(red1, red2):
+    assert dict(red1.grafo.nodes(data=True)) == dict(red2.grafo.nodes(data=True))
+    assert list(red1.grafo.edges(data=True)) == list(red2.grafo.edges(data=True))
+
+
+@pytest.mark.parametrize("semilla", range(200))
+def test_carga_en_bloque_igual_a_secuencial(semilla):
+    datos = datos_aleatorios(semilla)
+    secuencial, en_bloque = RedDeAgua(None), RedDeAgua(None)
+    cargar_secuencial(secuencial, datos)
+    en_bloque._cargar_datos(datos)
+    misma_red(secuencial, en_bloque)
+
+
+@pytest.mark.parametrize("topologia", TOPOLOGIAS)
+def test_carga_en_bloque_red_generada(topologia):
+    datos = obstruir_parcialmente(generar_red(topologia, num_casas=1000))
+    secuencial, en_bloque = RedDeAgua(None), RedDeAgua(None)
+    cargar_secuencial(secuencial, datos)
+    en_bloque._cargar_datos(datos)
+    misma_red(secuencial, en_bloque)
+    assert en_bloque.distribucion_flujo() == secuencial.calcular_distribucion_flujo()
+
+
+# Red de ejemplo guardada en un json, cargada en una RedDeAgua asociada a ese archivo
+def red_en_archivo(tmp_path):
+    ruta = tmp_path / "red.json"
+    ruta.write_text(json.dumps(generar_red("arbol", num_casas=50)))
+    red = RedDeAgua(str(ruta))
+    red.cargar_desde_json(str(ruta))
+    return red, ruta
+
+
+def escrituras(red):
+    guardados = []
+    red.eventos.suscribir(lambda evento: guardados.append(evento) if evento.tipo == "datos_guardados" else None, DEPURACION)
+    return guardados
+
+
+def test_lote_escribe_una_vez(tmp_path):
+    red, ruta = red_en_archivo(tmp_path)
+    guardados = escrituras(red)
+    with red.lote():
+        for i in range(10):
+            red.agregar_casa(f"Nueva{i}", 5)
+            red.agregar_tuberia("Tanque0", f"Nueva{i}", 7)
+        assert guardados == []
+    assert len(guardados) == 1
+    assert "Nueva9" in json.loads(ruta.read_text())["casas"]
+
+
+def test_guardado_diferido_agrupa_los_cambios(tmp_path):
+    red, ruta = red_en_archivo(tmp_path)
+    guardados = escrituras(red)
+    red.activar_guardado_diferido(retardo=0.05)
+    for i in range(10):
+        red.agregar_casa(f"Nueva{i}", 5)
+    limite = time.monotonic() + 5
+    while not guardados and time.monotonic() < limite:
+        time.sleep(0.01)
+    red.desactivar_guardado_diferido()
+    assert len(guardados) == 1
+    assert "Nueva9" in json.loads(ruta.read_text())["casas"]
+
+
+def test_recargar_con_guardado_diferido_pendiente(tmp_path):
+    red, ruta = red_en_archivo(tmp_path)
+    red.activar_guardado_diferido(retardo=60)
+    red.agregar_casa("NUEVA", 5)
+    red.recargar_json()
+    assert "NUEVA" in red.grafo
+    assert "NUEVA" in json.loads(ruta.read_text())["casas"]
+    assert not red.cambios_sin_guardar
+    red.desactivar_guardado_diferido()
+
+
+# El hilo ya copio los datos (y limpio la marca de cambios) pero todavia no escribio el archivo
+def test_recargar_con_escritura_en_curso(tmp_path):
+    red, ruta = red_en_archivo(tmp_path)
+    red.activar_guardado_diferido(retardo=60)
+    red.agregar_casa("NUEVA", 5)
+    with red._cerrojo_cambios:
+        red._datos_a_escribir()
+    red.recargar_json()
+    assert "NUEVA" in red.grafo
+    red.desactivar_guardado_diferido()
+
+
+# Red chica al azar con capacidades repetidas (muchas rutas con el mismo cuello de botella),
+# obstrucciones y casas sin ruta
+def red_rutas(semilla):
+    rng = random.Random(semilla)
+    red = RedDeAgua(None)
+    datos = datos_aleatorios(semilla)
+    for tuberia in datos["tuberias"]:
+        tuberia["capacidad_flujo"] = rng.choice([0, 5, 10, 20])
+    for casa in datos["casas"].values():
+        casa["demanda"] = rng.choice([0, 1, 5, 15])
+    red._cargar_datos(datos)
+    for nodo1, nodo2 in rng.sample(list(red.grafo.edges), len(red.grafo.edges) // 4):
+        red.editar_tuberia(nodo1, nodo2, rng.choice([-1, 50]))
+    return red
+
+
+# Capacidad con la que cuenta una tubería en la busqueda de rutas (la obstruccion se vuelve a aplicar)
+def capacidad_ajustada(datos):
+    if datos.get("obstruccion", 0) == -1:
+        return 0
+    return datos["capacidad_flujo"] * (1 - datos.get("obstruccion", 0) / 100)
+
+
+# Mayor cuello de botella desde algun tanque hasta cada nodo, relajando hasta que nada cambie
+def anchos_de_referencia(red):
+    ancho = {nodo: float("inf") if tipo == "tanque" else 0 for nodo, tipo in red.grafo.nodes(data="tipo")}
+    cambio = True
+    while cambio:
+        cambio = False
+        for u, v, datos in red.grafo.edges(data=True):
+            capacidad = capacidad_ajustada(datos)
+            if min(ancho[u], capacidad) > ancho[v]:
+                ancho[v] = min(ancho[u], capacidad)
+                cambio = True
+    return ancho
+
+
+@pytest.mark.parametrize("semilla", range(200))
+def test_rutas_por_lotes_igual_a_por_casa(semilla):
+    red = red_rutas(semilla)
+    ancho = anchos_de_referencia(red)
+    rutas = red.rutas_alternativas_optimas()
+    for casa, (ruta, flujo) in rutas.items():
+        assert red.buscar_ruta_alternativa_optima(casa) == (ruta, flujo)
+        demanda = red.grafo.nodes[casa]["demanda"]
+        if ancho[casa] == 0 or ancho[casa] < demanda:
+            assert (ruta, flujo) == (None, 0)
+            continue
+        assert flujo == ancho[casa]
+        assert red.grafo.nodes[ruta[0]]["tipo"] == "tanque" and ruta[-1] == casa
+        capacidades = [capacidad_ajustada(red.grafo[u][v]) for u, v in zip(ruta, ruta[1:])]
+        assert min(capacidades) == flujo
+
+
+def test_ruta_de_casa_invalida():
+    red = red_rutas(0)
+    with pytest.raises(ValueError):
+        red.buscar_ruta_alternativa_optima("NoExiste")
+
+
+@pytest.mark.parametrize("semilla", range(100))
+def test_suministro_vectorizado_igual_al_original(semilla):
+    red = RedDeAgua(None)
+    red._cargar_datos(datos_aleatorios(semilla))
+    original = red.verificar_suministro()
+    assert red.verificar_suministro_vectorizado() == original
+    assert red.verificar_suministro_vectorizado(solo_fallas=True) == {
+        casa: estado for casa, estado in original.items() if estado["mensaje"] != "Suministro completo."
+    }
+
+
+@pytest.mark.parametrize("topologia", TOPOLOGIAS)
+def test_suministro_vectorizado_red_generada(topologia):
+    red = RedDeAgua(None)
+    red._cargar_datos(obstruir_parcialmente(generar_red(topologia, num_casas=1000)))
+    assert red.verificar_suministro_vectorizado() == red.verificar_suministro()
+    red.editar_tuberia(*next(iter(red.grafo.edges)), -1)
+    red.eliminar_tuberia(*list(red.grafo.edges)[5])
+    assert red.verificar_suministro_vectorizado() == red.verificar_suministro()
+
+
+# Ciclo rotado para empezar por su nodo que aparece primero en la red
+def ciclo_canonico(ciclo, orden):
+    inicio = min(range(len(ciclo)), key=lambda i: orden[ciclo[i]])
+    return tuple(ciclo[inicio:] + ciclo[:inicio])
+
+
+@pytest.mark.parametrize("semilla", range(200))
+def test_bucles_igual_a_networkx(semilla):
+    red = RedDeAgua(None)
+    red._cargar_datos(datos_aleatorios(semilla))
+    grafo = red.grafo
+    orden = {nodo: i for i, nodo in enumerate(grafo)}
+
+    regiones = red.regiones_con_bucles()
+    esperadas = [
+        componente for componente in nx.strongly_connected_components(grafo)
+        if len(componente) > 1 or any(grafo.has_edge(nodo, nodo) for nodo in componente)
+    ]
+    assert sorted(map(set, regiones), key=sorted) == sorted(esperadas, key=sorted)
+    assert len(red.detectar_bucles()) == len(regiones)
+
+    ciclos = [ciclo_canonico(ciclo, orden) for ciclo in red.enumerar_bucles(max_ciclos=None, max_segundos=None)]
+    assert all(ciclo[0] == ciclo_canonico(list(ciclo), orden)[0] for ciclo in ciclos)
+    assert len(ciclos) == len(set(ciclos))
+    assert set(ciclos) == {ciclo_canonico(ciclo, orden) for ciclo in nx.simple_cycles(grafo)}
+
+    if len(ciclos) > 2:
+        assert len(list(red.enumerar_bucles(max_ciclos=2))) == 2
+
+
+def casas_con_problemas(red):
+    return {casa: estado for casa, estado in red.verificar_suministro().items() if estado["flujo_recibido"] < estado["demanda"]}
+
+
+# Impacto de la obstruccion contra revisar todas las casas antes y despues de editar la tubería
+@pytest.mark.parametrize("semilla", range(100))
+def test_impacto_obstruccion_igual_a_revisar_todas(semilla):
+    rng = random.Random(semilla)
+    if semilla % 2:
+        red = red_rutas(semilla)
+    else:
+        red = RedDeAgua(None)
+        red._cargar_datos(obstruir_parcialmente(generar_red(TOPOLOGIAS[semilla % 3], num_casas=200, semilla=semilla)))
+    if not red.grafo.number_of_edges():
+        return
+    for _ in range(3):
+        nodo1, nodo2 = rng.choice(list(red.grafo.edges))
+        antes = red.verificar_suministro()
+        red.editar_tuberia(nodo1, nodo2, rng.choice([-1, 50, 90]))
+        impacto = red.impacto_obstruccion(nodo1, nodo2)
+        despues = red.verificar_suministro()
+
+        afectadas = set(impacto["afectadas"])
+        assert {casa for casa in despues if despues[casa] != antes[casa]} <= afectadas
+        assert impacto["sin_suministro"] == {casa: estado for casa, estado in casas_con_problemas(red).items() if casa in afectadas}
+        rutas = red.rutas_alternativas_optimas()
+        assert impacto["rutas"] == {casa: rutas[casa] for casa in impacto["sin_suministro"]}
+
+
+def test_impacto_de_tuberia_inexistente():
+    red = red_rutas(0)
+    with pytest.raises(ValueError):
+        red.impacto_obstruccion("NoExiste", "C0")
+
+
+# Muchos tanques con capacidades enteras repetidas (pares con el mismo beneficio), tuberías entre tanques
+# y hacia casas compartidas, y algunos tanques sin coordenadas
+def red_de_tanques(semilla):
+    rng = random.Random(semilla)
+    casas = {f"C{i}": {"demanda": 5} for i in range(30)}
+    tanques = {}
+    for i in range(rng.randint(2, 60)):
+        tanques[f"T{i}"] = {"capacidad": rng.choice([100, 200, 300]), "conexiones": []}
+        if rng.random() < 0.8:
+            tanques[f"T{i}"].update(x=rng.uniform(0, 100), y=rng.uniform(0, 100))
+    nombres = list(casas) + list(tanques)
+    tuberias = [
+        {"nodo1": tanque, "nodo2": rng.choice(nombres), "capacidad_flujo": rng.choice([10, 20, 50, 80])}
+        for tanque in tanques for _ in range(rng.randint(0, 3))
+    ]
+    red = RedDeAgua(None)
+    red._cargar_datos({"casas": casas, "tanques": tanques, "tuberias": [t for t in tuberias if t["nodo1"] != t["nodo2"]]})
+    return red
+
+
+# Todos los pares validos, revisando cada par con es_conexion_valida
+def pares_de_referencia(red, radio=None, adyacentes=False):
+    grafo = red.grafo
+    tanques = [nodo for nodo, tipo in grafo.nodes(data="tipo") if tipo == "tanque"]
+    pares = {}
+    for origen in tanques:
+        for destino in tanques:
+            if origen == destino or not red.es_conexion_valida(origen, destino):
+                continue
+            a, b = grafo.nodes[origen], grafo.nodes[destino]
+            if radio is not None and not ("x" in a and "x" in b and math.hypot(a["x"] - b["x"], a["y"] - b["y"]) <= radio):
+                continue
+            if adyacentes and not (
+                grafo.has_edge(origen, destino) or grafo.has_edge(destino, origen) or set(grafo.succ[origen]) & set(grafo.succ[destino])
+            ):
+                continue
+            pares[origen, destino] = (b["capacidad"] - b["nivel"]) - (a["capacidad"] - a["nivel"])
+    return pares
+
+
+@pytest.mark.parametrize("semilla", range(100))
+def test_conexiones_entre_tanques_igual_a_todos_los_pares(semilla):
+    red = red_de_tanques(semilla)
+    for radio, adyacentes in [(None, False), (30, False), (None, True), (50, True)]:
+        pares = pares_de_referencia(red, radio, adyacentes)
+        todas = red.conexiones_entre_tanques(k=None, radio=radio, adyacentes=adyacentes)
+        assert {(origen, destino): beneficio for origen, destino, beneficio in todas} == pares
+        assert len(todas) == len(pares)
+        for k in (1, 5, 20):
+            mejores = red.conexiones_entre_tanques(k=k, radio=radio, adyacentes=adyacentes)
+            assert all(pares[origen, destino] == beneficio for origen, destino, beneficio in mejores)
+            assert [beneficio for _, _, beneficio in mejores] == sorted(pares.values(), reverse=True)[:k]
@@ -0,0 +1,72 @@
+import json
+import os
+
+import pytest
+
+from generador_redes import generar_red
+from grafo import RedDeAgua
+from metricas import Metricas, Perfil
+
+
+def test_percentiles_sobre_la_ventana():
+    metricas = Metricas(muestras_por_operacion=10)
+    for i in range(1, 101):
+        metricas.registrar_tiempo("op", i / 1000)
+    datos = metricas.instantanea()["operaciones"]["op"]
+    assert datos["llamadas"] == 100
+    assert datos["total_s"] == pytest.approx(5.05)
+    assert datos["max_s"] == 0.1
+    # Solo quedan las ultimas 10 duraciones (0.091 .. 0.100)
+    assert (datos["p50_s"], datos["p90_s"], datos["p99_s"]) == (0.095, 0.099, 0.1)
+
+
+def test_medir_con_excepcion():
+    metricas = Metricas()
+    with pytest.raises(RuntimeError):
+        with metricas.medir("falla"):
+            raise RuntimeError
+    assert metricas.instantanea()["operaciones"]["falla"]["llamadas"] == 1
+
+
+def test_texto_prometheus():
+    metricas = Metricas()
+    metricas.registrar_tiempo('op "rara"', 0.5)
+    metricas.contar("bytes.escritos", 10)
+    texto = metricas.texto_prometheus()
+    assert 'red_agua_operacion_segundos{operacion="op \\"rara\\"",quantile="0.5"} 0.5' in texto
+    assert 'red_agua_operacion_segundos_count{operacion="op \\"rara\\""} 1' in texto
+    assert "red_agua_bytes_escritos_total 10" in texto.splitlines()
+
+
+def test_red_instrumentada(tmp_path):
+    ruta = tmp_path / "red.json"
+    ruta.write_text(json.dumps(generar_red("malla", num_casas=200)))
+    red, otra = RedDeAgua(str(ruta)), RedDeAgua(None)
+    red.cargar_desde_json(str(ruta))
+    metricas = red.activar_metricas()
+    for _ in range(3):
+        red.verificar_suministro()
+    red.escribir_json()
+
+    instantanea = metricas.instantanea()
+    assert instantanea["operaciones"]["verificar_suministro"]["llamadas"] == 3
+    # Las llamadas internas tambien se miden; el indice se arma una sola vez
+    assert instantanea["operaciones"]["indice_alcance"]["llamadas"] == 3
+    assert instantanea["contadores"]["recorridos_alcance"] == 1
+    assert instantanea["contadores"]["bytes_json_escritos"] == os.path.getsize(ruta)
+    assert "verificar_suministro" not in vars(otra)
+
+    red.desactivar_metricas()
+    red.verificar_suministro()
+    assert metricas.instantanea()["operaciones"]["verificar_suministro"]["llamadas"] == 3
+    assert "verificar_suministro" not in vars(red)
+
+
+def test_perfil(tmp_path):
+    archivo = tmp_path / "perfil.prof"
+    red = RedDeAgua(None)
+    red._cargar_datos(generar_red("arbol", num_casas=200))
+    with Perfil(str(archivo)) as perfil:
+        red.calcular_distribucion_flujo()
+    assert "calcular_distribucion_flujo" in perfil.resumen
+    assert archivo.exists()
@@ -0,0 +1,101 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from benchmarks import obstruir_parcialmente
+from generador_redes import generar_red
+from grafo import RedDeAgua
+from red_compacta import RedCompacta
+
+ARREGLOS = ["tipo", "demanda", "nivel", "capacidad", "origen", "destino", "capacidad_flujo", "obstruccion",
+            "inicio_salida", "aristas_entrada", "inicio_entrada"]
+
+
+def red_generada(topologia="mixta", **opciones):
+    red = RedDeAgua(None)
+    red._cargar_datos(obstruir_parcialmente(generar_red(topologia, num_casas=500, **opciones)))
+    return red
+
+
+def misma_red(red1, red2):
+    assert dict(red1.grafo.nodes(data=True)) == dict(red2.grafo.nodes(data=True))
+    assert list(red1.grafo.edges(data=True)) == list(red2.grafo.edges(data=True))
+
+
+def test_binario_conserva_la_red(tmp_path):
+    red = red_generada()
+    red.editar_tuberia(*next(iter(red.grafo.edges)), 40)
+    red.actualizar_nivel_tanque("Tanque0")
+
+    ruta = str(tmp_path / "red.bin")
+    red.guardar_binario(ruta)
+    copia = RedDeAgua(None)
+    copia.cargar_binario(ruta)
+    misma_red(red, copia)
+
+
+def test_abrir_binario_igual_a_desde_grafo(tmp_path):
+    compacta = red_generada("malla").red_compacta()
+    ruta = str(tmp_path / "red.bin")
+    compacta.guardar_binario(ruta)
+    abierta = RedCompacta.abrir_binario(ruta)
+
+    assert list(abierta.nombres) == list(compacta.nombres)
+    assert abierta.nombres[3] == compacta.nombres[3]
+    for nombre in ARREGLOS:
+        np.testing.assert_array_equal(getattr(abierta, nombre), getattr(compacta, nombre))
+    with pytest.raises(ValueError):
+        abierta.nivel[0] = 1 #modo "r": el archivo no se puede modificar a traves de los arreglos
+
+
+def test_archivo_que_no_es_una_red(tmp_path):
+    ruta = tmp_path / "otro.bin"
+    ruta.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        RedCompacta.abrir_binario(str(ruta))
+
+
+@pytest.mark.parametrize("topologia", ["arbol", "malla", "mixta"])
+def test_copia_compacta_igual_al_grafo(topologia):
+    red = red_generada(topologia)
+    grafo = red.grafo
+    compacta = red.red_compacta()
+    nombres = compacta.nombres
+    assert nombres == list(grafo)
+
+    for u, nombre in enumerate(nombres):
+        salientes = compacta.aristas_salientes([u])
+        assert [(nombres[v], c) for v, c in zip(compacta.destino[salientes], compacta.capacidad_flujo[salientes])] == [
+            (v, datos["capacidad_flujo"]) for v, datos in grafo.adj[nombre].items()
+        ]
+        entrantes = compacta.aristas_entrantes([u])
+        assert sorted(nombres[v] for v in compacta.origen[entrantes]) == sorted(grafo.pred[nombre])
+        assert all(compacta.id_arista(nombre, v) == i for i, v in zip(salientes, grafo.adj[nombre]))
+
+    tanques = [nodo for nodo, tipo in grafo.nodes(data="tipo") if tipo == "tanque"]
+    alcanzados = set(tanques).union(*(nx.descendants(grafo, tanque) for tanque in tanques))
+    assert {nombres[i] for i in np.flatnonzero(compacta.alcanzables())} == alcanzados
+    flujo_entrante = compacta.flujo_entrante()
+    for i, nombre in enumerate(nombres):
+        assert flujo_entrante[i] == pytest.approx(sum(datos["capacidad_flujo"] for _, _, datos in grafo.in_edges(nombre, data=True)))
+
+
+# Los cambios de atributos se copian sobre los arreglos; los de topologia arman una copia nueva
+def test_copia_compacta_al_dia():
+    red = red_generada()
+    compacta = red.red_compacta()
+    nodo1, nodo2 = next(iter(red.grafo.edges))
+    red.editar_tuberia(nodo1, nodo2, 50)
+    red.actualizar_nivel_tanque("Tanque0")
+    assert red.red_compacta() is compacta
+    arista = compacta.id_arista(nodo1, nodo2)
+    assert compacta.capacidad_flujo[arista] == red.grafo[nodo1][nodo2]["capacidad_flujo"]
+    assert compacta.obstruccion[arista] == 50
+    assert compacta.nivel[compacta.indice["Tanque0"]] == red.grafo.nodes["Tanque0"]["nivel"]
+
+    red.agregar_casa("Nueva", 5)
+    red.agregar_tuberia("Tanque0", "Nueva", 7)
+    nueva = red.red_compacta()
+    assert nueva is not compacta
+    assert nueva.capacidad_flujo[nueva.id_arista("Tanque0", "Nueva")] == 7
+    assert nueva.id_arista("Nueva", "Tanque0") is None
@@ -0,0 +1,98 @@
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from benchmarks import obstruir_parcialmente
+from generador_redes import TOPOLOGIAS, generar_red
+from grafo import RedDeAgua
+from simulacion import asignar_tanques
+
+
+def red_generada(topologia, semilla=0):
+    red = RedDeAgua(None)
+    red._cargar_datos(obstruir_parcialmente(generar_red(
+        topologia, num_casas=150, num_tanques=4, capacidad_tanque=("uniforme", 5e6, 4e7), semilla=semilla
+    ), semilla=semilla))
+    rng = random.Random(semilla)
+    for _ in range(5):
+        red.eliminar_tuberia(*rng.choice(list(red.grafo.edges)))
+    return red
+
+
+@pytest.mark.parametrize("topologia", TOPOLOGIAS)
+def test_tanque_asignado_es_el_mas_cercano(topologia):
+    red = red_generada(topologia)
+    compacta = red.red_compacta()
+    tanques, asignado = asignar_tanques(compacta)
+    nombres = compacta.nombres
+    saltos = {nombres[t]: nx.single_source_shortest_path_length(red.grafo, nombres[t]) for t in tanques.tolist()}
+    for i, nombre in enumerate(nombres):
+        distancias = [saltos[nombres[t]].get(nombre) for t in tanques.tolist()]
+        alcanzables = [d for d in distancias if d is not None]
+        if not alcanzables:
+            assert asignado[i] == -1
+        else:
+            assert distancias[asignado[i]] == min(alcanzables)
+
+
+# Simulacion de referencia, una casa y un tanque a la vez con los mismos tanques asignados
+def simular_paso_a_paso(red, pasos, paso_segundos, perfiles, perfil_de_casa, recarga):
+    compacta = red.red_compacta()
+    tanques, asignado = asignar_tanques(compacta)
+    nombres = compacta.nombres
+    grafo = red.grafo
+    nivel = {nombres[t]: grafo.nodes[nombres[t]]["nivel"] for t in tanques.tolist()}
+    tanque_de = {nombres[i]: nombres[tanques[asignado[i]]] for i in range(len(nombres)) if asignado[i] >= 0}
+    casas = [nodo for nodo, tipo in grafo.nodes(data="tipo") if tipo == "casa"]
+    limite = {casa: sum(c for _, _, c in grafo.in_edges(casa, data="capacidad_flujo") if c > 0) for casa in casas}
+
+    niveles, insatisfecha, por_casa = [list(nivel.values())], [], dict.fromkeys(casas, 0.0)
+    for paso in range(pasos):
+        hora_del_dia = (paso * paso_segundos % 86400) / 86400
+        pedidos, demandas = {}, {}
+        for casa in casas:
+            perfil = perfiles.get(perfil_de_casa.get(casa), [1.0])
+            factor = perfil[min(int(hora_del_dia * len(perfil)), len(perfil) - 1)]
+            demandas[casa] = grafo.nodes[casa]["demanda"] * factor * paso_segundos
+            pedidos[casa] = min(demandas[casa], limite[casa] * paso_segundos) if casa in tanque_de else 0
+        fraccion = {}
+        for tanque in nivel:
+            pedido = sum(pedidos[casa] for casa in casas if tanque_de.get(casa) == tanque)
+            fraccion[tanque] = min(1, nivel[tanque] / pedido) if pedido > 0 else 1
+            nivel[tanque] = min(max(nivel[tanque] - pedido * fraccion[tanque] + recarga.get(tanque, 0) * paso_segundos, 0),
+                                grafo.nodes[tanque]["capacidad"])
+        faltante = 0
+        for casa in casas:
+            entregado = pedidos[casa] * fraccion.get(tanque_de.get(casa), 1)
+            faltante += demandas[casa] - entregado
+            por_casa[casa] += demandas[casa] - entregado
+        niveles.append(list(nivel.values()))
+        insatisfecha.append(faltante)
+    return np.array(niveles), np.array(insatisfecha), np.array(list(por_casa.values()))
+
+
+@pytest.mark.parametrize("topologia", TOPOLOGIAS)
+def test_simulacion_igual_a_paso_a_paso(topologia):
+    red = red_generada(topologia)
+    casas = [nodo for nodo, tipo in red.grafo.nodes(data="tipo") if tipo == "casa"]
+    rng = random.Random(1)
+    perfiles = {"dia": [rng.uniform(0.2, 3) for _ in range(24)], "noche": [2, 0.1, 0.1, 0.5, 1, 3, 0.7]}
+    perfil_de_casa = {casa: rng.choice(["dia", "noche"]) for casa in rng.sample(casas, 100)}
+    recarga = {"Tanque0": 500, "Tanque2": 3000}
+    niveles_guardados = dict(red.grafo.nodes(data="nivel"))
+
+    resultado = red.simular_periodo_extendido(horas=30, paso_minutos=10, perfiles=perfiles, perfil_de_casa=perfil_de_casa, recarga=recarga)
+    niveles, insatisfecha, por_casa = simular_paso_a_paso(red, 180, 600, perfiles, perfil_de_casa, recarga)
+    np.testing.assert_allclose(resultado["niveles"], niveles, rtol=1e-9, atol=1e-6)
+    np.testing.assert_allclose(resultado["demanda_insatisfecha"], insatisfecha, rtol=1e-9, atol=1e-6)
+    np.testing.assert_allclose(resultado["insatisfecha_por_casa_total"], por_casa, rtol=1e-9, atol=1e-6)
+    assert resultado["casas"] == casas
+    assert dict(red.grafo.nodes(data="nivel")) == niveles_guardados
+
+
+def test_perfil_inexistente():
+    red = red_generada("arbol")
+    with pytest.raises(ValueError):
+        red.simular_periodo_extendido(horas=1, perfiles={"dia": [1]}, perfil_de_casa={"Casa0": "noche"})
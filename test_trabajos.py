@@ -0,0 +1,93 @@
+import json
+import os
+import time
+
+import networkx as nx
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from PyQt5.QtWidgets import QApplication, QMessageBox
+
+from generador_redes import generar_red
+from grafo import RedDeAgua
+from trabajos import Trabajo
+
+
+@pytest.fixture(scope="module")
+def aplicacion():
+    return QApplication.instance() or QApplication([])
+
+
+# Corre el trabajo en el hilo actual y devuelve (señal emitida, valor, avances informados)
+def correr(trabajo):
+    resultado = {}
+    avances = []
+    senales = trabajo.senales
+    senales.progreso.connect(lambda porcentaje, mensaje: avances.append(porcentaje))
+    senales.terminado.connect(lambda valor: resultado.update(senal="terminado", valor=valor))
+    senales.fallo.connect(lambda error: resultado.update(senal="fallo", valor=error))
+    senales.cancelado.connect(lambda: resultado.update(senal="cancelado", valor=None))
+    trabajo.run()
+    return resultado["senal"], resultado["valor"], avances
+
+
+def sumar(trabajo, numeros):
+    total = 0
+    for i, numero in enumerate(numeros):
+        trabajo.avanzar(100 * i // len(numeros))
+        total += numero
+    return total
+
+
+def test_trabajo_terminado(aplicacion):
+    senal, valor, avances = correr(Trabajo("Sumar", sumar, [1, 2, 3, 4]))
+    assert (senal, valor) == ("terminado", 10)
+    assert avances == [0, 0, 25, 50, 75, 100]
+
+
+def test_trabajo_con_error(aplicacion):
+    senal, valor, _ = correr(Trabajo("Sumar", sumar, [1, "x"]))
+    assert senal == "fallo"
+    assert isinstance(valor, TypeError)
+
+
+def test_trabajo_cancelado(aplicacion):
+    trabajo = Trabajo("Sumar", sumar, [1, 2, 3])
+    trabajo.cancelar()
+    senal, _, avances = correr(trabajo)
+    assert senal == "cancelado"
+    assert avances == []
+
+
+def test_instantanea_no_cambia_la_red():
+    red = RedDeAgua(None)
+    red._cargar_datos(generar_red("arbol", num_casas=50))
+    copia = red.instantanea()
+    assert copia is red.instantanea()
+    with pytest.raises(nx.NetworkXError):
+        copia.agregar_casa("Nueva", 5)
+    assert "Nueva" not in red.grafo
+
+    red.agregar_casa("Nueva", 5)
+    assert red.instantanea() is not copia
+    assert "Nueva" not in copia.grafo
+
+
+# Cargar datos desde la interfaz: el json se carga sobre una copia que la red adopta, y la red adoptada
+# se escribe en el archivo de la red sin esperar a otro cambio
+def test_datos_cargados_se_guardan(aplicacion, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(QMessageBox, "information", lambda *args, **kwargs: None)
+    from interfaz import Interfaz, cargar_red
+
+    (tmp_path / "otra.json").write_text(json.dumps(generar_red("arbol", num_casas=20)))
+    ventana = Interfaz()
+    ventana.red_agua.activar_guardado_diferido(retardo=0.01)
+    red = cargar_red(Trabajo("Cargar datos", None), ventana.red_agua.instantanea(congelada=False), "otra.json")
+    ventana._datos_cargados(red)
+
+    limite = time.monotonic() + 5
+    while not (tmp_path / "red_agua.json").exists() and time.monotonic() < limite:
+        time.sleep(0.01)
+    assert "Casa19" in json.loads((tmp_path / "red_agua.json").read_text())["casas"]
+    ventana.close()
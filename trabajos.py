@@ -0,0 +1,96 @@
+import threading #aviso de cancelacion entre el hilo de la interfaz y el del trabajo
+import time
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+#Se lanza dentro de un trabajo, en su siguiente avance, cuando se pidio cancelarlo
+class Cancelado(Exception):
+    pass
+
+
+# Señales de un trabajo. El objeto vive en el hilo de la interfaz, asi que los manejadores conectados se
+# ejecutan ahi aunque el trabajo emita desde otro hilo.
+class SenalesTrabajo(QObject):
+    progreso = pyqtSignal(int, str) #porcentaje (0-100) y mensaje
+    terminado = pyqtSignal(object) #lo que devolvio la funcion
+    fallo = pyqtSignal(object) #la excepcion
+    cancelado = pyqtSignal()
+
+
+# Calculo largo que corre fuera del hilo de la interfaz. `funcion(trabajo, *args)` recibe el trabajo para
+# informar su avance con trabajo.avanzar(porcentaje, mensaje); si se pidio cancelar, ese avance lanza
+# Cancelado y el trabajo termina con la señal `cancelado` en lugar de `terminado`. La cancelacion es
+# cooperativa: un paso que ya empezo termina antes de que se note.
+class Trabajo(QRunnable):
+    def __init__(self, nombre, funcion, *args):
+        super().__init__()
+        self.setAutoDelete(False) #el ejecutor guarda la referencia hasta que termina
+        self.nombre = nombre
+        self.funcion = funcion
+        self.args = args
+        self.senales = SenalesTrabajo()
+        self.duracion = None
+        self._cancelar = threading.Event()
+
+    def cancelar(self):
+        self._cancelar.set()
+
+    @property
+    def cancelado(self):
+        return self._cancelar.is_set()
+
+    def avanzar(self, porcentaje, mensaje=""):
+        if self._cancelar.is_set():
+            raise Cancelado()
+        self.senales.progreso.emit(int(porcentaje), mensaje)
+
+    def run(self):
+        inicio = time.perf_counter()
+        try:
+            self.avanzar(0)
+            resultado = self.funcion(self, *self.args)
+            self.avanzar(100)
+        except Cancelado:
+            self.duracion = time.perf_counter() - inicio
+            self.senales.cancelado.emit()
+        except Exception as e:
+            self.duracion = time.perf_counter() - inicio
+            self.senales.fallo.emit(e)
+        else:
+            self.duracion = time.perf_counter() - inicio
+            self.senales.terminado.emit(resultado)
+
+
+# Corre los trabajos en un QThreadPool y guarda los que siguen activos, para poder cancelarlos (por
+# ejemplo al cerrar la ventana). Con metricas, la duracion de cada trabajo se registra como
+# "trabajo.<nombre>".
+class EjecutorTrabajos(QObject):
+    def __init__(self, parent=None, hilos=None, metricas=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        if hilos is not None:
+            self.pool.setMaxThreadCount(hilos)
+        self.metricas = metricas
+        self.activos = set()
+
+    def lanzar(self, trabajo):
+        self.activos.add(trabajo)
+        for senal in (trabajo.senales.terminado, trabajo.senales.fallo, trabajo.senales.cancelado):
+            senal.connect(lambda *_, trabajo=trabajo: self._finalizado(trabajo))
+        self.pool.start(trabajo)
+        return trabajo
+
+    def _finalizado(self, trabajo):
+        self.activos.discard(trabajo)
+        if self.metricas is not None and trabajo.duracion is not None:
+            self.metricas.registrar_tiempo(f"trabajo.{trabajo.nombre}", trabajo.duracion)
+
+    def cancelar_todos(self):
+        for trabajo in self.activos:
+            trabajo.cancelar()
+
+    #Cancela lo que este corriendo y espera a que los hilos terminen (hasta `milisegundos`, -1 sin limite)
+    def detener(self, milisegundos=-1):
+        self.cancelar_todos()
+        return self.pool.waitForDone(milisegundos)